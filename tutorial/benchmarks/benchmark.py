@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for the build and analysis pipelines on synthetic data at scale.
+
+Usage:
+    python benchmark.py run [--scales 1 10 100] [--workloads pkg-python bac]
+    python benchmark.py compare [BASE HEAD]
+
+`run` times every stage of each workload at each scale and appends the
+results to results.jsonl (next to this file, or --results), one line per
+workload and scale, tagged with the commit and the machine.  `compare`
+prints wall time and rows/second per stage for two commits (default: the
+last two benchmarked), using the fastest run of each commit.
+
+Scale k means every input table has k times the rows of the shipped data:
+
+  pkg-python   demographic survey   generate_demographics.generate_parallel()
+                                    with k x 200 records per state-year
+               crash records        crash_data.csv resampled with replacement
+               analysis panel       the scaled build's analysis_panel.csv
+                                    with every state replicated k times
+               iv_data, rd_data     resampled with replacement
+  bac          analysis data        analysis_data.parquet with every state
+                                    replicated k times
+
+Replicated states get new state ids and jittered outcomes, so the fixed-
+effect and clustering structure grows with k.  Everything runs offline in a
+scratch copy of each package (--workdir, deleted afterwards unless --keep),
+so the repository's own outputs and caches are never touched.  Stages are
+measured exactly as main.py measures them (run_report.py): pkg-python
+scripts as subprocesses, BAC analysis stages in-process through
+pipeline.py with --jobs 1 --force.  rows/s is rows read per wall second.
+
+1000x writes several GB of CSV (the demographic survey alone is 214M rows);
+the default scales stop at 100x.
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+HERE = Path(__file__).parent.resolve()
+TUTORIAL = HERE.parent
+WALKTHROUGH = TUTORIAL / "data" / "project-walkthrough"
+PKG = WALKTHROUGH / "pkg-python"
+BAC = TUTORIAL / "worked-examples" / "bac-replication-python"
+
+RESULTS = HERE / "results.jsonl"
+SEED = 20240601
+WORKLOADS = ["pkg-python", "bac"]
+
+BAC_STAGES = [
+    "analysis/code/01_summary_stats.py",
+    "analysis/code/02_twfe_regression.py",
+    "analysis/code/03_event_study.py",
+    "analysis/code/04_tables.py",
+    "analysis/code/05_figures.py",
+    "analysis/code/06_spec_curve.py",
+    "analysis/code/07_honest_did.py",
+    "analysis/code/08_synth_control.py",
+]
+
+
+def _import(name, path):
+    """Import a module by file path (the runners are scripts, not packages)."""
+    if name in sys.modules:
+        return sys.modules[name]
+    if str(path.parent) not in sys.path:
+        sys.path.insert(0, str(path.parent))
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+run_report = _import("run_report", PKG / "run_report.py")
+
+
+def _git(*args):
+    try:
+        out = subprocess.run(["git", *args], cwd=HERE, capture_output=True,
+                             text=True, timeout=30)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip() if out.returncode == 0 else None
+
+
+# ─── Scaled inputs ────────────────────────────────────────────────────────────
+
+def resample(src, dst, k, rng):
+    """Write k x the rows of CSV src to dst, drawn with replacement."""
+    if k == 1:
+        shutil.copyfile(src, dst)
+        return
+    df = pd.read_csv(src)
+    idx = rng.integers(0, len(df), size=len(df) * k)
+    df.iloc[idx].to_csv(dst, index=False)
+
+
+def replicate_states(df, k, rng, outcomes):
+    """Stack k copies of a state panel; copy r > 0 gets state ids offset by
+    100 r and its outcomes perturbed (Poisson for counts, N(0, 0.05) noise
+    for logs and rates).  String ids stay strings; integer ids of any width
+    come back as int64, so the offsets fit."""
+    if k == 1:
+        return df
+    fips = df["state_fips"].astype(np.int64)
+    as_str = pd.api.types.is_string_dtype(df["state_fips"])
+    copies = [df.assign(state_fips=fips.astype(str) if as_str else fips)]
+    for r in range(1, k):
+        c = df.copy()
+        c["state_fips"] = (fips + 100 * r).astype(str) if as_str else fips + 100 * r
+        for col in outcomes:
+            if pd.api.types.is_integer_dtype(c[col]) or col.endswith("_crashes"):
+                c[col] = rng.poisson(c[col].clip(lower=0)).astype(c[col].dtype)
+            else:
+                c[col] = c[col] + rng.normal(0, 0.05, len(c))
+        copies.append(c)
+    return pd.concat(copies, ignore_index=True)
+
+
+# ─── Workloads ────────────────────────────────────────────────────────────────
+
+def _copy_package(src, dst, folders):
+    """Copy a package's runner modules and code folders (not its outputs)."""
+    for p in src.glob("*.py"):
+        shutil.copy2(p, dst / p.name)
+    for folder in folders:
+        shutil.copytree(src / folder, dst / folder,
+                        ignore=shutil.ignore_patterns("__pycache__", "output"))
+
+
+def bench_pkg_python(work, k, rng, report):
+    """Generate scaled inputs, then run the pkg-python build and analysis scripts."""
+    pkg_main = _import("pkg_main", PKG / "main.py")
+    generator = _import("generate_demographics", WALKTHROUGH / "generate_demographics.py")
+    _copy_package(PKG, work, ["build/code", "analysis/code"])
+    inputs = work / "build" / "input"
+    inputs.mkdir(parents=True)
+    for name in ["policy_adoptions.csv", "state_names.csv"]:
+        shutil.copyfile(PKG / "build" / "input" / name, inputs / name)
+
+    metrics = {}
+    with run_report.measure(metrics):
+        generator.generate_parallel(inputs / "demographic_survey", generator.N_PER_STATE * k)
+    report.add(run_report.stage_record(
+        "generate/demographic_survey", **metrics,
+        rows_out=run_report.count_rows(inputs / "demographic_survey")))
+
+    metrics = {}
+    with run_report.measure(metrics):
+        resample(PKG / "build" / "input" / "crash_data.csv", inputs / "crash_data.csv", k, rng)
+    report.add(run_report.stage_record(
+        "generate/crash_data", **metrics,
+        rows_in=run_report.count_rows(PKG / "build" / "input" / "crash_data.csv"),
+        rows_out=run_report.count_rows(inputs / "crash_data.csv")))
+
+    build = [s for s in pkg_main.SCRIPTS if s[0].startswith("build/")]
+    analysis = [s for s in pkg_main.SCRIPTS if s[0].startswith("analysis/")]
+    if not pkg_main.run_scripts(work, report, build):
+        return False
+
+    panel_path = work / "build" / "output" / "analysis_panel.csv"
+    code = work / "analysis" / "code"
+    metrics = {}
+    with run_report.measure(metrics):
+        panel = pd.read_csv(panel_path)
+        panel = replicate_states(panel, k, rng, ["fatal_crashes", "serious_crashes"])
+        panel.to_csv(panel_path, index=False)
+        for name in ["iv_data.csv", "rd_data.csv"]:
+            resample(PKG / "analysis" / "code" / name, code / name, k, rng)
+    report.add(run_report.stage_record(
+        "generate/analysis_inputs", **metrics,
+        rows_out=run_report.total_rows([panel_path, code / "iv_data.csv", code / "rd_data.csv"])))
+
+    return pkg_main.run_scripts(work, report, analysis)
+
+
+def bench_bac(work, k, rng, report):
+    """Run the BAC analysis stages on k x the states of analysis_data.parquet."""
+    pipeline = _import("pipeline", BAC / "pipeline.py")
+    _copy_package(BAC, work, ["analysis/code"])
+    out = work / "build" / "output"
+    out.mkdir(parents=True)
+
+    metrics = {}
+    with run_report.measure(metrics):
+        data = pd.read_parquet(BAC / "build" / "output" / "analysis_data.parquet")
+        data = replicate_states(data, k, rng, ["hr_fatalities", "nhr_fatalities",
+                                               "ln_hr", "ln_nhr"])
+        data.to_parquet(out / "analysis_data.parquet", index=False)
+    report.add(run_report.stage_record(
+        "generate/analysis_data", **metrics,
+        rows_out=run_report.count_rows(out / "analysis_data.parquet")))
+
+    cwd = os.getcwd()
+    os.chdir(work)
+    try:
+        pipeline.run_pipeline(work, [work / s for s in BAC_STAGES],
+                              jobs=1, force=True, report=report)
+    except RuntimeError as exc:
+        print(f"ERROR: {exc}")
+        return False
+    finally:
+        os.chdir(cwd)
+        _unload(work)
+    return True
+
+
+def _unload(folder):
+    """Forget the modules imported from a scratch package, so the next scale
+    imports its own copy (pipeline.load reuses modules by name)."""
+    folder = str(folder)
+    for name, module in list(sys.modules.items()):
+        if (getattr(module, "__file__", None) or "").startswith(folder):
+            del sys.modules[name]
+    sys.path[:] = [p for p in sys.path if not p.startswith(folder)]
+
+
+BENCHMARKS = {"pkg-python": bench_pkg_python, "bac": bench_bac}
+
+
+# ─── Results ──────────────────────────────────────────────────────────────────
+
+def rows_per_second(record):
+    rows = record.get("rows_in") if record.get("rows_in") is not None else record.get("rows_out")
+    if rows is None or not record.get("wall_seconds"):
+        return None
+    return rows / record["wall_seconds"]
+
+
+def run(args):
+    commit = _git("rev-parse", "--short", "HEAD")
+    dirty = bool(_git("status", "--porcelain", "--untracked-files=no"))
+    results = Path(args.results)
+    if args.workdir:
+        Path(args.workdir).mkdir(parents=True, exist_ok=True)
+    ok = True
+    for workload in args.workloads:
+        for k in args.scales:
+            print("=" * 70)
+            print(f"{workload} at {k}x")
+            print("=" * 70)
+            work = Path(tempfile.mkdtemp(prefix=f"bench-{workload}-{k}x-", dir=args.workdir))
+            report = run_report.RunReport(work, workload, scale=k)
+            rng = np.random.default_rng([SEED, k])
+            try:
+                status = "ok" if BENCHMARKS[workload](work, k, rng, report) else "failed"
+            finally:
+                if not args.keep:
+                    shutil.rmtree(work, ignore_errors=True)
+            ok &= status == "ok"
+            report.status = status
+            for s in report.stages:
+                s["rows_per_sec"] = rows_per_second(s)
+            entry = report.to_dict()
+            entry.update(commit=commit, dirty=dirty, workload=workload, scale=k,
+                         started=datetime.now(timezone.utc).isoformat(timespec="seconds"))
+            with open(results, "a") as f:
+                f.write(json.dumps(entry) + "\n")
+            print("\n" + report.summary())
+    print(f"\nResults appended to {results}")
+    return 0 if ok else 1
+
+
+def _load(path):
+    runs = []
+    try:
+        lines = Path(path).read_text().splitlines()
+    except OSError:
+        return runs
+    for line in lines:
+        try:
+            runs.append(json.loads(line))
+        except ValueError:
+            continue
+    return runs
+
+
+def _best(runs, commit):
+    """Fastest successful run of each (workload, scale, stage) at commit."""
+    best = {}
+    for r in runs:
+        if r.get("commit") != commit or r.get("status") != "ok":
+            continue
+        for s in r["stages"]:
+            key = (r["workload"], r["scale"], s["stage"])
+            if s["status"] == "ran" and (key not in best or s["wall_seconds"] < best[key]["wall_seconds"]):
+                best[key] = s
+    return best
+
+
+def compare(args):
+    runs = _load(args.results)
+    commits = list(dict.fromkeys(r.get("commit") for r in runs if r.get("status") == "ok"))
+    if args.commits:
+        if len(args.commits) != 2:
+            print("compare takes two commits (or none for the last two benchmarked)")
+            return 2
+        base, head = args.commits
+    elif len(commits) >= 2:
+        base, head = commits[-2:]
+    else:
+        print(f"Need successful runs at two commits in {args.results}; found {commits}")
+        return 1
+
+    a, b = _best(runs, base), _best(runs, head)
+    print(f"{'workload':<11} {'scale':>6}  {'stage':<36} {base:>9} {head:>9} {'change':>8} {'rows/s':>12}")
+    for key in sorted(set(a) | set(b), key=lambda k: (k[0], k[1], k[2])):
+        workload, k, stage = key
+        ta = a[key]["wall_seconds"] if key in a else None
+        tb = b[key]["wall_seconds"] if key in b else None
+        change = f"{(tb - ta) / ta:+.0%}" if ta and tb and ta >= 0.1 else ""
+        rate = b[key].get("rows_per_sec") if key in b else None
+        print(f"{workload:<11} {k:>5}x  {stage:<36} "
+              f"{'-' if ta is None else f'{ta:.2f}s':>9} {'-' if tb is None else f'{tb:.2f}s':>9} "
+              f"{change:>8} {'-' if rate is None else f'{rate:,.0f}':>12}")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the pipelines on scaled synthetic data.")
+    parser.add_argument("--results", default=str(RESULTS),
+                        help=f"results file (default: {RESULTS.name} next to this script)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("run", help="run the benchmarks and append the results")
+    p.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100],
+                   help="row multipliers (default: 1 10 100)")
+    p.add_argument("--workloads", nargs="+", choices=WORKLOADS, default=WORKLOADS)
+    p.add_argument("--workdir", default=None,
+                   help="where to create the scratch packages (default: system temp)")
+    p.add_argument("--keep", action="store_true", help="keep the scratch packages")
+    p.set_defaults(func=run)
+
+    p = sub.add_parser("compare", help="compare stage timings between two commits")
+    p.add_argument("commits", nargs="*", help="BASE HEAD (default: last two benchmarked)")
+    p.set_defaults(func=compare)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -20,6 +20,35 @@ import os
 
 OUTPUT_DIR = os.path.dirname(os.path.abspath(__file__))
 
+STATE_NAMES = [
+    "Alabama", "Alaska", "Arizona", "Arkansas", "California",
+    "Colorado", "Connecticut", "Delaware", "Florida", "Georgia",
+    "Hawaii", "Idaho", "Illinois", "Indiana", "Iowa",
+    "Kansas", "Kentucky", "Louisiana", "Maine", "Maryland",
+    "Massachusetts", "Michigan", "Minnesota", "Mississippi", "Missouri",
+    "Montana", "Nebraska", "Nevada", "New Hampshire", "New Jersey",
+    "New Mexico", "New York", "North Carolina", "North Dakota", "Ohio",
+    "Oklahoma", "Oregon", "Pennsylvania", "Rhode Island", "South Carolina",
+    "South Dakota", "Tennessee", "Texas", "Utah", "Vermont",
+    "Virginia", "Washington", "West Virginia", "Wisconsin", "Wyoming"
+]
+
+# Exercise designs (also used by simulate_did.py)
+EX1_YEARS = list(range(2005, 2015))       # 2005-2014
+EX1_TREATED = set(range(1, 21))           # first 20 alphabetically
+EX1_ADOPTION_YEAR = 2010
+EX1_EFFECT = -1.5                         # pp on unemployment
+
+EX2_YEARS = list(range(2005, 2020))       # 2005-2019
+# 4 states in 2010, 4 in 2012, 4 in 2014, 3 in 2016
+EX2_MW_INCREASE_YEAR = {
+    5: 2010, 10: 2010, 22: 2010, 32: 2010,    # CA, GA, MS, NY
+    7: 2012, 15: 2012, 21: 2012, 47: 2012,    # CT, IA, MA, WA
+    6: 2014, 23: 2014, 37: 2014, 45: 2014,    # CO, MN, OR, VT
+    20: 2016, 31: 2016, 38: 2016,             # MD, NM, PA
+}
+EX2_EFFECT = -0.8                         # pp on teen employment
+
 # ============================================================
 # EXERCISE 1: Job Training & Unemployment
 # ============================================================
@@ -28,26 +57,14 @@ def generate_exercise1():
     rng = np.random.default_rng(seed=1433)
 
     n_states = 50
-    years = list(range(2005, 2015))  # 2005-2014
-    n_years = len(years)
-
-    state_names = [
-        "Alabama", "Alaska", "Arizona", "Arkansas", "California",
-        "Colorado", "Connecticut", "Delaware", "Florida", "Georgia",
-        "Hawaii", "Idaho", "Illinois", "Indiana", "Iowa",
-        "Kansas", "Kentucky", "Louisiana", "Maine", "Maryland",
-        "Massachusetts", "Michigan", "Minnesota", "Mississippi", "Missouri",
-        "Montana", "Nebraska", "Nevada", "New Hampshire", "New Jersey",
-        "New Mexico", "New York", "North Carolina", "North Dakota", "Ohio",
-        "Oklahoma", "Oregon", "Pennsylvania", "Rhode Island", "South Carolina",
-        "South Dakota", "Tennessee", "Texas", "Utah", "Vermont",
-        "Virginia", "Washington", "West Virginia", "Wisconsin", "Wyoming"
-    ]
+    years = EX1_YEARS
+
+    state_names = STATE_NAMES
 
     state_ids = list(range(1, n_states + 1))
 
     # 20 treated states (first 20 alphabetically for simplicity)
-    treated_states = set(range(1, 21))
+    treated_states = EX1_TREATED
 
     # --- training_programs.dta ---
     training_df = pd.DataFrame({
@@ -69,9 +86,9 @@ def generate_exercise1():
     unemp_rows = []
     for s in state_ids:
         for y in years:
-            treated = 1 if (s in treated_states and y >= 2010) else 0
+            treated = 1 if (s in treated_states and y >= EX1_ADOPTION_YEAR) else 0
             rate = (state_fe[s] + year_fe[y]
-                    + (-1.5 * treated)  # true treatment effect
+                    + (EX1_EFFECT * treated)  # true treatment effect
                     + rng.normal(0, 0.5))
             rate = np.clip(rate, 1.0, 15.0)
             unemp_rows.append({
@@ -136,40 +153,14 @@ def generate_exercise2():
     rng = np.random.default_rng(seed=14332)
 
     n_states = 50
-    years = list(range(2005, 2020))  # 2005-2019
-    n_years = len(years)
-
-    state_names = [
-        "Alabama", "Alaska", "Arizona", "Arkansas", "California",
-        "Colorado", "Connecticut", "Delaware", "Florida", "Georgia",
-        "Hawaii", "Idaho", "Illinois", "Indiana", "Iowa",
-        "Kansas", "Kentucky", "Louisiana", "Maine", "Maryland",
-        "Massachusetts", "Michigan", "Minnesota", "Mississippi", "Missouri",
-        "Montana", "Nebraska", "Nevada", "New Hampshire", "New Jersey",
-        "New Mexico", "New York", "North Carolina", "North Dakota", "Ohio",
-        "Oklahoma", "Oregon", "Pennsylvania", "Rhode Island", "South Carolina",
-        "South Dakota", "Tennessee", "Texas", "Utah", "Vermont",
-        "Virginia", "Washington", "West Virginia", "Wisconsin", "Wyoming"
-    ]
+    years = EX2_YEARS
+
+    state_names = STATE_NAMES
 
     state_ids = list(range(1, n_states + 1))
 
     # Staggered treatment: ~15 states treated at different times
-    # 4 states in 2010, 4 in 2012, 4 in 2014, 3 in 2016
-    mw_increase_year = {}
-    treat_2010 = [5, 10, 22, 32]    # CA, GA, MS, NY
-    treat_2012 = [7, 15, 21, 47]    # CT, IA, MA, WA
-    treat_2014 = [6, 23, 37, 45]    # CO, MN, OR, VT
-    treat_2016 = [20, 31, 38]       # MD, NM, PA
-
-    for s in treat_2010:
-        mw_increase_year[s] = 2010
-    for s in treat_2012:
-        mw_increase_year[s] = 2012
-    for s in treat_2014:
-        mw_increase_year[s] = 2014
-    for s in treat_2016:
-        mw_increase_year[s] = 2016
+    mw_increase_year = EX2_MW_INCREASE_YEAR
 
     # --- minimum_wage_laws.dta ---
     mw_df = pd.DataFrame({
@@ -195,7 +186,7 @@ def generate_exercise2():
             treat_yr = mw_increase_year.get(s, 0)
             treated = 1 if (treat_yr > 0 and y >= treat_yr) else 0
             emp_rate = (state_fe[s] + year_fe[y]
-                        + (-0.8 * treated)  # true treatment effect
+                        + (EX2_EFFECT * treated)  # true treatment effect
                         + rng.normal(0, 0.8))
             emp_rate = np.clip(emp_rate, 20.0, 70.0)
             row[f"teen_emp_{y}"] = round(emp_rate, 2)
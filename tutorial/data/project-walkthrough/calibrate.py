@@ -0,0 +1,132 @@
+"""
+Calibrate synthetic variables so their weighted mean hits a target.
+
+The data generators draw each respondent's variables at random and then
+adjust them so the weighted collapse of every state-year equals the target
+in state_demographics.  This module does the adjusting:
+
+  binary(flag, weights, target)            0/1 variables (urban): flips a
+                                           random few respondents
+  bounded(values, weights, target, lo, hi) continuous variables confined to
+                                           [lo, hi]: moves every value part
+                                           of the way to one bound
+
+Both take one state-year as 1-D arrays or many as 2-D arrays (one row each,
+with one target per row), and raise ValueError when a target cannot be met.
+
+binary() shuffles the respondents that can move the share towards the
+target (the 0s when it is too low, the 1s when too high) and flips the
+prefix whose cumulative weight is closest to the gap, found with one
+searchsorted.  That leaves at most half a respondent's weight; flipping a
+1 and a 0 together, the pair found by searchsorted over the sorted weights
+of the 0s, then closes it to within tol (repeated if one pair is not
+enough).  O(n log n) per state-year, where flipping one respondent at a
+time and recomputing the mean is O(n^2) and may stop before it converges.
+"""
+
+import numpy as np
+
+TOL = 1e-3          # on the weighted share
+
+
+def _rows(values, weights, target):
+    values, weights = np.asarray(values), np.asarray(weights, dtype=float)
+    if values.shape != weights.shape:
+        raise ValueError(f"values {values.shape} and weights {weights.shape} differ in shape")
+    rows_v, rows_w = np.atleast_2d(values), np.atleast_2d(weights)
+    target = np.broadcast_to(np.asarray(target, dtype=float), rows_v.shape[:1])
+    return rows_v, rows_w, target
+
+
+def _best_move(out, weights, residual):
+    """Flip of one respondent, or of one 1 and one 0 together, that changes
+    the weight of the 1s by the amount closest to residual.  Returns the
+    indices to flip and the residual left after flipping them."""
+    ones, zeros = np.flatnonzero(out), np.flatnonzero(~out)
+    moves = []
+    if len(zeros):
+        j = zeros[np.argmin(np.abs(weights[zeros] - residual))]
+        moves.append(([j], residual - weights[j]))
+    if len(ones):
+        i = ones[np.argmin(np.abs(weights[ones] + residual))]
+        moves.append(([i], residual + weights[i]))
+    if len(ones) and len(zeros):
+        # 1 -> 0 and 0 -> 1: change w[j] - w[i], so look for w[j] near w[i] + residual
+        order = np.argsort(weights[zeros])
+        sorted_w = weights[zeros][order]
+        want = weights[ones] + residual
+        pos = np.searchsorted(sorted_w, want)
+        lo = np.clip(pos - 1, 0, len(sorted_w) - 1)
+        hi = np.clip(pos, 0, len(sorted_w) - 1)
+        near = np.where(np.abs(want - sorted_w[hi]) < np.abs(want - sorted_w[lo]), hi, lo)
+        err = want - sorted_w[near]
+        k = int(np.argmin(np.abs(err)))
+        moves.append(([ones[k], zeros[order[near[k]]]], err[k]))
+    return min(moves, key=lambda m: abs(m[1]))
+
+
+def _binary_row(flag, weights, target, tol, rng):
+    total = weights.sum()
+    out = flag.copy()
+    residual = target * total - weights[out].sum()       # weight to move into the 1s
+    if abs(residual) <= tol * total:
+        return out
+
+    # One pass: flip the shuffled prefix of movable respondents (the 0s when
+    # the share is too low, the 1s when too high) whose weight is nearest the gap
+    movable = np.flatnonzero(~out if residual > 0 else out)
+    movable = movable[rng.permutation(len(movable))]
+    cum = np.cumsum(weights[movable])
+    need = abs(residual)
+    k = int(np.searchsorted(cum, need))
+    below = cum[k - 1] if k > 0 else 0.0
+    m = k if k >= len(cum) or need - below <= cum[k] - need else k + 1
+    out[movable[:m]] = ~out[movable[:m]]
+    residual = target * total - weights[out].sum()
+
+    # Then single or paired flips while they get closer
+    while abs(residual) > tol * total:
+        flip, left = _best_move(out, weights, residual)
+        if abs(left) >= abs(residual):
+            break
+        out[flip] = ~out[flip]
+        residual = target * total - weights[out].sum()
+
+    if abs(residual) > tol * total:
+        raise ValueError(
+            f"weighted share {target:.4f} is not attainable within {tol}: "
+            f"closest is {weights[out].sum() / total:.4f}")
+    return out
+
+
+def binary(flag, weights, target, tol=TOL, rng=None):
+    """Flip entries of the 0/1 array flag so that its weighted mean is
+    within tol of target (per row for 2-D input); returns a bool array."""
+    flags, rows_w, targets = _rows(flag, weights, target)
+    if ((targets < 0) | (targets > 1)).any():
+        raise ValueError("a weighted share target must lie in [0, 1]")
+    rng = rng if rng is not None else np.random.default_rng()
+    flags = flags.astype(bool)
+    out = np.empty_like(flags)
+    for r in range(len(flags)):
+        out[r] = _binary_row(flags[r], rows_w[r], targets[r], tol, rng)
+    return out.reshape(np.shape(flag))
+
+
+def bounded(values, weights, target, lower, upper):
+    """Move values towards upper (or lower) by the same fraction of their
+    distance to it, so the weighted mean is exactly target and every value
+    stays in [lower, upper]; returns a float array."""
+    rows_v, rows_w, targets = _rows(values, weights, target)
+    rows_v = rows_v.astype(float)
+    if (rows_v < lower).any() or (rows_v > upper).any():
+        raise ValueError(f"values must lie in [{lower}, {upper}] before calibrating")
+    if ((targets < lower) | (targets > upper)).any():
+        raise ValueError(f"a weighted mean target must lie in [{lower}, {upper}]")
+
+    total = rows_w.sum(axis=1)
+    mean = (rows_w * rows_v).sum(axis=1) / total
+    bound = np.where(targets > mean, upper, lower)[:, None]
+    room = (rows_w * (bound - rows_v)).sum(axis=1) / total
+    step = np.divide(targets - mean, room, out=np.zeros_like(mean), where=room != 0)
+    return (rows_v + step[:, None] * (bound - rows_v)).reshape(np.shape(values))
@@ -11,41 +11,66 @@ Each CSV has columns: state_fips, weight, income, urban
 - weight: survey weight (rawsum to population)
 - income: string like "$35,800" (teaches destring)
 - urban: 0 or 1
+
+generate() draws everything from the global np.random state in one
+sequence; run as a script without options it writes the shipped files.
+Urban shares are calibrated with calibrate.binary() (exact to 0.001),
+except in generate(), which keeps the original flip loop for the same
+reason.
+
+generate_parallel() gives every (state, year) its own generator, spawned
+from SeedSequence(seed) with spawn_key (state, year), and writes the year
+files concurrently in a process pool.  Each file then depends only on the
+seed, its year and the targets, so the output is byte-identical whatever
+the number of workers (but differs from generate()'s).  The benchmark
+harness (tutorial/benchmarks/benchmark.py) uses it for scaled-up copies:
+
+    python generate_demographics.py --streams --n-per-state 20000 --output-dir /tmp/survey
 """
 
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from pathlib import Path
+
 import pandas as pd
 import numpy as np
-from pathlib import Path
+
+import calibrate
 
 # Reproducibility
-np.random.seed(14033)
+SEED = 14033
 
 # Paths
 ROOT = Path(__file__).parent
 OUTPUT_DIR = ROOT / "demographic_survey"
-OUTPUT_DIR.mkdir(exist_ok=True)
-
-# Read target values from state_demographics.dta
-targets = pd.read_stata(ROOT / "state_demographics.dta")
-print(f"Loaded targets: {len(targets)} rows, states {targets.state_fips.min()}-{targets.state_fips.max()}, years {targets.year.min()}-{targets.year.max()}")
 
 # Parameters
 N_PER_STATE = 200  # records per state per year
 ALL_STATES = list(range(1, 52))  # 1-51 (51 = DC)
 ALL_YEARS = list(range(1995, 2016))  # 1995-2015
 
-# For years/states without targets, we need to extrapolate
-# Targets exist for states 1-50, years 2000-2015
-target_dict = {}
-for _, row in targets.iterrows():
-    target_dict[(int(row.state_fips), int(row.year))] = {
-        'population': int(row.population),
-        'median_income': float(row.median_income),
-        'pct_urban': float(row.pct_urban),
-    }
+
+def load_targets():
+    """Target collapsed values keyed by (state, year).
+
+    Targets exist for states 1-50, years 2000-2015; get_target()
+    extrapolates the rest.
+    """
+    targets = pd.read_stata(ROOT / "state_demographics.dta")
+    print(f"Loaded targets: {len(targets)} rows, states {targets.state_fips.min()}-{targets.state_fips.max()}, years {targets.year.min()}-{targets.year.max()}")
+    target_dict = {}
+    for _, row in targets.iterrows():
+        target_dict[(int(row.state_fips), int(row.year))] = {
+            'population': int(row.population),
+            'median_income': float(row.median_income),
+            'pct_urban': float(row.pct_urban),
+        }
+    return target_dict
 
 
-def get_target(state, year):
+def get_target(state, year, target_dict):
     """Get target values, extrapolating for missing state-years."""
     if (state, year) in target_dict:
         return target_dict[(state, year)]
@@ -89,25 +114,12 @@ def format_income(value):
     return f"${int(round(value)):,}"
 
 
-def generate_state_year(state, year, target):
-    """Generate N_PER_STATE individual records for one state-year."""
-    n = N_PER_STATE
-    pop = target['population']
-    med_inc = target['median_income']
-    pct_urb = target['pct_urban']
-
-    # Weights: vary around population/N with some noise
-    base_weight = pop / n
-    weight_noise = np.random.lognormal(0, 0.3, n)
-    weights = base_weight * weight_noise
-    # Rescale so sum = population exactly
-    weights = weights * (pop / weights.sum())
-
-    # Urban: Bernoulli draws, then adjust to hit target weighted mean
-    urban = np.random.binomial(1, pct_urb, n).astype(float)
-    # Compute current weighted mean
+def flip_towards(urban, weights, pct_urb, rng=np.random):
+    """The original urban adjustment: flip one random respondent at a time
+    (at most 50) until the weighted mean is within 0.005 of pct_urb.  Only
+    generate() uses it, so the shipped files stay reproducible; everything
+    else uses calibrate.binary()."""
     current_pct = np.average(urban, weights=weights)
-    # Flip some values to get closer to target (iterative adjustment)
     for _ in range(50):
         diff = pct_urb - current_pct
         if abs(diff) < 0.005:
@@ -116,18 +128,45 @@ def generate_state_year(state, year, target):
             # Need more 1s — flip a random 0 to 1
             zeros = np.where(urban == 0)[0]
             if len(zeros) > 0:
-                idx = np.random.choice(zeros)
+                idx = rng.choice(zeros)
                 urban[idx] = 1
         else:
             # Need fewer 1s — flip a random 1 to 0
             ones = np.where(urban == 1)[0]
             if len(ones) > 0:
-                idx = np.random.choice(ones)
+                idx = rng.choice(ones)
                 urban[idx] = 0
         current_pct = np.average(urban, weights=weights)
+    return urban
+
+
+def generate_state_year(state, year, target, n=N_PER_STATE, rng=np.random, legacy=False):
+    """Generate n individual records for one state-year.
+
+    rng is the global np.random state (generate()) or a per-state-year
+    np.random.Generator (generate_parallel()).  legacy=True adjusts urban
+    with flip_towards() instead of calibrate.binary().
+    """
+    pop = target['population']
+    med_inc = target['median_income']
+    pct_urb = target['pct_urban']
+
+    # Weights: vary around population/N with some noise
+    base_weight = pop / n
+    weight_noise = rng.lognormal(0, 0.3, n)
+    weights = base_weight * weight_noise
+    # Rescale so sum = population exactly
+    weights = weights * (pop / weights.sum())
+
+    # Urban: Bernoulli draws, then adjust to hit target weighted mean
+    urban = rng.binomial(1, pct_urb, n).astype(float)
+    if legacy:
+        urban = flip_towards(urban, weights, pct_urb, rng)
+    else:
+        urban = calibrate.binary(urban, weights, pct_urb, rng=rng).astype(float)
 
     # Income: draw from lognormal, then shift to hit target weighted mean
-    log_income = np.random.normal(np.log(med_inc) - 0.1, 0.4, n)
+    log_income = rng.normal(np.log(med_inc) - 0.1, 0.4, n)
     income_raw = np.exp(log_income)
     # Adjust to hit target weighted mean
     current_mean = np.average(income_raw, weights=weights)
@@ -148,19 +187,93 @@ def generate_state_year(state, year, target):
     })
 
 
-# Generate all files
-for year in ALL_YEARS:
-    frames = []
-    for state in ALL_STATES:
-        target = get_target(state, year)
-        df = generate_state_year(state, year, target)
-        frames.append(df)
+def generate(output_dir=OUTPUT_DIR, n_per_state=N_PER_STATE, seed=SEED):
+    """Write one CSV per year to output_dir, n_per_state records per state-year."""
+    np.random.seed(seed)
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    target_dict = load_targets()
+
+    for year in ALL_YEARS:
+        frames = []
+        for state in ALL_STATES:
+            target = get_target(state, year, target_dict)
+            df = generate_state_year(state, year, target, n_per_state, legacy=True)
+            frames.append(df)
 
+        year_df = pd.concat(frames, ignore_index=True)
+        outpath = output_dir / f"demographic_survey_{year}.csv"
+        year_df.to_csv(outpath, index=False)
+        print(f"  {outpath.name}: {len(year_df):,} rows, "
+              f"{year_df.state_fips.nunique()} states")
+
+    print(f"\nDone. Generated {len(ALL_YEARS)} files in {output_dir}")
+    print(f"Total records: {n_per_state * len(ALL_STATES) * len(ALL_YEARS):,}")
+
+
+# ─── Independent streams ──────────────────────────────────────────────────────
+
+def state_year_rng(seed, state, year):
+    """Generator for one state-year, independent of every other state-year
+    and of the order in which they are drawn."""
+    return np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(state, year)))
+
+
+def generate_year(year, target_dict, output_dir, n_per_state=N_PER_STATE, seed=SEED):
+    """Write one year's file (a worker task); return (path, rows)."""
+    frames = [
+        generate_state_year(state, year, get_target(state, year, target_dict),
+                            n_per_state, rng=state_year_rng(seed, state, year))
+        for state in ALL_STATES
+    ]
     year_df = pd.concat(frames, ignore_index=True)
-    outpath = OUTPUT_DIR / f"demographic_survey_{year}.csv"
-    year_df.to_csv(outpath, index=False)
-    print(f"  {outpath.name}: {len(year_df):,} rows, "
-          f"{year_df.state_fips.nunique()} states")
+    outpath = Path(output_dir) / f"demographic_survey_{year}.csv"
+    tmp = outpath.with_suffix(".tmp")
+    year_df.to_csv(tmp, index=False)
+    os.replace(tmp, outpath)
+    return outpath, len(year_df)
+
+
+def generate_parallel(output_dir=OUTPUT_DIR, n_per_state=N_PER_STATE, seed=SEED, jobs=None):
+    """Write the year files concurrently, one independent stream per state-year.
+
+    jobs is the number of worker processes (default: one per CPU, capped at
+    the number of years); jobs=1 writes every file in this process.
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    target_dict = load_targets()
+    jobs = jobs or min(len(ALL_YEARS), os.cpu_count() or 1)
+
+    if jobs == 1:
+        results = [generate_year(year, target_dict, output_dir, n_per_state, seed)
+                   for year in ALL_YEARS]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            results = list(pool.map(generate_year, ALL_YEARS, repeat(target_dict),
+                                    repeat(output_dir), repeat(n_per_state), repeat(seed)))
+    for outpath, rows in results:
+        print(f"  {outpath.name}: {rows:,} rows")
+
+    print(f"\nDone. Generated {len(ALL_YEARS)} files in {output_dir} with {jobs} worker(s)")
+    print(f"Total records: {sum(rows for _, rows in results):,}")
+
 
-print(f"\nDone. Generated {len(ALL_YEARS)} files in {OUTPUT_DIR}")
-print(f"Total records: {N_PER_STATE * len(ALL_STATES) * len(ALL_YEARS):,}")
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate the synthetic demographic survey files.")
+    parser.add_argument("--streams", action="store_true",
+                        help="one SeedSequence stream per state-year, years written in parallel "
+                             "(default: the global-RNG sequence that produced the shipped files)")
+    parser.add_argument("--jobs", type=int, default=None,
+                        help="worker processes with --streams (default: one per CPU)")
+    parser.add_argument("--n-per-state", type=int, default=N_PER_STATE,
+                        help=f"records per state-year (default: {N_PER_STATE})")
+    parser.add_argument("--output-dir", default=str(OUTPUT_DIR))
+    parser.add_argument("--seed", type=int, default=SEED)
+    args = parser.parse_args()
+    if args.streams:
+        generate_parallel(args.output_dir, args.n_per_state, args.seed, args.jobs)
+    else:
+        if args.jobs is not None:
+            parser.error("--jobs needs --streams (the global-RNG sequence is serial)")
+        generate(args.output_dir, args.n_per_state, args.seed)
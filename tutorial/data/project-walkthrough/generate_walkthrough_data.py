@@ -14,180 +14,214 @@ Dirty features requiring cleaning:
 
 Output: demographic_survey/ directory with 21 CSV files (1995-2015)
 
+The generator is vectorized: each year is drawn as (states x respondents)
+arrays, so every state-year is one contiguous block of rows, and the targets
+are hit in closed form (weights and incomes rescaled per block) or with
+calibrate.binary() (urban).  Files are written from Arrow string columns, so
+large samples for stress tests (--n-respondents 100000 gives ~10^8 rows)
+take minutes, not hours.
+
 After filtering (drop DC, drop years < 2000) and collapsing:
   50 states x 16 years = 800 state-year observations
   population = sum(weight), median_income = weighted mean, pct_urban = weighted mean
 """
 
+import argparse
+import os
+
 import numpy as np
 import pandas as pd
-import os
+
+import calibrate
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:          # fall back to pandas.to_csv
+    pa = pc = None
 
 OUTPUT_DIR = os.path.dirname(os.path.abspath(__file__))
 SEED = 143300
 N_RESPONDENTS = 200  # per state per year
+COLUMNS = ["state_fips", "age", "income", "urban", "weight"]
 
 
-def generate_demographic_survey():
-    rng = np.random.default_rng(seed=SEED)
-
-    # Read existing state demographics to match aggregates
+def load_reference():
+    """state_demographics (states 1-50, years 2000-2015): the collapse targets."""
     dta_candidates = [
+        os.path.join(OUTPUT_DIR, "state_demographics.dta"),
         os.path.join(OUTPUT_DIR, "..", "..", "..", "_site", "tutorial",
                      "data", "project-walkthrough", "pkg-stata", "build",
                      "input", "state_demographics.dta"),
         "/tmp/walkthrough-inspect/pkg-stata/build/input/state_demographics.dta",
         "/tmp/state_demographics_reference.csv",
     ]
-    state_demo = None
     for path in dta_candidates:
         if os.path.exists(path):
             if path.endswith(".csv"):
-                state_demo = pd.read_csv(path)
-            else:
-                state_demo = pd.read_stata(path)
-            break
-    if state_demo is None:
-        raise FileNotFoundError("Could not find state_demographics reference.")
-
-    all_rows = {}  # year -> list of rows
-
-    # --- States 1-50, years 2000-2015: must match existing values ---
-    for _, srow in state_demo.iterrows():
-        sfips = int(srow["state_fips"])
-        year = int(srow["year"])
-        state_pop = srow["population"]
-        state_income = srow["median_income"]
-        state_urban = srow["pct_urban"]
-
-        n = N_RESPONDENTS
-        base_weight = state_pop / n
-
-        # Generate individual weights (small variation around base)
-        weights = rng.uniform(0.8, 1.2, size=n) * base_weight
-        # Fix so sum = state_pop exactly
-        weights = weights * (state_pop / weights.sum())
-
-        # Generate individual incomes -> weighted mean must equal state_income
-        raw_incomes = rng.normal(state_income, state_income * 0.30, size=n)
-        raw_incomes = np.maximum(raw_incomes, 10000)
-        wmean = np.average(raw_incomes, weights=weights)
-        raw_incomes = raw_incomes * (state_income / wmean)
-        raw_incomes = np.round(raw_incomes).astype(int)
-
-        # Generate urban indicators -> weighted mean must equal state_urban
-        # Draw from Bernoulli, then adjust a few to match
-        urban = rng.binomial(1, state_urban, size=n)
-        actual_urban = np.average(urban, weights=weights)
-        # Fine-tune by flipping individuals until close enough
-        for _ in range(200):
-            actual_urban = np.average(urban, weights=weights)
-            if abs(actual_urban - state_urban) < 0.002:
-                break
-            if actual_urban < state_urban:
-                # Flip a random 0 to 1 (prefer low-weight for precision)
-                zeros = np.where(urban == 0)[0]
-                if len(zeros) > 0:
-                    urban[rng.choice(zeros)] = 1
-            else:
-                ones = np.where(urban == 1)[0]
-                if len(ones) > 0:
-                    urban[rng.choice(ones)] = 0
-
-        # Generate ages (not used in collapse, just for realism)
-        ages = rng.integers(18, 86, size=n)
-
-        if year not in all_rows:
-            all_rows[year] = []
-        for i in range(n):
-            all_rows[year].append({
-                "state_fips": sfips,
-                "age": int(ages[i]),
-                "income": f"${int(raw_incomes[i]):,}",
-                "urban": int(urban[i]),
-                "weight": round(float(weights[i]), 1),
-            })
-
-    # --- DC (state_fips=51), years 2000-2015 ---
-    for year in range(2000, 2016):
-        if year not in all_rows:
-            all_rows[year] = []
-        dc_pop = rng.integers(500000, 700000)
-        dc_income = rng.integers(60000, 80000)
-        dc_urban = 0.97
-        base_w = dc_pop / N_RESPONDENTS
-        for i in range(N_RESPONDENTS):
-            w = round(float(base_w * rng.uniform(0.8, 1.2)), 1)
-            inc = int(rng.normal(dc_income, dc_income * 0.25))
-            inc = max(15000, inc)
-            all_rows[year].append({
-                "state_fips": 51,
-                "age": int(rng.integers(18, 86)),
-                "income": f"${inc:,}",
-                "urban": int(rng.binomial(1, dc_urban)),
-                "weight": w,
-            })
-
-    # --- All states (1-51), years 1995-1999 ---
-    for year in range(1995, 2000):
-        all_rows[year] = []
-        for sfips in range(1, 52):
-            pop = rng.integers(800000, 5000000) if sfips <= 50 else \
-                rng.integers(500000, 700000)
-            inc_base = rng.integers(28000, 55000)
-            urb = rng.uniform(0.15, 0.90)
-            base_w = pop / N_RESPONDENTS
-            for i in range(N_RESPONDENTS):
-                w = round(float(base_w * rng.uniform(0.8, 1.2)), 1)
-                inc = max(10000, int(rng.normal(inc_base, inc_base * 0.25)))
-                all_rows[year].append({
-                    "state_fips": sfips,
-                    "age": int(rng.integers(18, 86)),
-                    "income": f"${inc:,}",
-                    "urban": int(rng.binomial(1, urb)),
-                    "weight": w,
-                })
-
-    # --- Write per-year CSV files ---
-    outdir = os.path.join(OUTPUT_DIR, "demographic_survey")
-    os.makedirs(outdir, exist_ok=True)
+                return pd.read_csv(path)
+            return pd.read_stata(path)
+    raise FileNotFoundError("Could not find state_demographics reference.")
+
+
+def state_years(state_demo, rng):
+    """One row per state-year with its population, income and urban targets.
+
+    matched rows (states 1-50, 2000-2015) must collapse back to
+    state_demographics; DC (2000-2015) and every state in 1995-1999 get
+    random targets and are not rescaled.  income_sd and income_floor set the
+    income distribution around the target.
+    """
+    matched = pd.DataFrame({
+        "state_fips": state_demo["state_fips"].astype(int),
+        "year": state_demo["year"].astype(int),
+        "population": state_demo["population"].astype(float),
+        "median_income": state_demo["median_income"].astype(float),
+        "pct_urban": state_demo["pct_urban"].astype(float),
+        "matched": True, "income_sd": 0.30, "income_floor": 10000,
+    })
+
+    dc_years = np.arange(2000, 2016)
+    dc = pd.DataFrame({
+        "state_fips": 51, "year": dc_years,
+        "population": rng.integers(500000, 700000, len(dc_years)).astype(float),
+        "median_income": rng.integers(60000, 80000, len(dc_years)).astype(float),
+        "pct_urban": 0.97,
+        "matched": False, "income_sd": 0.25, "income_floor": 15000,
+    })
+
+    year, state = np.meshgrid(np.arange(1995, 2000), np.arange(1, 52), indexing="ij")
+    year, state = year.ravel(), state.ravel()
+    early = pd.DataFrame({
+        "state_fips": state, "year": year,
+        "population": np.where(state <= 50, rng.integers(800000, 5000000, len(state)),
+                               rng.integers(500000, 700000, len(state))).astype(float),
+        "median_income": rng.integers(28000, 55000, len(state)).astype(float),
+        "pct_urban": rng.uniform(0.15, 0.90, len(state)),
+        "matched": False, "income_sd": 0.25, "income_floor": 10000,
+    })
+
+    cells = pd.concat([matched, dc, early], ignore_index=True)
+    return cells.sort_values(["year", "state_fips"], ignore_index=True)
+
+
+def draw_year(cells, n, rng):
+    """Respondents for one year's state-year cells, as flat column arrays."""
+    matched = cells["matched"].to_numpy(dtype=bool)
+    pop = cells["population"].to_numpy()[:, None]
+    target_income = cells["median_income"].to_numpy()[:, None]
+    target_urban = cells["pct_urban"].to_numpy()
+
+    # Weights: small variation around pop / n; matched cells sum to pop exactly
+    weights = rng.uniform(0.8, 1.2, size=(len(cells), n)) * (pop / n)
+    weights[matched] *= pop[matched] / weights[matched].sum(axis=1, keepdims=True)
+
+    # Incomes: matched cells rescaled so the weighted mean is the target
+    incomes = rng.normal(target_income, target_income * cells["income_sd"].to_numpy()[:, None],
+                         size=(len(cells), n))
+    incomes = np.maximum(incomes, cells["income_floor"].to_numpy()[:, None])
+    wmean = np.average(incomes[matched], weights=weights[matched], axis=1)
+    incomes[matched] *= target_income[matched] / wmean[:, None]
+
+    # Urban: Bernoulli draws, then matched cells corrected towards the target
+    urban = rng.random((len(cells), n)) < target_urban[:, None]
+    urban[matched] = calibrate.binary(urban[matched], weights[matched],
+                                      target_urban[matched], rng=rng)
+
+    # Ages (not used in collapse, just for realism)
+    ages = rng.integers(18, 86, size=(len(cells), n))
+
+    return {
+        "state_fips": np.repeat(cells["state_fips"].to_numpy(), n),
+        "age": ages.ravel(),
+        "income": np.rint(incomes).astype(np.int64).ravel(),
+        "urban": urban.ravel().astype(np.int8),
+        "weight": weights.ravel(),
+    }
 
-    total_rows = 0
-    for year in sorted(all_rows.keys()):
-        df_year = pd.DataFrame(all_rows[year])
-        df_year = df_year.sort_values(["state_fips"]).reset_index(drop=True)
-        outpath = os.path.join(outdir, f"demographic_survey_{year}.csv")
-        df_year.to_csv(outpath, index=False)
-        total_rows += len(df_year)
-
-    print(f"Generated {len(all_rows)} per-year CSV files in demographic_survey/")
-    print(f"  Total rows: {total_rows:,}")
-    print(f"  Years: {min(all_rows.keys())}-{max(all_rows.keys())}")
 
-    # --- Verify aggregation for states 1-50, years 2000-2015 ---
+# ─── CSV writing ──────────────────────────────────────────────────────────────
+
+def _text(values):
+    return pc.cast(pa.array(values), pa.large_string())
+
+
+def _join(*parts, sep=""):
+    """Element-wise concatenation of string arrays and literals."""
+    parts = [pa.scalar(x, pa.large_string()) if isinstance(x, str) else x for x in parts]
+    return pc.binary_join_element_wise(*parts, pa.scalar(sep, pa.large_string()))
+
+
+def _dollars(amount):
+    """'$45,230'-style strings for non-negative integer amounts."""
+    rest = amount // 1000
+    text = _text(amount % 1000)
+    text = pc.if_else(pa.array(rest > 0), pc.utf8_lpad(text, width=3, padding="0"), text)
+    while (rest > 0).any():
+        more = pa.array(rest > 0)
+        group, rest = rest % 1000, rest // 1000
+        digits = _text(group)
+        digits = pc.if_else(pa.array(rest > 0), pc.utf8_lpad(digits, width=3, padding="0"), digits)
+        text = pc.if_else(more, _join(digits, text, sep=","), text)
+    return _join("$", text)
+
+
+def _quote_commas(text, has_comma):
+    """CSV-quote the strings that contain a comma, as pandas does."""
+    return pc.if_else(pa.array(has_comma), _join('"', text, '"'), text)
+
+
+def write_csv(path, columns):
+    """Write the columns from draw_year() in the format pandas.to_csv gives:
+    income as a quoted "$45,230" string, weight rounded to 0.1."""
+    if pa is None:
+        df = pd.DataFrame(columns)
+        df["income"] = df["income"].map("${:,}".format)
+        df["weight"] = df["weight"].round(1)
+        df[COLUMNS].to_csv(path, index=False)
+        return
+
+    tenths = np.rint(columns["weight"] * 10).astype(np.int64)
+    fields = {
+        "state_fips": _text(columns["state_fips"]),
+        "age": _text(columns["age"]),
+        "income": _quote_commas(_dollars(columns["income"]), columns["income"] >= 1000),
+        "urban": _text(columns["urban"]),
+        "weight": _join(_text(tenths // 10), _text(tenths % 10), sep="."),
+    }
+    lines = _join(*(fields[c] for c in COLUMNS), sep=",")
+    lines = _join(lines, "\n")
+
+    # The lines are one contiguous buffer; write it in a single call
+    offsets = np.frombuffer(lines.buffers()[1], dtype=np.int64)
+    start, stop = offsets[lines.offset], offsets[lines.offset + len(lines)]
+    with open(path, "wb") as f:
+        f.write((",".join(COLUMNS) + "\n").encode())
+        f.write(memoryview(lines.buffers()[2])[start:stop])
+
+
+# ─── Main ─────────────────────────────────────────────────────────────────────
+
+def verify_collapse(outdir, state_demo):
+    """Re-read 2000-2015 and check the weighted collapse against the targets."""
     frames = []
     for year in range(2000, 2016):
         fp = os.path.join(outdir, f"demographic_survey_{year}.csv")
         d = pd.read_csv(fp)
-        d["year"] = year
-        d["income_num"] = (
-            d["income"].str.replace("$", "", regex=False)
-            .str.replace(",", "", regex=False).astype(float)
-        )
-        frames.append(d)
-    verify = pd.concat(frames, ignore_index=True)
-    verify = verify[verify["state_fips"] <= 50]
-
-    agg = verify.groupby(["state_fips", "year"]).apply(
-        lambda g: pd.Series({
-            "population": g["weight"].sum(),
-            "median_income": np.average(g["income_num"], weights=g["weight"]),
-            "pct_urban": np.average(g["urban"], weights=g["weight"]),
-        }),
-        include_groups=False,
-    ).reset_index()
-
-    merged = agg.merge(
+        d = d[d["state_fips"] <= 50]
+        income = (d["income"].str.replace("$", "", regex=False)
+                  .str.replace(",", "", regex=False).astype(float))
+        frames.append(pd.DataFrame({
+            "state_fips": d["state_fips"], "year": year,
+            "population": d["weight"],
+            "income_w": income * d["weight"],
+            "urban_w": d["urban"] * d["weight"],
+        }))
+    agg = pd.concat(frames, ignore_index=True).groupby(["state_fips", "year"]).sum()
+    agg["median_income"] = agg.pop("income_w") / agg["population"]
+    agg["pct_urban"] = agg.pop("urban_w") / agg["population"]
+
+    merged = agg.reset_index().merge(
         state_demo, on=["state_fips", "year"], suffixes=("_agg", "_orig")
     )
     pop_ok = np.allclose(merged["population_agg"], merged["population_orig"],
@@ -207,6 +241,41 @@ def generate_demographic_survey():
         print(f"  Worst income diff: {worst_inc:.1f}")
 
 
+def generate_demographic_survey(n_respondents=N_RESPONDENTS, outdir=None, seed=SEED,
+                                verify=True):
+    """Write demographic_survey_YYYY.csv for 1995-2015, n_respondents per state-year."""
+    rng = np.random.default_rng(seed=seed)
+    state_demo = load_reference()
+    cells = state_years(state_demo, rng)
+
+    outdir = outdir or os.path.join(OUTPUT_DIR, "demographic_survey")
+    os.makedirs(outdir, exist_ok=True)
+
+    total_rows = 0
+    years = sorted(cells["year"].unique())
+    for year in years:
+        columns = draw_year(cells[cells["year"] == year], n_respondents, rng)
+        write_csv(os.path.join(outdir, f"demographic_survey_{year}.csv"), columns)
+        total_rows += len(columns["state_fips"])
+
+    print(f"Generated {len(years)} per-year CSV files in {outdir}")
+    print(f"  Total rows: {total_rows:,}")
+    print(f"  Years: {years[0]}-{years[-1]}")
+
+    if verify:
+        verify_collapse(outdir, state_demo)
+
+
 if __name__ == "__main__":
-    generate_demographic_survey()
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--n-respondents", type=int, default=N_RESPONDENTS,
+                        help=f"respondents per state-year (default: {N_RESPONDENTS})")
+    parser.add_argument("--outdir", default=None,
+                        help="output folder (default: demographic_survey/ next to this script)")
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--no-verify", action="store_true",
+                        help="skip re-reading the files to check the collapse")
+    args = parser.parse_args()
+    generate_demographic_survey(args.n_respondents, args.outdir, args.seed,
+                                verify=not args.no_verify)
     print("\nDone!")
@@ -11,9 +11,16 @@ and cluster-robust standard errors (clustered by state):
       log_fatal ~ post_treated + log_pop + median_income + pct_urban
                | state_fips + year
 
+  Models 3-4 – Poisson (PPML) on the count itself, same right-hand sides:
+      fatal_crashes ~ post_treated [+ controls] | state_fips + year
+
 The key treatment indicator is `post_treated` (= 1 for treated states in
-post-adoption years, 0 otherwise).  The outcome is log(fatal_crashes + 1)
-to handle zeros while preserving a percentage-change interpretation.
+post-adoption years, 0 otherwise).  The outcome of models 1-2 is
+log(fatal_crashes + 1) to handle zeros while preserving a
+percentage-change interpretation; models 3-4 avoid the + 1 by modelling
+the count directly (hdfe.fepois(), analysis/code/hdfe.py), and their
+coefficients are proportional effects too.  The comparison table covers
+models 1-2; the PPML summaries follow it in dd_results.txt.
 
 Output: analysis/output/tables/dd_results.txt
         analysis/output/tables/dd_results.tex
@@ -32,6 +39,8 @@ try:
 except ImportError:
     raise ImportError("pyfixest not installed — run: pip install pyfixest")
 
+import hdfe  # high-dimensional FE solver, OLS and Poisson (analysis/code/hdfe.py)
+
 ROOT = Path(os.environ.get("PROJECT_ROOT", Path(__file__).parent.parent.parent))
 
 # ─── Paths ────────────────────────────────────────────────────────────────────
@@ -99,6 +108,28 @@ print("SIDE-BY-SIDE COMPARISON")
 print("=" * 60)
 pf.etable([m1, m2])
 
+# ─── Models 3-4: Poisson (PPML) on the count ──────────────────────────────────
+print("\n" + "-" * 60)
+print("MODELS 3-4: Poisson (PPML) on fatal_crashes")
+print("  fatal_crashes ~ post_treated [+ controls] | state_fips + year")
+print("-" * 60)
+
+m3 = hdfe.fepois(
+    "fatal_crashes ~ post_treated | state_fips + year",
+    data=df,
+    vcov={"CRV1": "state_fips"},
+)
+m3.summary()
+
+# Same rows as m3, so m3's fitted means are a good place to start the IRLS
+m4 = hdfe.fepois(
+    "fatal_crashes ~ post_treated + log_pop + median_income + pct_urban | state_fips + year",
+    data=df,
+    vcov={"CRV1": "state_fips"},
+    start=m3,
+)
+m4.summary()
+
 # ─── Save output ──────────────────────────────────────────────────────────────
 def capture(fn):
     """Capture printed output of a callable into a string."""
@@ -129,6 +160,17 @@ with open(output_file, "w") as f:
     f.write("-" * 80 + "\n")
     f.write(capture(lambda: pf.etable([m1, m2])) + "\n")
 
+    f.write("MODEL 3: Poisson (PPML), no controls\n")
+    f.write("  fatal_crashes ~ post_treated | state_fips + year\n")
+    f.write("-" * 80 + "\n")
+    f.write(capture(m3.summary) + "\n")
+
+    f.write("MODEL 4: Poisson (PPML), with controls\n")
+    f.write("  fatal_crashes ~ post_treated + log_pop + median_income\n")
+    f.write("                + pct_urban | state_fips + year\n")
+    f.write("-" * 80 + "\n")
+    f.write(capture(m4.summary) + "\n")
+
 # ─── Save LaTeX output ──────────────────────────────────────────────────────
 tex = pf.etable([m1, m2], type="tex", labels={
     "post_treated": r"Treatment $\times$ Post",
@@ -142,6 +184,6 @@ with open(output_tex, "w") as f:
 
 print(f"\nSaved: {output_file.relative_to(ROOT)}")
 print(f"Saved: {output_tex.relative_to(ROOT)}")
-print("  Models estimated: 2 (no controls, with controls)")
+print("  Models estimated: 4 (OLS and PPML, each without and with controls)")
 print("  SE type: cluster-robust (CRV1) by state_fips")
-print("  Outcome: log(fatal_crashes + 1)")
+print("  Outcome: log(fatal_crashes + 1) for OLS, fatal_crashes for PPML")
@@ -17,16 +17,27 @@ Approach:
 If pre-treatment coefficients (et_m5 through et_m2) are near zero, this
 supports the parallel trends assumption underlying the DD design.
 
-Output: analysis/output/figures/event_study.png
+Influence: the event-time coefficients are recomputed without each state
+and without each adoption cohort (hdfe.jackknife(), exact, no refits), to
+show whether one state or cohort drives the path.
+
+Outputs:
+  - analysis/output/figures/event_study.png (+ event_study_thumb.png, .pdf, .svg)
+  - analysis/output/figures/event_study_influence.png (+ thumb, .pdf, .svg)
+  - analysis/output/tables/event_study_influence.csv
 """
 
 import os
 from pathlib import Path
 
-import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
 
+import es_plot  # shared event-study plotting helpers (analysis/code/es_plot.py)
+import figure_export  # multi-format figure export (analysis/code/figure_export.py)
+import hdfe  # high-dimensional FE solver; jackknife() for the influence analysis
+import influence  # leave-one-out tables and figures (analysis/code/influence.py)
+
 try:
     import pyfixest as pf
 except ImportError:
@@ -37,6 +48,8 @@ ROOT = Path(os.environ.get("PROJECT_ROOT", Path(__file__).parent.parent.parent))
 # ─── Paths ────────────────────────────────────────────────────────────────────
 input_file   = ROOT / "build/output/analysis_panel.csv"
 output_plot  = ROOT / "analysis/output/figures/event_study.png"
+output_infl  = ROOT / "analysis/output/figures/event_study_influence.png"
+output_jk    = ROOT / "analysis/output/tables/event_study_influence.csv"
 
 print("=" * 60)
 print("SCRIPT 03: EVENT STUDY")
@@ -115,43 +128,76 @@ print("-" * 60)
 print(coef_df[["t", "coef", "se", "ci_lo", "ci_hi"]].to_string(index=False))
 
 # ─── Plot ─────────────────────────────────────────────────────────────────────
-fig, ax = plt.subplots(figsize=(10, 6))
-
-# Shaded confidence-interval ribbon
-ax.fill_between(
-    coef_df["t"],
-    coef_df["ci_lo"],
-    coef_df["ci_hi"],
-    alpha=0.20,
+# es_plot (shared with the other event-study figures) draws the CI ribbon,
+# point estimates and reference lines, and skips the render when the
+# coefficients are unchanged since the last run.
+panel = es_plot.panel(
+    coef_df.rename(columns={"t": "event_time", "coef": "coefficient",
+                            "ci_lo": "ci_lower", "ci_hi": "ci_upper"}),
     color="steelblue",
-    label="95% CI",
+    title="Event Study: Dynamic Effect of Policy on Fatal Crashes",
+    title_size=13,
+    xlabel="Years Relative to Policy Adoption",
+    ylabel="Coefficient (log fatal crashes)",
+    xticks=event_times,
+    markersize=7,
+    linewidth=1.5,
+    ci_alpha=0.20,
+    zero_line={"color": "black", "linewidth": 0.9},
+    treat_line={"color": "firebrick", "linestyle": "--", "linewidth": 1.5, "alpha": 0.8},
+    grid={"alpha": 0.25, "linestyle": "--"},
+    despine=False,
+    legend=True,
 )
+es_plot.render_all([es_plot.figure(output_plot, [panel], figsize=(10, 6))])
 
-# Connecting line
-ax.plot(coef_df["t"], coef_df["coef"], color="steelblue", linewidth=1.5, zorder=2)
-
-# Point estimates
-ax.scatter(coef_df["t"], coef_df["coef"], color="steelblue", s=50, zorder=3,
-           label="Point estimate")
+print(f"\nSaved: {output_plot.relative_to(ROOT)}")
+print("  Reference period: t = -1 (coef fixed at 0)")
+print("  CI ribbon: +/- 1.96 * SE")
 
-# Reference lines
-ax.axhline(0, color="black", linewidth=0.9)
-ax.axvline(-0.5, color="firebrick", linestyle="--", linewidth=1.5, alpha=0.8,
-           label="Policy adoption")
+# ─── Influence: leave one state / one cohort out ──────────────────────────────
+# The same regression without each state and without each adoption cohort
+# (never-treated states form one cohort), from downdated cross-products.
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
 
-ax.set_xticks(event_times)
-ax.set_xlabel("Years Relative to Policy Adoption", fontsize=12)
-ax.set_ylabel("Coefficient (log fatal crashes)", fontsize=12)
-ax.set_title("Event Study: Dynamic Effect of Policy on Fatal Crashes",
-             fontsize=13, pad=14)
-ax.legend(frameon=True)
-ax.grid(True, alpha=0.25, linestyle="--")
+df["cohort"] = df["adoption_year"].map(lambda y: "never treated" if pd.isna(y) else str(int(y)))
+et_map = {et_name(t): t for t in event_times if t != -1}
+names = df.drop_duplicates("state_fips").set_index("state_fips")["state_name"].to_dict()
 
-plt.tight_layout()
-output_plot.parent.mkdir(parents=True, exist_ok=True)
-plt.savefig(output_plot, dpi=300, bbox_inches="tight")
-plt.close()
+jackknives = []
+for dropped, column in [("state", "state_fips"), ("cohort", "cohort")]:
+    jk = hdfe.jackknife(formula, df, column, vcov={"CRV1": "state_fips"})
+    jk = jk[jk["coefficient"].isin(et_map)]
+    jackknives.append(jk.assign(dropped=dropped, event_time=jk["coefficient"].map(et_map)))
+jk_all = pd.concat(jackknives, ignore_index=True)
+jk_all = jk_all[["dropped", "group", "n_obs", "coefficient", "event_time",
+                 "estimate", "jackknife", "change", "dfbeta"]]
+jk_all.to_csv(output_jk, index=False)
 
-print(f"\nSaved: {output_plot.relative_to(ROOT)}")
-print("  Reference period: t = -1 (coef fixed at 0)")
-print("  CI ribbon: +/- 1.96 * SE")
+print("\n" + "-" * 60)
+print("INFLUENCE (|DFBETA| > 2/sqrt(G) at any event time)")
+print("-" * 60)
+for dropped, jk in jk_all.groupby("dropped", sort=False):
+    top = influence.influential(jk).drop_duplicates("group").head(5)
+    print(f"  Leave one {dropped} out ({jk['group'].nunique()} groups):")
+    for _, r in top.iterrows():
+        name = names.get(r["group"], r["group"]) if dropped == "state" else r["group"]
+        print(f"    without {str(name):16} t={int(r['event_time']):+d}: "
+              f"{r['estimate']:.4f} -> {r['jackknife']:.4f}  (DFBETA {r['dfbeta']:+.2f})")
+    if top.empty:
+        print("    none")
+
+fig, axes = plt.subplots(1, 2, figsize=(14, 5.5), sharey=True, layout="constrained")
+for ax, dropped in zip(axes, ["state", "cohort"]):
+    influence.event_study(ax, jk_all[jk_all["dropped"] == dropped], et_map,
+                          title=f"Leave one {dropped} out",
+                          labels=names if dropped == "state" else None)
+    ax.set_xlabel("Years Relative to Policy Adoption")
+fig.suptitle("Event Study Influence: Fatal Crashes", fontsize=13)
+figure_export.export(fig, output_infl, dpi=300)
+plt.close(fig)
+
+print(f"\nSaved: {output_infl.relative_to(ROOT)}")
+print(f"Saved: {output_jk.relative_to(ROOT)}")
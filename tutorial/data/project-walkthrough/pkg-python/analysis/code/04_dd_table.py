@@ -12,12 +12,23 @@ Models:
   m3 – Southern states only
   m4 – Non-Southern states only
   m5 – Alternative outcome (serious_crashes, levels)
+  m6 – Baseline with state-specific linear trends
 
 All models use state and year fixed effects.  Models m1-m4 cluster SEs
-by state; m5 also clusters by state.
+by state; m5 also clusters by state.  m6 adds a slope on year for every
+state (state_fips[year]), which pyfixest cannot absorb, so it is fitted
+with hdfe.feols() (analysis/code/hdfe.py, same formula syntax).
+
+The subsamples are boolean masks over one base design (subsample.py)
+rather than copies of the panel: m3 and m4 are fitted from the South and
+non-South masks, and so is a region x period x outcome grid of the
+baseline model, where each sample is demeaned once for both outcomes.
+The side-by-side table comes from subsample.etable(), which takes the
+pyfixest and hdfe results alike.
 
 Output: analysis/output/tables/dd_table.txt
         analysis/output/tables/dd_table.tex
+        analysis/output/tables/dd_subsamples.csv
 """
 
 import io
@@ -33,12 +44,16 @@ try:
 except ImportError:
     raise ImportError("pyfixest not installed — run: pip install pyfixest")
 
+import hdfe       # high-dimensional FE solver (analysis/code/hdfe.py)
+import subsample  # masked subsamples of one design (analysis/code/subsample.py)
+
 ROOT = Path(os.environ.get("PROJECT_ROOT", Path(__file__).parent.parent.parent))
 
 # ─── Paths ────────────────────────────────────────────────────────────────────
 input_file  = ROOT / "build/output/analysis_panel.csv"
 output_file = ROOT / "analysis/output/tables/dd_table.txt"
 output_tex  = ROOT / "analysis/output/tables/dd_table.tex"
+output_grid = ROOT / "analysis/output/tables/dd_subsamples.csv"
 
 print("=" * 60)
 print("SCRIPT 04: MULTI-COLUMN DD TABLE")
@@ -55,13 +70,18 @@ df["post_treated"] = (
     (df["policy_adopted"] == 1) & (df["year"] >= df["adoption_year"])
 ).astype(int)
 
-# ─── Subsets for robustness ───────────────────────────────────────────────────
-df_south     = df[df["region"] == "South"].copy()
-df_non_south = df[df["region"] != "South"].copy()
+# ─── Subsamples for robustness ────────────────────────────────────────────────
+# One design holds the columns every subsample model uses; a subsample is a
+# mask over its rows, not a copy of the panel.
+design = subsample.Design(
+    df, ["fatal_crashes", "serious_crashes", "post_treated"],
+    fixef=["state_fips", "year"], vcov={"CRV1": "state_fips"},
+)
+south = (df["region"] == "South").to_numpy()
 
 print(f"\n  Full sample:      {len(df):,} obs")
-print(f"  South only:       {len(df_south):,} obs")
-print(f"  Non-South only:   {len(df_non_south):,} obs")
+print(f"  South only:       {south.sum():,} obs")
+print(f"  Non-South only:   {(~south).sum():,} obs")
 
 # ─── Model 1: Baseline — no controls ──────────────────────────────────────────
 print("\n" + "-" * 60)
@@ -95,11 +115,7 @@ print("MODEL 3: South subsample")
 print("  fatal_crashes ~ post_treated | state_fips + year  [South only]")
 print("-" * 60)
 
-m3 = pf.feols(
-    "fatal_crashes ~ post_treated | state_fips + year",
-    data=df_south,
-    vcov={"CRV1": "state_fips"},
-)
+m3 = design.sample(south).fit("fatal_crashes", ["post_treated"])
 m3.summary()
 
 # ─── Model 4: Non-South subsample ─────────────────────────────────────────────
@@ -108,11 +124,7 @@ print("MODEL 4: Non-South subsample")
 print("  fatal_crashes ~ post_treated | state_fips + year  [Non-South only]")
 print("-" * 60)
 
-m4 = pf.feols(
-    "fatal_crashes ~ post_treated | state_fips + year",
-    data=df_non_south,
-    vcov={"CRV1": "state_fips"},
-)
+m4 = design.sample(~south).fit("fatal_crashes", ["post_treated"])
 m4.summary()
 
 # ─── Model 5: Alternative outcome — serious crashes ───────────────────────────
@@ -128,11 +140,51 @@ m5 = pf.feols(
 )
 m5.summary()
 
+# ─── Model 6: State-specific linear trends ────────────────────────────────────
+print("\n" + "-" * 60)
+print("MODEL 6: State-specific linear trends")
+print("  fatal_crashes ~ post_treated | state_fips[year] + year")
+print("-" * 60)
+
+m6 = hdfe.feols(
+    "fatal_crashes ~ post_treated | state_fips[year] + year",
+    data=df,
+    vcov={"CRV1": "state_fips"},
+)
+m6.summary()
+
+# ─── Subsample grid ───────────────────────────────────────────────────────────
+# The baseline model by region x period x outcome: 18 samples, each demeaned
+# once (cached in design) and shared by both outcomes.
+print("\n" + "-" * 60)
+print("SUBSAMPLE GRID: region x period x outcome")
+print("  outcome ~ post_treated | state_fips + year")
+print("-" * 60)
+
+regions = {"All": np.ones(len(df), dtype=bool), "South": south, "Non-South": ~south}
+regions.update({r: (df["region"] == r).to_numpy()
+                for r in sorted(df["region"].unique()) if r != "South"})
+periods = {
+    f"{df['year'].min()}-{df['year'].max()}": np.ones(len(df), dtype=bool),
+    f"{df['year'].min()}-2010": (df["year"] <= 2010).to_numpy(),
+    f"2005-{df['year'].max()}": (df["year"] >= 2005).to_numpy(),
+}
+samples = {(r, p): rm & pm for r, rm in regions.items() for p, pm in periods.items()}
+grid = subsample.grid(design, samples, ["fatal_crashes", "serious_crashes"], ["post_treated"])
+grid = grid.rename(columns={"sample_0": "region", "sample_1": "period"})
+grid.to_csv(output_grid, index=False)
+
+for _, r in grid.iterrows():
+    print(f"  {r['region']:10} {r['period']:10} {r['outcome']:16} {r['coefficient']:8.3f} "
+          f"({r['std_error']:.3f})  p={r['pvalue']:.3f}  N={r['n_obs']:,}")
+
 # ─── Side-by-side comparison ──────────────────────────────────────────────────
 print("\n" + "=" * 60)
 print("SIDE-BY-SIDE COMPARISON (etable)")
 print("=" * 60)
-pf.etable([m1, m2, m3, m4, m5])
+models = [m1, m2, m3, m4, m5, m6]
+notes = ["(3) South only; (4) non-South only; (6) state-specific linear trends."]
+print(subsample.etable(models, notes=notes))
 
 # ─── Save output ──────────────────────────────────────────────────────────────
 def capture(fn):
@@ -173,12 +225,21 @@ with open(output_file, "w") as f:
     f.write("-" * 80 + "\n")
     f.write(capture(m5.summary) + "\n")
 
+    f.write("MODEL 6: State-specific linear trends\n")
+    f.write("  fatal_crashes ~ post_treated | state_fips[year] + year\n")
+    f.write("-" * 80 + "\n")
+    f.write(capture(m6.summary) + "\n")
+
     f.write("SIDE-BY-SIDE COMPARISON\n")
     f.write("-" * 80 + "\n")
-    f.write(capture(lambda: pf.etable([m1, m2, m3, m4, m5])) + "\n")
+    f.write(subsample.etable(models, notes=notes) + "\n\n")
+
+    f.write("SUBSAMPLE GRID (region x period x outcome)\n")
+    f.write("-" * 80 + "\n")
+    f.write(grid.to_string(index=False) + "\n")
 
 # ─── Save LaTeX output ──────────────────────────────────────────────────────
-tex = pf.etable([m1, m2, m3, m4, m5], type="tex", labels={
+tex = subsample.etable(models, type="tex", notes=notes, labels={
     "post_treated": r"Treatment $\times$ Post",
     "log_pop": "log(Population)",
     "median_income": "Median Income",
@@ -190,5 +251,7 @@ with open(output_tex, "w") as f:
 
 print(f"\nSaved: {output_file.relative_to(ROOT)}")
 print(f"Saved: {output_tex.relative_to(ROOT)}")
-print("  Models: 5 (baseline, controls, South, Non-South, serious crashes)")
+print(f"Saved: {output_grid.relative_to(ROOT)}")
+print("  Models: 6 (baseline, controls, South, Non-South, serious crashes, state trends)")
+print(f"  Subsample grid: {len(grid)} models on {len(samples)} masked samples")
 print("  SE type: cluster-robust (CRV1) by state_fips")
@@ -18,25 +18,28 @@ Steps:
   3. OLS — naive (biased) estimate of class_size effect
   4. 2SLS — IV estimate using enrollment as instrument for class_size
   5. Compare OLS vs IV and interpret the difference
+  6. Weak-instrument diagnostics — robust and effective first-stage F,
+     Anderson-Rubin confidence set, and overidentification tests with a
+     second instrument (enrollment squared)
+
+All four regressions of each specification come from one QR factorization
+(see iv_engine.py).  SEs are heteroskedasticity-robust (HC1).
 
 Data: analysis/code/iv_data.csv
   - school_id, enrollment, class_size, test_score, pct_disadvantaged
 
 Output: analysis/output/tables/iv_results.txt
         analysis/output/tables/iv_results.tex
+        analysis/output/tables/iv_anderson_rubin.csv
 """
 
-import io
 import os
-from contextlib import redirect_stdout
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
 
-try:
-    import pyfixest as pf
-except ImportError:
-    raise ImportError("pyfixest not installed — run: pip install pyfixest")
+import iv_engine  # IV estimation and diagnostics (analysis/code/iv_engine.py)
 
 ROOT = Path(os.environ.get("PROJECT_ROOT", Path(__file__).parent.parent.parent))
 
@@ -44,6 +47,7 @@ ROOT = Path(os.environ.get("PROJECT_ROOT", Path(__file__).parent.parent.parent))
 input_file  = ROOT / "analysis/code/iv_data.csv"
 output_file = ROOT / "analysis/output/tables/iv_results.txt"
 output_tex  = ROOT / "analysis/output/tables/iv_results.tex"
+output_ar   = ROOT / "analysis/output/tables/iv_anderson_rubin.csv"
 
 print("=" * 60)
 print("SCRIPT 05: INSTRUMENTAL VARIABLES REGRESSION")
@@ -57,6 +61,32 @@ print("\nVariables:")
 for col in df.columns:
     print(f"  {col}: mean={df[col].mean():.2f}, sd={df[col].std():.2f}")
 
+# Second instrument for the overidentified specification: a nonlinear
+# function of the same enrollment variable, so the exclusion restriction is
+# unchanged.  Scaled by 1/100 to keep its coefficient readable.
+df["enrollment_sq"] = df["enrollment"] ** 2 / 100
+
+
+def format_fit(res):
+    """Coefficient table for one regression, as text."""
+    lines = [f"  {'':<20} {'Estimate':>10} {'Std. Error':>11} {'t value':>9} {'Pr(>|t|)':>9}"]
+    for name in res["coef"].index:
+        b, se, p = res["coef"][name], res["se"][name], res["pvalue"][name]
+        lines.append(f"  {name:<20} {b:>10.4f} {se:>11.4f} {b / se:>9.3f} {p:>9.4f}")
+    r2 = "" if np.isnan(res["r2"]) else f"   R2: {res['r2']:.3f}"
+    lines.append(f"  Observations: {res['nobs']:,}{r2}   (HC1 SEs)")
+    return "\n".join(lines) + "\n"
+
+
+# ─── Estimation ───────────────────────────────────────────────────────────────
+# One call fits the first stage, reduced form, OLS and 2SLS from a single QR
+# factorization of [controls, instruments, class_size, test_score].
+iv = iv_engine.iv_suite(df, "test_score", "class_size",
+                        instruments=["enrollment"], controls=["pct_disadvantaged"])
+first_stage, reduced_form = iv["first_stage"], iv["reduced_form"]
+ols_model, iv_model = iv["ols"], iv["tsls"]
+diag = iv["diagnostics"]
+
 # ─── Step 1: First stage ──────────────────────────────────────────────────────
 # Does enrollment predict class size?  We expect larger schools to have
 # larger classes on average (a mechanical relationship).
@@ -65,20 +95,14 @@ print("STEP 1: FIRST STAGE")
 print("  class_size ~ enrollment + pct_disadvantaged")
 print("  (Does the instrument predict the endogenous variable?)")
 print("-" * 60)
+print(format_fit(first_stage))
 
-first_stage = pf.feols(
-    "class_size ~ enrollment + pct_disadvantaged",
-    data=df,
-    vcov="hetero",   # heteroskedasticity-robust SEs (no clustering — cross-sectional)
-)
-first_stage.summary()
-
-# Compute first-stage F-statistic for the instrument
-enrollment_coef = first_stage.coef()["enrollment"]
-enrollment_se   = first_stage.se()["enrollment"]
-f_stat = (enrollment_coef / enrollment_se) ** 2
+# First-stage F-statistic for the instrument (robust Wald; with one
+# instrument this is the squared robust t-statistic)
+f_stat = diag["robust_f"]
 
-print(f"\n  First-stage F-statistic on instrument: {f_stat:.2f}")
+print(f"  First-stage F-statistic on instrument: {f_stat:.2f}")
+print(f"  Effective F (Montiel Olea-Pflueger):   {diag['effective_f']:.2f}")
 if f_stat >= 20:
     print("  Strong instrument (F >= 20)")
 elif f_stat >= 10:
@@ -95,13 +119,7 @@ print("STEP 2: REDUCED FORM")
 print("  test_score ~ enrollment + pct_disadvantaged")
 print("  (Does the instrument affect the outcome?)")
 print("-" * 60)
-
-reduced_form = pf.feols(
-    "test_score ~ enrollment + pct_disadvantaged",
-    data=df,
-    vcov="hetero",
-)
-reduced_form.summary()
+print(format_fit(reduced_form))
 
 # ─── Step 3: OLS (biased) ─────────────────────────────────────────────────────
 # OLS ignores the endogeneity of class_size.  If higher-ability students sort
@@ -112,37 +130,23 @@ print("STEP 3: OLS (LIKELY BIASED)")
 print("  test_score ~ class_size + pct_disadvantaged")
 print("  (class_size is endogenous — OLS estimate is not causal)")
 print("-" * 60)
-
-ols_model = pf.feols(
-    "test_score ~ class_size + pct_disadvantaged",
-    data=df,
-    vcov="hetero",
-)
-ols_model.summary()
+print(format_fit(ols_model))
 
 # ─── Step 4: 2SLS ─────────────────────────────────────────────────────────────
-# pyfixest IV syntax: "y ~ exog_controls | FE | endog ~ instrument"
-# Here we have no fixed effects (use 0), controls = pct_disadvantaged,
-# endogenous = class_size, instrument = enrollment.
+# Controls = pct_disadvantaged, endogenous = class_size, instrument = enrollment.
 print("\n" + "-" * 60)
 print("STEP 4: TWO-STAGE LEAST SQUARES (2SLS)")
 print("  test_score ~ pct_disadvantaged | 0 | class_size ~ enrollment")
 print("  (enrollment instruments for class_size)")
 print("-" * 60)
-
-iv_model = pf.feols(
-    "test_score ~ pct_disadvantaged | 0 | class_size ~ enrollment",
-    data=df,
-    vcov="hetero",
-)
-iv_model.summary()
+print(format_fit(iv_model))
 
 # ─── Step 5: OLS vs IV comparison ─────────────────────────────────────────────
-ols_coef = ols_model.coef()["class_size"]
-ols_se   = ols_model.se()["class_size"]
+ols_coef = ols_model["coef"]["class_size"]
+ols_se   = ols_model["se"]["class_size"]
 
-iv_coef  = iv_model.coef()["class_size"]
-iv_se    = iv_model.se()["class_size"]
+iv_coef  = iv_model["coef"]["class_size"]
+iv_se    = iv_model["se"]["class_size"]
 
 print("\n" + "=" * 60)
 print("COMPARISON: OLS vs IV (effect of class_size on test_score)")
@@ -160,13 +164,54 @@ else:
     print("  This is consistent with positive selection into small classes")
     print("  (high-ability students attending schools with smaller classes).")
 
-# ─── Save output ──────────────────────────────────────────────────────────────
-def capture(fn):
-    buf = io.StringIO()
-    with redirect_stdout(buf):
-        fn()
-    return buf.getvalue()
+# ─── Step 6: Weak-instrument-robust inference ─────────────────────────────────
+# The usual 2SLS CI is only reliable with a strong first stage.  The
+# Anderson-Rubin confidence set inverts a test whose size does not depend on
+# instrument strength: it collects every class-size effect b for which
+# enrollment has no effect on (test_score - b * class_size).  The whole grid
+# of b is evaluated at once (one matrix product — see iv_engine.py).
+print("\n" + "-" * 60)
+print("STEP 6: WEAK-INSTRUMENT DIAGNOSTICS")
+print("-" * 60)
+
 
+def describe_ar(ar):
+    parts = [f"[{lo:.3f}, {hi:.3f}]" for lo, hi in ar["intervals"]]
+    text = " U ".join(parts) if parts else "empty"
+    if ar["open_lower"] or ar["open_upper"]:
+        text += "  (reaches the end of the grid — may be unbounded)"
+    return text
+
+
+ar_grid = np.linspace(iv_coef - 10 * iv_se, iv_coef + 10 * iv_se, 4001)
+ar = iv_engine.anderson_rubin(iv, ar_grid)
+output_ar.parent.mkdir(parents=True, exist_ok=True)
+ar["table"].to_csv(output_ar, index=False)
+
+print(f"  Robust first-stage F:      {diag['robust_f']:.2f}")
+print(f"  Effective F:               {diag['effective_f']:.2f}  "
+      f"(5% critical value for 10% worst-case bias: {diag['effective_f_critical']:.1f})")
+print(f"  2SLS 95% CI (Wald):        [{iv_coef - 1.96 * iv_se:.3f}, {iv_coef + 1.96 * iv_se:.3f}]")
+print(f"  Anderson-Rubin 95% set:    {describe_ar(ar)}")
+print(f"  Saved AR grid: {output_ar.relative_to(ROOT)}")
+
+# Overidentified specification: with two instruments we can test whether
+# they agree on the class-size effect (Sargan / Hansen J)
+iv_oid = iv_engine.iv_suite(df, "test_score", "class_size",
+                            instruments=["enrollment", "enrollment_sq"],
+                            controls=["pct_disadvantaged"])
+diag_oid = iv_oid["diagnostics"]
+ar_oid = iv_engine.anderson_rubin(iv_oid, ar_grid)
+oid_coef, oid_se = iv_oid["tsls"]["coef"]["class_size"], iv_oid["tsls"]["se"]["class_size"]
+
+print("\n  Overidentified 2SLS (instruments: enrollment, enrollment^2/100):")
+print(f"    2SLS coef = {oid_coef:.4f}  (SE = {oid_se:.4f})")
+print(f"    Robust F = {diag_oid['robust_f']:.2f}, effective F = {diag_oid['effective_f']:.2f}")
+print(f"    Anderson-Rubin 95% set: {describe_ar(ar_oid)}")
+print(f"    Sargan   = {diag_oid['sargan']:.3f}  (p = {diag_oid['sargan_pvalue']:.3f})")
+print(f"    Hansen J = {diag_oid['hansen_j']:.3f}  (p = {diag_oid['hansen_j_pvalue']:.3f})")
+
+# ─── Save output ──────────────────────────────────────────────────────────────
 output_file.parent.mkdir(parents=True, exist_ok=True)
 
 with open(output_file, "w") as f:
@@ -177,40 +222,102 @@ with open(output_file, "w") as f:
     f.write("STEP 1: FIRST STAGE\n")
     f.write("  class_size ~ enrollment + pct_disadvantaged\n")
     f.write("-" * 80 + "\n")
-    f.write(capture(first_stage.summary))
+    f.write(format_fit(first_stage))
     f.write(f"\nFirst-stage F-statistic on instrument: {f_stat:.2f}\n\n")
 
     f.write("STEP 2: REDUCED FORM\n")
     f.write("  test_score ~ enrollment + pct_disadvantaged\n")
     f.write("-" * 80 + "\n")
-    f.write(capture(reduced_form.summary) + "\n")
+    f.write(format_fit(reduced_form) + "\n")
 
     f.write("STEP 3: OLS (BIASED)\n")
     f.write("  test_score ~ class_size + pct_disadvantaged\n")
     f.write("-" * 80 + "\n")
-    f.write(capture(ols_model.summary) + "\n")
+    f.write(format_fit(ols_model) + "\n")
 
     f.write("STEP 4: TWO-STAGE LEAST SQUARES\n")
     f.write("  test_score ~ pct_disadvantaged | 0 | class_size ~ enrollment\n")
     f.write("-" * 80 + "\n")
-    f.write(capture(iv_model.summary) + "\n")
+    f.write(format_fit(iv_model) + "\n")
 
     f.write("COMPARISON: OLS vs IV\n")
     f.write("-" * 80 + "\n")
     f.write(f"  OLS:  coef = {ols_coef:>8.4f}  (SE = {ols_se:.4f})\n")
     f.write(f"  2SLS: coef = {iv_coef:>8.4f}  (SE = {iv_se:.4f})\n")
     f.write(f"  Difference (IV - OLS): {iv_coef - ols_coef:.4f}\n")
-    f.write(f"  First-stage F-statistic: {f_stat:.2f}\n")
+    f.write(f"  First-stage F-statistic: {f_stat:.2f}\n\n")
+
+    f.write("WEAK-INSTRUMENT DIAGNOSTICS\n")
+    f.write("-" * 80 + "\n")
+    f.write(f"  Effective F:            {diag['effective_f']:.2f}\n")
+    f.write(f"  Anderson-Rubin 95% set: {describe_ar(ar)}\n\n")
+    f.write("  Overidentified 2SLS (instruments: enrollment, enrollment^2/100)\n")
+    f.write(format_fit(iv_oid["tsls"]))
+    f.write(f"  Robust F = {diag_oid['robust_f']:.2f}, effective F = {diag_oid['effective_f']:.2f}\n")
+    f.write(f"  Anderson-Rubin 95% set: {describe_ar(ar_oid)}\n")
+    f.write(f"  Sargan   = {diag_oid['sargan']:.3f}  (p = {diag_oid['sargan_pvalue']:.3f})\n")
+    f.write(f"  Hansen J = {diag_oid['hansen_j']:.3f}  (p = {diag_oid['hansen_j_pvalue']:.3f})\n")
 
 # ─── Save LaTeX output ──────────────────────────────────────────────────────
-tex = pf.etable([first_stage, reduced_form, ols_model, iv_model], type="tex", labels={
+# Hand-built booktabs table (the fits are not pyfixest objects, so there is
+# no etable); coefficient cells follow the same Coefficient / (SE) layout.
+labels = {
     "enrollment": "Enrollment",
     "pct_disadvantaged": "Pct.\\ Disadvantaged",
     "class_size": "Class Size",
-    "test_score": "Test Score",
-})
+    "Intercept": "Intercept",
+}
+columns = [first_stage, reduced_form, ols_model, iv_model, iv_oid["tsls"]]
+
+
+def stars(p):
+    return "***" if p < 0.001 else "**" if p < 0.01 else "*" if p < 0.05 else ""
+
+
+def cell(res, name):
+    if name not in res["coef"].index:
+        return ""
+    b, se, p = res["coef"][name], res["se"][name], res["pvalue"][name]
+    return f"\\makecell{{{b:.3f}{stars(p)} \\\\ ({se:.3f})}}"
+
+
+def ar_cell(a):
+    return " $\\cup$ ".join(f"[{lo:.2f}, {hi:.2f}]" for lo, hi in a["intervals"]) or "--"
+
+
+rows = [
+    "\\begin{threeparttable}",
+    "\\begin{tabular}{l" + "c" * len(columns) + "}",
+    "\\toprule",
+    " & \\multicolumn{1}{c}{Class Size} & \\multicolumn{4}{c}{Test Score} \\\\",
+    "\\cmidrule(lr){2-2} \\cmidrule(lr){3-6}",
+    " & First stage & Reduced form & OLS & 2SLS & 2SLS \\\\",
+    " & (1) & (2) & (3) & (4) & (5) \\\\",
+    "\\midrule",
+]
+for name, label in labels.items():
+    rows.append(f"{label} & " + " & ".join(cell(r, name) for r in columns) + " \\\\")
+    rows.append("\\addlinespace[0.5ex]")
+r2 = " & ".join("--" if np.isnan(r["r2"]) else f"{r['r2']:.3f}" for r in columns)
+rows += [
+    "\\midrule",
+    "Instruments & & & & Enrollment & \\makecell{Enrollment, \\\\ Enrollment$^2$} \\\\",
+    "Observations & " + " & ".join(f"{r['nobs']:,}" for r in columns) + " \\\\",
+    f"$R^2$ & {r2} \\\\",
+    f"Effective F & & & & {diag['effective_f']:.1f} & {diag_oid['effective_f']:.1f} \\\\",
+    f"AR 95\\% set & & & & {ar_cell(ar)} & {ar_cell(ar_oid)} \\\\",
+    f"Hansen J ($p$) & & & & & {diag_oid['hansen_j_pvalue']:.3f} \\\\",
+    "\\bottomrule",
+    "\\end{tabular}",
+    "\\begin{tablenotes}\\footnotesize",
+    "\\item Heteroskedasticity-robust (HC1) standard errors in parentheses. "
+    "* $p<0.05$, ** $p<0.01$, *** $p<0.001$. "
+    "AR: Anderson-Rubin weak-instrument-robust confidence set.",
+    "\\end{tablenotes}",
+    "\\end{threeparttable}",
+]
 with open(output_tex, "w") as f:
-    f.write(tex + "\n")
+    f.write("\n".join(rows) + "\n")
 
 print(f"\nSaved: {output_file.relative_to(ROOT)}")
 print(f"Saved: {output_tex.relative_to(ROOT)}")
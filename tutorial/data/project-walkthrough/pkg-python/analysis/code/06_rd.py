@@ -12,17 +12,29 @@ Motivating context:
   This local randomization allows us to identify a causal effect.
 
 Approach:
-  - Restrict to a bandwidth of +/- 365 days (one year on each side)
+  - Choose the bandwidth from the data: the MSE-optimal bandwidth for a
+    local-linear fit with a triangular kernel (rd_engine.mse_bandwidth)
+  - Local-linear RD (rd_engine): conventional estimate plus the robust
+    bias-corrected 95% CI
   - Model 1 -- Linear RD: allow different linear slopes on each side by
-    interacting days_from_21 with over_21
+    interacting days_from_21 with over_21, with covariates and the same
+    kernel weights
   - Model 2 -- Quadratic RD: add squared terms for robustness
-  - RD plot: binned scatter plot with fitted regression lines on each side
+  - Both models are fitted on a mask of the rows within the bandwidth
+    (subsample.py), from one set of cross-products, without copying the data
+  - Bandwidth sensitivity: re-estimate over a grid of bandwidths (one pass
+    over the sorted data -- see rd_engine.py)
+  - RD plots: binned means with 95% CIs (evenly- and quantile-spaced bins)
+    and the local-linear fits on each side (rd_plot.py)
 
 Data: analysis/code/rd_data.csv
   - person_id, age_years, days_from_21, over_21, mortality_rate, male, income
 
 Outputs:
-  - analysis/output/figures/rd_plot.png
+  - analysis/output/figures/rd_plot.png (+ rd_plot_thumb.png, .pdf, .svg)
+  - analysis/output/figures/rd_plot_quantile.png (+ thumb, .pdf, .svg)
+  - analysis/output/figures/rd_bandwidth_sensitivity.png (+ thumb, .pdf, .svg)
+  - analysis/output/tables/rd_bandwidth_sensitivity.csv
   - analysis/output/tables/rd_results.txt
   - analysis/output/tables/rd_results.tex
 """
@@ -36,18 +48,21 @@ import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
 
-try:
-    import pyfixest as pf
-except ImportError:
-    raise ImportError("pyfixest not installed -- run: pip install pyfixest")
+import figure_export  # multi-format figure export (analysis/code/figure_export.py)
+import rd_engine      # local-polynomial RD estimation (analysis/code/rd_engine.py)
+import rd_plot        # binned-scatter RD plots (analysis/code/rd_plot.py)
+import subsample      # masked subsamples of one design (analysis/code/subsample.py)
 
 ROOT = Path(os.environ.get("PROJECT_ROOT", Path(__file__).parent.parent.parent))
 
 # --- Paths -------------------------------------------------------------------
 input_file   = ROOT / "analysis/code/rd_data.csv"
 output_plot  = ROOT / "analysis/output/figures/rd_plot.png"
+output_plot_q = ROOT / "analysis/output/figures/rd_plot_quantile.png"
 output_file  = ROOT / "analysis/output/tables/rd_results.txt"
 output_tex   = ROOT / "analysis/output/tables/rd_results.tex"
+output_sens  = ROOT / "analysis/output/tables/rd_bandwidth_sensitivity.csv"
+output_sens_plot = ROOT / "analysis/output/figures/rd_bandwidth_sensitivity.png"
 
 print("=" * 60)
 print("SCRIPT 06: REGRESSION DISCONTINUITY DESIGN")
@@ -62,13 +77,41 @@ print(f"    Range: {df['days_from_21'].min():.0f} to {df['days_from_21'].max():.
 print(f"    Below cutoff (age < 21): {(df['days_from_21'] < 0).sum():,}")
 print(f"    Above cutoff (age >= 21): {(df['over_21'] == 1).sum():,}")
 
-# --- Bandwidth restriction ---------------------------------------------------
+# --- Bandwidth selection -----------------------------------------------------
 # Using observations far from the cutoff risks violating the local randomization
-# assumption.  We limit to one year on each side of the cutoff.
-bandwidth = 365   # +/- 365 days = one year on each side
-df_bw = df[df["days_from_21"].abs() <= bandwidth].copy()
-print(f"\n  Bandwidth: +/- {bandwidth} days")
-print(f"  Observations in bandwidth: {len(df_bw):,}")
+# assumption; using too few makes the estimate noisy.  The MSE-optimal
+# bandwidth balances the two: it grows with the outcome variance near the
+# cutoff and shrinks with the curvature of the regression function.
+kernel = "triangular"
+bw = rd_engine.mse_bandwidth(df["days_from_21"], df["mortality_rate"],
+                             p=1, kernel=kernel)
+bandwidth = int(round(bw["h"]))
+in_bw = (df["days_from_21"].abs() <= bw["h"]).to_numpy()
+df["kernel_weight"] = rd_engine.kernel_weights(df["days_from_21"], bw["h"], kernel)   # zero beyond h
+print(f"\n  MSE-optimal bandwidth ({kernel} kernel, local linear): "
+      f"+/- {bw['h']:.1f} days")
+print(f"    Density at cutoff: {bw['density']:.5f}   "
+      f"Outcome variance: {bw['sigma2_left']:.3f} (below), "
+      f"{bw['sigma2_right']:.3f} (above)")
+print(f"  Observations in bandwidth: {in_bw.sum():,}")
+
+# --- Local-linear RD ---------------------------------------------------------
+# The conventional CI is centred on an estimate whose bias is of the same
+# order as its SE at the MSE-optimal bandwidth.  The robust bias-corrected
+# CI (Calonico, Cattaneo and Titiunik 2014) subtracts the estimated bias and
+# widens the interval to account for the extra noise from doing so.
+print("\n" + "-" * 60)
+print("LOCAL-LINEAR RD (rd_engine)")
+print(f"  mortality_rate, {kernel} kernel, HC1 SEs, no covariates")
+print("-" * 60)
+
+ll = rd_engine.rd_estimate(df["days_from_21"], df["mortality_rate"],
+                           h=bw["h"], p=1, kernel=kernel)
+print(f"\n  Observations used: {ll['n_left']:,} below, {ll['n_right']:,} above")
+print(f"  RD estimate:             {ll['estimate']:.4f}  (SE {ll['std_error']:.4f})")
+print(f"  Conventional 95% CI:     [{ll['ci_lower']:.4f}, {ll['ci_upper']:.4f}]")
+print(f"  Bias-corrected estimate: {ll['estimate_bc']:.4f}  (robust SE {ll['std_error_rb']:.4f})")
+print(f"  Robust 95% CI:           [{ll['ci_lower_rb']:.4f}, {ll['ci_upper_rb']:.4f}]")
 
 # --- Interaction terms -------------------------------------------------------
 # The key to RD is allowing the slope of the running variable to differ on
@@ -78,19 +121,31 @@ print(f"  Observations in bandwidth: {len(df_bw):,}")
 #
 # The coefficient on over_21 (beta) is the RD estimate: the discontinuous
 # jump in the outcome exactly at the cutoff.
-df_bw["days_x_over21"] = df_bw["days_from_21"] * df_bw["over_21"]
+#
+# The quadratic model of Model 2 adds days^2 and its interaction.  Both
+# models come from one design over the rows within the bandwidth: a mask,
+# not a copy, and the cross-products are formed once for the two fits.
+df["days_x_over21"]    = df["days_from_21"] * df["over_21"]
+df["days_sq"]          = df["days_from_21"] ** 2
+df["days_sq_x_over21"] = df["days_sq"] * df["over_21"]
+
+rd_design = subsample.Design(
+    df, ["mortality_rate", "over_21", "days_from_21", "days_x_over21",
+         "days_sq", "days_sq_x_over21", "male", "income"],
+    weights="kernel_weight", vcov="hetero",
+)
+in_bandwidth = rd_design.sample(in_bw)
 
 # --- Model 1: Linear RD ------------------------------------------------------
 print("\n" + "-" * 60)
 print("MODEL 1: LINEAR RD")
 print("  mortality_rate ~ over_21 + days_from_21 + days_x_over21 + male + income")
-print("  Heteroskedasticity-robust SEs")
+print(f"  Heteroskedasticity-robust SEs, {kernel} kernel weights")
 print("-" * 60)
 
-linear_rd = pf.feols(
-    "mortality_rate ~ over_21 + days_from_21 + days_x_over21 + male + income",
-    data=df_bw,
-    vcov="hetero",
+linear_rd = in_bandwidth.fit(
+    "mortality_rate",
+    ["over_21", "days_from_21", "days_x_over21", "male", "income"],
 )
 linear_rd.summary()
 
@@ -113,14 +168,10 @@ print("MODEL 2: QUADRATIC RD (robustness check)")
 print("  Adds days_from_21^2 and its interaction with over_21")
 print("-" * 60)
 
-df_bw["days_sq"]          = df_bw["days_from_21"] ** 2
-df_bw["days_sq_x_over21"] = df_bw["days_sq"] * df_bw["over_21"]
-
-quad_rd = pf.feols(
-    "mortality_rate ~ over_21 + days_from_21 + days_x_over21 "
-    "+ days_sq + days_sq_x_over21 + male + income",
-    data=df_bw,
-    vcov="hetero",
+quad_rd = in_bandwidth.fit(
+    "mortality_rate",
+    ["over_21", "days_from_21", "days_x_over21", "days_sq", "days_sq_x_over21",
+     "male", "income"],
 )
 quad_rd.summary()
 
@@ -135,83 +186,82 @@ print(f"  SE:                      {rd_se_q:.4f}")
 print(f"  p-value:                 {rd_pval_q:.4f}")
 print(f"  95% CI:                  [{rd_ci_lo_q:.4f}, {rd_ci_hi_q:.4f}]")
 
-# --- RD Plot -----------------------------------------------------------------
-# Standard RD plot: bin the running variable into intervals, compute the mean
-# outcome in each bin, then overlay the fitted regression lines from the linear
-# model on each side of the cutoff.
+# --- Bandwidth sensitivity ---------------------------------------------------
+# The whole grid comes from one sort of the running variable: every bandwidth
+# is a position in the same prefix sums, not a separate regression.
 print("\n" + "-" * 60)
-print("CREATING RD PLOT")
+print("BANDWIDTH SENSITIVITY")
 print("-" * 60)
 
-n_bins = 40
-df_bw["bin"] = pd.cut(df_bw["days_from_21"], bins=n_bins)
-
-bin_stats = (
-    df_bw.groupby("bin", observed=True)
-    .agg(
-        days_from_21=("days_from_21", "mean"),
-        mortality_rate=("mortality_rate", "mean"),
-        over_21=("over_21", "first"),
-    )
-    .reset_index(drop=True)
-    .dropna(subset=["days_from_21"])
-)
-
-# Build fitted lines using the linear model coefficients at mean controls
-coefs       = linear_rd.coef()
-mean_male   = df_bw["male"].mean()
-mean_income = df_bw["income"].mean()
-
-x_below = np.linspace(-bandwidth, 0, 200)
-x_above = np.linspace(0,  bandwidth, 200)
-
-# Below cutoff: over_21 = 0, days_x_over21 = 0
-y_below = (
-    coefs["Intercept"]
-    + coefs["days_from_21"] * x_below
-    + coefs["male"]   * mean_male
-    + coefs["income"] * mean_income
-)
-
-# Above cutoff: over_21 = 1, days_x_over21 = x
-y_above = (
-    coefs["Intercept"]
-    + coefs["over_21"]
-    + coefs["days_from_21"]  * x_above
-    + coefs["days_x_over21"] * x_above
-    + coefs["male"]   * mean_male
-    + coefs["income"] * mean_income
-)
+h_grid = np.arange(30, df["days_from_21"].abs().max() + 1, 10)
+sens = rd_engine.rd_grid(df["days_from_21"], df["mortality_rate"], h_grid,
+                         p=1, kernel=kernel)
+output_sens.parent.mkdir(parents=True, exist_ok=True)
+sens.to_csv(output_sens, index=False)
+print(f"  {len(sens)} bandwidths from {h_grid[0]} to {h_grid[-1]} days")
+print(f"  Estimate range: {sens['estimate'].min():.4f} to {sens['estimate'].max():.4f}")
+print(f"  Saved: {output_sens.relative_to(ROOT)}")
 
 fig, ax = plt.subplots(figsize=(10, 6))
-
-below_bins = bin_stats[bin_stats["days_from_21"] < 0]
-above_bins = bin_stats[bin_stats["days_from_21"] >= 0]
-
-ax.scatter(below_bins["days_from_21"], below_bins["mortality_rate"],
-           color="steelblue", s=45, alpha=0.7, zorder=3,
-           label="Below cutoff (age < 21)")
-ax.scatter(above_bins["days_from_21"], above_bins["mortality_rate"],
-           color="firebrick", s=45, alpha=0.7, zorder=3,
-           label="Above cutoff (age >= 21)")
-
-ax.plot(x_below, y_below, color="steelblue", linewidth=2.0, zorder=2)
-ax.plot(x_above, y_above, color="firebrick",  linewidth=2.0, zorder=2)
-
-ax.axvline(0, color="black", linestyle="--", linewidth=1.5, alpha=0.8,
-           label="Cutoff (age 21)")
-
-ax.set_xlabel("Days from 21st Birthday", fontsize=12)
-ax.set_ylabel("Mortality Rate", fontsize=12)
-ax.set_title("RD Plot: Effect of Turning 21 on Mortality Rate", fontsize=13, pad=14)
+ax.fill_between(sens["bandwidth"], sens["ci_lower_rb"], sens["ci_upper_rb"],
+                color="firebrick", alpha=0.15, linewidth=0,
+                label="Robust bias-corrected 95% CI")
+ax.fill_between(sens["bandwidth"], sens["ci_lower"], sens["ci_upper"],
+                color="steelblue", alpha=0.3, linewidth=0,
+                label="Conventional 95% CI")
+ax.plot(sens["bandwidth"], sens["estimate"], color="steelblue", linewidth=2.0,
+        label="Local-linear estimate")
+ax.axhline(0, color="gray", linestyle="--", linewidth=0.8)
+ax.axvline(bw["h"], color="black", linestyle=":", linewidth=1.2,
+           label=f"MSE-optimal bandwidth ({bw['h']:.0f} days)")
+ax.set_xlabel("Bandwidth (days on each side of the cutoff)", fontsize=12)
+ax.set_ylabel("RD Estimate (mortality rate)", fontsize=12)
+ax.set_title("RD Estimate by Bandwidth", fontsize=13, pad=14)
 ax.legend(frameon=True)
 ax.grid(True, alpha=0.25, linestyle="--")
+fig.set_layout_engine("constrained")
+figure_export.export(fig, output_sens_plot, dpi=300)
+plt.close(fig)
+print(f"  Saved: {output_sens_plot.relative_to(ROOT)} (+ _thumb.png, .pdf, .svg)")
 
-plt.tight_layout()
-output_plot.parent.mkdir(parents=True, exist_ok=True)
-plt.savefig(output_plot, dpi=300, bbox_inches="tight")
-plt.close()
-print(f"  Saved: {output_plot.relative_to(ROOT)}")
+# --- RD Plot -----------------------------------------------------------------
+# Standard RD plot: bin the running variable into intervals, compute the mean
+# outcome (and a 95% CI) in each bin, then overlay the local-linear fits on
+# each side of the cutoff.  rd_plot.py only ever draws the bin statistics, so
+# the plot costs the same however many rows the data have.  Two versions:
+# evenly-spaced bins, and quantile-spaced bins with equal counts per bin.
+print("\n" + "-" * 60)
+print("CREATING RD PLOT")
+print("-" * 60)
+
+n_bins = 20   # per side
+for method, path in (("even", output_plot), ("quantile", output_plot_q)):
+    bins = rd_plot.bin_stats(df["days_from_21"], df["mortality_rate"],
+                             n_bins=n_bins, method=method,
+                             support=(-bw["h"], bw["h"]))
+
+    fig, ax = plt.subplots(figsize=(10, 6))
+    rd_plot.plot(ax, bins, fit=ll,
+                 labels=("Below cutoff (age < 21)", "Above cutoff (age >= 21)"))
+    ax.axvline(0, color="black", linestyle="--", linewidth=1.5, alpha=0.8,
+               label="Cutoff (age 21)")
+
+    spacing = "evenly-spaced" if method == "even" else "quantile-spaced"
+    ax.set_xlabel("Days from 21st Birthday", fontsize=12)
+    ax.set_ylabel("Mortality Rate", fontsize=12)
+    ax.set_title("RD Plot: Effect of Turning 21 on Mortality Rate", fontsize=13, pad=14)
+    ax.annotate(f"{n_bins} {spacing} bins per side (means and 95% CIs); "
+                f"local-linear fits, {kernel} kernel, h = {bw['h']:.0f} days",
+                xy=(0.5, -0.12), xycoords="axes fraction",
+                ha="center", va="top", fontsize=9, color="gray")
+    ax.legend(frameon=True)
+    ax.grid(True, alpha=0.25, linestyle="--")
+
+    # Writes the PNG plus a thumbnail, PDF and SVG; skipped if unchanged
+    fig.set_layout_engine("constrained")
+    figure_export.export(fig, path, dpi=300)
+    plt.close(fig)
+    print(f"  Saved: {path.relative_to(ROOT)} (+ _thumb.png, .pdf, .svg)")
 
 # --- Save results text -------------------------------------------------------
 def capture(fn):
@@ -227,6 +277,19 @@ with open(output_file, "w") as f:
     f.write("REGRESSION DISCONTINUITY DESIGN RESULTS\n")
     f.write("=" * 80 + "\n\n")
 
+    f.write(f"BANDWIDTH: +/- {bw['h']:.1f} days (MSE-optimal, {kernel} kernel, local linear)\n")
+    f.write(f"  density at cutoff {bw['density']:.5f}, outcome variance "
+            f"{bw['sigma2_left']:.4f} below / {bw['sigma2_right']:.4f} above, "
+            f"curvature {bw['curvature']:.3g}\n\n")
+
+    f.write("LOCAL-LINEAR RD (no covariates)\n")
+    f.write("-" * 80 + "\n")
+    f.write(f"Observations:            {ll['n_left']:,} below, {ll['n_right']:,} above\n")
+    f.write(f"RD estimate:             {ll['estimate']:.4f}  (SE {ll['std_error']:.4f})\n")
+    f.write(f"Conventional 95% CI:     [{ll['ci_lower']:.4f}, {ll['ci_upper']:.4f}]\n")
+    f.write(f"Bias-corrected estimate: {ll['estimate_bc']:.4f}  (robust SE {ll['std_error_rb']:.4f})\n")
+    f.write(f"Robust 95% CI:           [{ll['ci_lower_rb']:.4f}, {ll['ci_upper_rb']:.4f}]\n\n")
+
     f.write("MODEL 1: LINEAR RD\n")
     f.write("  mortality_rate ~ over_21 + days_from_21 + days_x_over21 + male + income\n")
     f.write("-" * 80 + "\n")
@@ -244,7 +307,7 @@ with open(output_file, "w") as f:
     f.write(f"95% CI:                  [{rd_ci_lo_q:.4f}, {rd_ci_hi_q:.4f}]\n")
 
 # ─── Save LaTeX output ──────────────────────────────────────────────────────
-tex = pf.etable([linear_rd, quad_rd], type="tex", labels={
+tex = subsample.etable([linear_rd, quad_rd], type="tex", labels={
     "over_21": "Over 21",
     "days_from_21": "Days from 21",
     "days_x_over21": r"Days $\times$ Over 21",
@@ -259,6 +322,8 @@ with open(output_tex, "w") as f:
 
 print(f"\nSaved: {output_file.relative_to(ROOT)}")
 print(f"Saved: {output_tex.relative_to(ROOT)}")
+print(f"  Local-linear estimate: {ll['estimate']:.4f}  "
+      f"(robust CI [{ll['ci_lower_rb']:.4f}, {ll['ci_upper_rb']:.4f}])")
 print(f"  Linear RD estimate:    {rd_est:.4f}  (SE {rd_se:.4f}, p={rd_pval:.4f})")
 print(f"  Quadratic RD estimate: {rd_est_q:.4f}  (SE {rd_se_q:.4f}, p={rd_pval_q:.4f})")
 print(f"  Bandwidth: +/- {bandwidth} days")
@@ -0,0 +1,196 @@
+"""
+Event-study plotting helpers shared by the figure scripts.
+
+Every event-study figure is described by plain dicts:
+
+  panel  – one axis: the coefficient arrays plus styling (see PANEL_DEFAULTS)
+  figure – an output path, a figure size and a list of panels (left to right)
+
+The coefficient data are converted to sorted NumPy arrays once in panel(),
+and the same panel is reused for the single-outcome figure and for its
+column in a combined figure, so the two can never drift apart.
+
+render_all() draws figures in parallel worker processes (Agg backend) and
+skips any figure whose inputs — coefficients, styling and this file — are
+unchanged since the last run.  Figures use constrained layout instead of
+bbox_inches="tight", so each figure is laid out once rather than twice,
+and are written through figure_export (PNG, thumbnail, PDF and SVG).
+"""
+
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+import figure_export
+
+CACHE_NAME = ".figure_cache.json"
+
+PANEL_DEFAULTS = {
+    "style": "ribbon",            # "ribbon" (shaded CI + line) or "errorbar"
+    "color": "steelblue",
+    "title": "",
+    "xlabel": "Years Relative to Policy Adoption",
+    "ylabel": "Coefficient",
+    "title_size": 14,
+    "label_size": 12,
+    "xticks": None,               # None = matplotlib default; "all" = every event time
+    "marker": "o",
+    "markersize": 6,
+    "linewidth": 2,
+    "connect": True,              # draw a line through the point estimates
+    "ci_alpha": 0.3,
+    "capsize": 4,                 # errorbar style only
+    "zero_line": {"color": "gray", "linestyle": "--", "linewidth": 0.8},
+    "treat_line": {"color": "red", "linestyle": "--", "linewidth": 0.8, "alpha": 0.7},
+    "treat_x": -0.5,
+    "grid": {"alpha": 0.3},       # None = no grid
+    "despine": True,
+    "legend": False,
+    "ci_label": "95% CI",
+    "point_label": "Point estimate",
+    "treat_label": "Policy adoption",
+    "caption": None,
+}
+
+
+def panel(coef, **style):
+    """Build a panel from a coefficient table.
+
+    coef needs event_time, coefficient, ci_lower and ci_upper columns (the
+    layout written by the event-study scripts).  Keyword arguments override
+    PANEL_DEFAULTS; use dict(p, title=...) to derive variants of a panel
+    without re-reading the data.
+    """
+    coef = coef.sort_values("event_time")
+    p = dict(PANEL_DEFAULTS)
+    p.update(style)
+    p["t"] = coef["event_time"].to_numpy(dtype=float)
+    p["b"] = coef["coefficient"].to_numpy(dtype=float)
+    p["lo"] = coef["ci_lower"].to_numpy(dtype=float)
+    p["hi"] = coef["ci_upper"].to_numpy(dtype=float)
+    return p
+
+
+def figure(path, panels, figsize=(10, 6), dpi=300):
+    """Describe one output figure made of one or more panels side by side."""
+    return {"path": Path(path), "panels": list(panels),
+            "figsize": tuple(figsize), "dpi": dpi}
+
+
+def draw_panel(ax, p):
+    """Draw one event-study panel onto an existing axis."""
+    t, b, lo, hi = p["t"], p["b"], p["lo"], p["hi"]
+    legend = p["legend"]
+
+    ax.axhline(0, **p["zero_line"])
+    ax.axvline(p["treat_x"], label=p["treat_label"] if legend else None,
+               **p["treat_line"])
+
+    if p["style"] == "errorbar":
+        ax.errorbar(t, b, yerr=[b - lo, hi - b],
+                    fmt=p["marker"] + ("-" if p["connect"] else ""),
+                    color=p["color"], capsize=p["capsize"],
+                    markersize=p["markersize"], linewidth=p["linewidth"],
+                    capthick=p["linewidth"] * 0.8,
+                    label=p["point_label"] if legend else None)
+    else:
+        ax.fill_between(t, lo, hi, alpha=p["ci_alpha"], color=p["color"],
+                        linewidth=0, label=p["ci_label"] if legend else None)
+        ax.plot(t, b, p["marker"] + ("-" if p["connect"] else ""),
+                color=p["color"], markersize=p["markersize"],
+                linewidth=p["linewidth"],
+                label=p["point_label"] if legend else None)
+
+    ax.set_xlabel(p["xlabel"], fontsize=p["label_size"])
+    ax.set_ylabel(p["ylabel"], fontsize=p["label_size"])
+    if p["title"]:
+        ax.set_title(p["title"], fontsize=p["title_size"])
+    if p["xticks"] == "all":
+        ax.set_xticks(t)
+    elif p["xticks"] is not None:
+        ax.set_xticks(p["xticks"])
+    if p["despine"]:
+        ax.spines["top"].set_visible(False)
+        ax.spines["right"].set_visible(False)
+    if p["grid"] is not None:
+        ax.grid(True, **p["grid"])
+    if legend:
+        ax.legend(frameon=True)
+    if p["caption"]:
+        ax.annotate(p["caption"], xy=(0.5, -0.12), xycoords="axes fraction",
+                    ha="center", va="top", fontsize=9, color="gray")
+
+
+def render(spec):
+    """Draw and save one figure.  Safe to call in a worker process."""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    panels = spec["panels"]
+    fig, axes = plt.subplots(1, len(panels), figsize=spec["figsize"],
+                             layout="constrained", squeeze=False)
+    for ax, p in zip(axes[0], panels):
+        draw_panel(ax, p)
+    figure_export.export(fig, spec["path"], dpi=spec["dpi"])
+    plt.close(fig)
+    return spec["path"]
+
+
+def spec_hash(spec):
+    """Hash of everything that determines a figure's pixels."""
+    h = hashlib.sha256(Path(__file__).read_bytes())
+    h.update(repr((spec["figsize"], spec["dpi"])).encode())
+    for p in spec["panels"]:
+        for key in ("t", "b", "lo", "hi"):
+            h.update(np.ascontiguousarray(p[key]).tobytes())
+        style = {k: v for k, v in p.items() if k not in ("t", "b", "lo", "hi")}
+        h.update(json.dumps(style, sort_keys=True, default=str).encode())
+    return h.hexdigest()
+
+
+def _load_cache(folder):
+    try:
+        return json.loads((folder / CACHE_NAME).read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_cache(folder, entries):
+    path = folder / CACHE_NAME
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(entries, indent=2, sort_keys=True) + "\n")
+    os.replace(tmp, path)
+
+
+def render_all(specs, jobs=None, force=False):
+    """Render every figure whose inputs changed; return (rendered, skipped) paths."""
+    caches = {}
+    todo, skipped, hashes = [], [], {}
+    for spec in specs:
+        folder = spec["path"].parent
+        cache = caches.setdefault(folder, _load_cache(folder))
+        hashes[spec["path"]] = spec_hash(spec)
+        if (not force and spec["path"].exists()
+                and cache.get(spec["path"].name) == hashes[spec["path"]]):
+            skipped.append(spec["path"])
+        else:
+            todo.append(spec)
+
+    jobs = jobs or min(len(todo), os.cpu_count() or 1)
+    if jobs > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            rendered = list(pool.map(render, todo))
+    else:
+        rendered = [render(spec) for spec in todo]
+
+    for path in rendered:
+        caches[path.parent][path.name] = hashes[path]
+    for folder, cache in caches.items():
+        if folder.exists():
+            _save_cache(folder, cache)
+    return rendered, skipped
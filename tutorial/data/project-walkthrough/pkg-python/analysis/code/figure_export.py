@@ -0,0 +1,119 @@
+"""
+Export a finished matplotlib figure in several formats at once.
+
+export(fig, "figures/event_study.png") writes
+
+  event_study.svg        vector, for the web site
+  event_study.pdf        vector, for LaTeX / slides
+  event_study.png        full-resolution raster (default 300 dpi)
+  event_study_thumb.png  small raster preview (default 480 px wide)
+
+The figure is first rendered to SVG in memory.  That vector rendering is
+deterministic (no timestamps, fixed element ids), so its SHA-256 is a
+content key for the figure: if the key matches the one recorded in the
+figure's hidden .<name>.export-key file and every output exists, nothing
+is re-encoded.  (One key file per figure, so figures exported in parallel
+processes never contend for a shared manifest.)
+
+The raster outputs come from a single Agg rendering: the full-size PNG is
+encoded from that pixel buffer and the thumbnail is downsampled from the
+same buffer rather than drawn a second time.
+"""
+
+import hashlib
+import io
+import os
+from pathlib import Path
+
+import matplotlib
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from PIL import Image
+
+FORMATS = ("svg", "pdf", "png", "thumb")
+
+
+def output_paths(path, formats=FORMATS):
+    """Map each format to the file it is written to."""
+    path = Path(path)
+    paths = {}
+    for fmt in formats:
+        if fmt == "thumb":
+            paths[fmt] = path.with_name(f"{path.stem}_thumb.png")
+        else:
+            paths[fmt] = path.with_suffix(f".{fmt}")
+    return paths
+
+
+def vector_bytes(fig):
+    """Render the figure to deterministic SVG bytes."""
+    buf = io.BytesIO()
+    with matplotlib.rc_context({"svg.hashsalt": "figure-export"}):
+        fig.savefig(buf, format="svg", metadata={"Date": None})
+    return buf.getvalue()
+
+
+def key_path(path):
+    """Hidden file holding the content key of the last export of path."""
+    path = Path(path)
+    return path.with_name(f".{path.stem}.export-key")
+
+
+def _write(path, data):
+    # Write-then-rename so readers never see a half-written file
+    tmp = path.with_name(f".{path.name}.part")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def export(fig, path, formats=FORMATS, dpi=300, thumb_width=480, force=False):
+    """Write fig in every requested format unless its content is unchanged.
+
+    path names the full-resolution PNG; the other outputs sit next to it.
+    Returns True if files were written, False if the cache was current.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    paths = output_paths(path, formats)
+
+    svg = vector_bytes(fig)
+    key = hashlib.sha256(
+        svg + repr((sorted(formats), dpi, thumb_width)).encode()
+    ).hexdigest()
+
+    kp = key_path(path)
+    if (not force and kp.exists() and kp.read_text() == key
+            and all(p.exists() for p in paths.values())):
+        return False
+
+    if "svg" in paths:
+        _write(paths["svg"], svg)
+    if "pdf" in paths:
+        buf = io.BytesIO()
+        fig.savefig(buf, format="pdf", metadata={"CreationDate": None})
+        _write(paths["pdf"], buf.getvalue())
+
+    if "png" in paths or "thumb" in paths:
+        # One raster pass at full resolution feeds both PNG outputs
+        old_dpi = fig.get_dpi()
+        fig.set_dpi(dpi)
+        canvas = fig.canvas
+        if not isinstance(canvas, FigureCanvasAgg):
+            canvas = FigureCanvasAgg(fig)
+        canvas.draw()
+        image = Image.frombuffer("RGBA", canvas.get_width_height(),
+                                 canvas.buffer_rgba(), "raw", "RGBA", 0, 1).copy()
+        fig.set_dpi(old_dpi)
+
+        if "png" in paths:
+            buf = io.BytesIO()
+            image.save(buf, format="png", dpi=(dpi, dpi))
+            _write(paths["png"], buf.getvalue())
+        if "thumb" in paths:
+            height = max(1, round(image.height * thumb_width / image.width))
+            thumb = image.resize((thumb_width, height), Image.LANCZOS)
+            buf = io.BytesIO()
+            thumb.save(buf, format="png", optimize=True)
+            _write(paths["thumb"], buf.getvalue())
+
+    _write(kp, key.encode())
+    return True
@@ -0,0 +1,106 @@
+"""
+Tables and figures for leave-one-out influence (hdfe.jackknife() output).
+
+hdfe.jackknife() gives, for every dropped group (a state, an adoption
+cohort) and coefficient, the estimate without that group and its DFBETA,
+(full - without) / full-sample SE.  This module reads those tables:
+
+  influential(jk)           rows past the conventional |DFBETA| > 2/sqrt(G)
+                            cutoff (Belsley, Kuh and Welsch), largest first
+  dfbeta(ax, jk, coef)      one bar per dropped group for one coefficient,
+                            sorted, with the cutoff marked
+  event_study(ax, jk, ...)  event-time coefficients of the full sample over
+                            one faint line per dropped group; the groups
+                            that move the path most are labelled
+
+The plotting functions draw on a matplotlib Axes the caller owns; the
+stages lay the panels out and write them with figure_export.export().
+"""
+
+import numpy as np
+
+
+def cutoff(n_groups):
+    """|DFBETA| above which a group counts as influential."""
+    return 2 / np.sqrt(n_groups)
+
+
+def influential(jk, coefficients=None):
+    """Rows of jk past the cutoff (per coefficient), by |DFBETA|."""
+    if coefficients is not None:
+        jk = jk[jk["coefficient"].isin(coefficients)]
+    out = jk[jk["dfbeta"].abs() > cutoff(jk["group"].nunique())]
+    return out.reindex(out["dfbeta"].abs().sort_values(ascending=False).index)
+
+
+def dfbeta(ax, jk, coefficient, title="", labels=None, color="steelblue"):
+    """Sorted DFBETA bars of one coefficient, one per dropped group.
+
+    labels maps group values to tick labels (state names, say).
+    """
+    rows = jk[jk["coefficient"] == coefficient].sort_values("dfbeta")
+    cut = cutoff(len(rows))
+    names = [str(labels.get(g, g)) if labels else str(g) for g in rows["group"]]
+    colors = np.where(rows["dfbeta"].abs() > cut, "firebrick", color)
+    ax.bar(np.arange(len(rows)), rows["dfbeta"], color=colors, width=0.8)
+    for y in (-cut, cut):
+        ax.axhline(y, color="gray", linestyle="--", linewidth=0.8)
+    ax.axhline(0, color="black", linewidth=0.8)
+    ax.set_xticks(np.arange(len(rows)), names, rotation=90,
+                  fontsize=7 if len(rows) > 20 else 9)
+    ax.set_xlim(-0.7, len(rows) - 0.3)
+    ax.set_ylabel("DFBETA (full - leave-out) / SE")
+    ax.set_title(title, fontsize=11)
+    ax.grid(True, axis="y", alpha=0.3)
+
+
+def event_study(ax, jk, event_times, reference=-1, title="", labels=None, n_labelled=3,
+                color="steelblue"):
+    """Full-sample event-study path and every leave-one-group-out path.
+
+    event_times maps coefficient names to event times; the reference
+    period is drawn at zero.  The n_labelled groups with the largest
+    summed |DFBETA| over the event-time coefficients are highlighted.
+    """
+    rows = jk[jk["coefficient"].isin(event_times)].assign(
+        event_time=lambda d: d["coefficient"].map(event_times))
+    paths = rows.pivot(index="group", columns="event_time", values="jackknife")
+    paths[reference] = 0.0
+    paths = paths.sort_index(axis=1)
+    full = (rows.drop_duplicates("coefficient").set_index("event_time")["estimate"]
+            .reindex(paths.columns).fillna(0.0))
+
+    t = paths.columns.to_numpy()
+    for _, path in paths.iterrows():
+        ax.plot(t, path.to_numpy(), color="gray", alpha=0.25, linewidth=0.7)
+    score = rows.groupby("group")["dfbeta"].apply(lambda d: d.abs().sum())
+    top = score.sort_values(ascending=False).index[:n_labelled]
+    palette = ["firebrick", "darkorange", "seagreen", "purple", "goldenrod"]
+    for i, g in enumerate(top):
+        name = labels.get(g, g) if labels else g
+        ax.plot(t, paths.loc[g].to_numpy(), color=palette[i % len(palette)], linewidth=1.2,
+                label=f"without {name}")
+    ax.plot(t, full.to_numpy(), color=color, marker="o", markersize=4, linewidth=2,
+            label="Full sample")
+    ax.axhline(0, color="black", linestyle="--", linewidth=0.8)
+    ax.axvline(reference + 0.5, color="gray", linestyle=":", linewidth=0.8)
+    ax.set_xlabel("Years Relative to Adoption")
+    ax.set_ylabel("Coefficient")
+    ax.set_title(title, fontsize=11)
+    ax.legend(fontsize=8, frameon=True)
+    ax.grid(True, alpha=0.3)
+
+
+def summary(jk, coefficient, labels=None, n=5):
+    """Printable lines: the range of the leave-out estimates of one
+    coefficient and the n groups whose removal moves it most."""
+    rows = jk[jk["coefficient"] == coefficient].dropna(subset=["jackknife"])
+    est = rows["estimate"].iloc[0]
+    lines = [f"{coefficient}: {est:.4f}, leave-one-out range "
+             f"[{rows['jackknife'].min():.4f}, {rows['jackknife'].max():.4f}] "
+             f"over {len(rows)} groups (cutoff |DFBETA| > {cutoff(len(rows)):.3f})"]
+    top = rows.reindex(rows["dfbeta"].abs().sort_values(ascending=False).index[:n])
+    for _, r in top.iterrows():
+        name = labels.get(r["group"], r["group"]) if labels else r["group"]
+        lines.append(f"  without {str(name):20} {r['jackknife']:9.4f}   DFBETA {r['dfbeta']:+.3f}")
+    return lines
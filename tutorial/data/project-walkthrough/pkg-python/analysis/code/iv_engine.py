@@ -0,0 +1,203 @@
+"""
+Linear IV estimation with weak-instrument diagnostics.
+
+iv_suite() fits, for one endogenous regressor x, outcome y, instruments Z
+and exogenous controls W (with an intercept):
+
+  first stage    x ~ W + Z
+  reduced form   y ~ W + Z
+  OLS            y ~ W + x
+  2SLS           y ~ W + x,  x instrumented by Z
+
+all from ONE QR factorization of the stacked matrix M = [W Z x y].  Every
+regression is a least-squares problem in the coordinates of Q: a regressor
+is a column of R, and the 2SLS fitted value of x is its column of R with the
+rows beyond [W Z] set to zero (that is exactly the projection onto the
+instruments).  Only the small (k x k) systems are solved per regression;
+the data matrix is touched once more per regression, for residuals and the
+HC1 sandwich.
+
+Diagnostics (instruments net of the controls, Z~ = M_W Z):
+
+  robust F     heteroskedasticity-robust Wald test of the first-stage
+               instrument coefficients, divided by L (with one endogenous
+               regressor this is the Kleibergen-Paap rk Wald F)
+  effective F  Montiel Olea & Pflueger (2013): pi' Z~'Z~ pi / tr(V_pi Z~'Z~)
+  AR           Anderson-Rubin test of beta = b: regress y - b x on W + Z and
+               test the instrument coefficients (gamma - b pi).  Its robust
+               variance is quadratic in b,
+                   V(b) = A^-1 (S_yy - 2b S_xy + b^2 S_xx) A^-1,
+               with S_uv = sum z~ z~' e_u e_v from the reduced-form and
+               first-stage residuals, so a whole grid of b costs one matrix
+               product (grid basis [1, -2b, b^2] times the stacked S's) plus
+               a batch of L x L solves.  The AR confidence set is the set of
+               b not rejected; it stays valid however weak the instruments.
+  Sargan/J     overidentification tests when L > 1: Sargan (n R^2 of the
+               2SLS residuals on the instruments) and Hansen's J evaluated
+               at the two-step efficient GMM estimate (robust).
+
+SEs are HC1 throughout, matching pyfixest's vcov="hetero".
+"""
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+# Montiel Olea-Pflueger 5% critical value for a worst-case bias of 10% of
+# the OLS bias, one instrument (for L > 1 it depends on the data).
+EFFECTIVE_F_CRITICAL = 23.109
+
+
+def _layout(df, outcome, endog, instruments, controls, intercept):
+    """Stack [W Z x y] and record where each block lives."""
+    w_names = (["Intercept"] if intercept else []) + list(controls)
+    cols = list(controls) + list(instruments) + [endog, outcome]
+    data = df[cols].dropna().to_numpy(dtype=float)
+    n = len(data)
+    blocks = ([np.ones((n, 1))] if intercept else []) + [data]
+    M = np.hstack(blocks)
+    kw, L = len(w_names), len(instruments)
+    return M, {
+        "w": list(range(kw)),
+        "z": list(range(kw, kw + L)),
+        "x": kw + L,
+        "y": kw + L + 1,
+        "names": w_names + list(instruments) + [endog, outcome],
+    }
+
+
+def _regress(Q, R, M, target, cols, names, project=None):
+    """Least squares of column target on cols, in the coordinates of Q.
+
+    project=(col, rows) replaces regressor col by its projection onto the
+    first rows columns of Q (2SLS).  Returns coefficients, HC1 vcov and
+    residuals.
+    """
+    C = R[:, cols].copy()
+    if project is not None:
+        col, rows = project
+        C[rows:, cols.index(col)] = 0.0
+    A = C.T @ C
+    beta = np.linalg.solve(A, C.T @ R[:, target])
+    resid = M[:, target] - M[:, cols] @ beta
+
+    X = M[:, cols] if project is None else Q @ C
+    n, k = X.shape
+    a_inv = np.linalg.inv(A)
+    meat = (X * (resid ** 2)[:, None]).T @ X
+    vcov = a_inv @ meat @ a_inv * n / (n - k)
+
+    y = M[:, target]
+    r2 = 1 - (resid @ resid) / ((y - y.mean()) @ (y - y.mean()))
+    se = np.sqrt(np.diag(vcov))
+    tstat = beta / se
+    labels = [names[c] for c in cols]
+    return {
+        "coef": pd.Series(beta, index=labels),
+        "se": pd.Series(se, index=labels),
+        "pvalue": pd.Series(2 * stats.t.sf(np.abs(tstat), n - k), index=labels),
+        "vcov": vcov,
+        "resid": resid,
+        "nobs": n,
+        "r2": np.nan if project is not None else r2,
+    }
+
+
+def _ar_stat(ar, grid):
+    """AR statistic (F form) for every b in grid, vectorized."""
+    grid = np.asarray(grid, dtype=float)
+    L = len(ar["gamma"])
+    basis = np.column_stack([np.ones_like(grid), -2 * grid, grid ** 2])
+    meats = (basis @ ar["S"].reshape(3, L * L)).reshape(-1, L, L)
+    V = ar["A_inv"] @ meats @ ar["A_inv"] * ar["dof_scale"]
+    g = ar["gamma"][None, :] - grid[:, None] * ar["pi"][None, :]
+    stat = np.einsum("gi,gi->g", g, np.linalg.solve(V, g[..., None])[..., 0])
+    return stat / L
+
+
+def anderson_rubin(result, grid, level=0.95):
+    """AR statistics, p-values and confidence set over a grid of beta values.
+
+    Returns a dict with the grid table and the confidence set as a list of
+    (lo, hi) intervals of accepted grid points.  An interval that reaches
+    the end of the grid is open there (the set may be unbounded).
+    """
+    ar = result["ar"]
+    grid = np.asarray(grid, dtype=float)
+    stat = _ar_stat(ar, grid)
+    L = len(ar["gamma"])
+    pval = stats.f.sf(stat, L, ar["df_resid"])
+    accept = pval >= 1 - level
+
+    intervals = []
+    edges = np.flatnonzero(np.diff(np.concatenate([[0], accept.astype(int), [0]])))
+    for start, stop in zip(edges[::2], edges[1::2]):
+        intervals.append((grid[start], grid[stop - 1]))
+    return {
+        "table": pd.DataFrame({"beta": grid, "ar_stat": stat, "pvalue": pval,
+                               "accepted": accept}),
+        "intervals": intervals,
+        "open_lower": bool(accept[0]),
+        "open_upper": bool(accept[-1]),
+    }
+
+
+def iv_suite(df, outcome, endog, instruments, controls=(), intercept=True):
+    """First stage, reduced form, OLS and 2SLS plus IV diagnostics.
+
+    Returns a dict with "first_stage", "reduced_form", "ols" and "tsls"
+    (each: coef, se, pvalue, vcov, resid, nobs, r2) and "diagnostics".
+    """
+    instruments = list(instruments)
+    M, lay = _layout(df, outcome, endog, instruments, controls, intercept)
+    Q, R = np.linalg.qr(M)
+    w, z, x, y, names = lay["w"], lay["z"], lay["x"], lay["y"], lay["names"]
+    n, L, kz = len(M), len(z), len(w) + len(z)
+
+    first = _regress(Q, R, M, x, w + z, names)
+    reduced = _regress(Q, R, M, y, w + z, names)
+    ols = _regress(Q, R, M, y, w + [x], names)
+    tsls = _regress(Q, R, M, y, w + [x], names, project=(x, kz))
+
+    # ── Instrument strength (instruments net of controls) ──
+    zt = Q[:, len(w):kz] @ R[len(w):kz, len(w):kz]
+    zz = zt.T @ zt
+    pi = first["coef"].iloc[len(w):].to_numpy()
+    v_pi = first["vcov"][len(w):, len(w):]
+    gamma = reduced["coef"].iloc[len(w):].to_numpy()
+    f_robust = pi @ np.linalg.solve(v_pi, pi) / L
+    f_eff = pi @ zz @ pi / np.trace(v_pi @ zz)
+
+    # ── Anderson-Rubin ingredients: S_uv = sum z~ z~' e_u e_v ──
+    e_x, e_y = first["resid"], reduced["resid"]
+    S = np.stack([np.einsum("ni,nj,n->ij", zt, zt, a * b)
+                  for a, b in ((e_y, e_y), (e_y, e_x), (e_x, e_x))])
+    ar = {"gamma": gamma, "pi": pi, "S": S, "A_inv": np.linalg.inv(zz),
+          "dof_scale": n / (n - kz), "df_resid": n - kz}
+
+    diag = {
+        "n_instruments": L,
+        "robust_f": f_robust,
+        "robust_f_pvalue": stats.f.sf(f_robust, L, n - kz),
+        "effective_f": f_eff,
+        "effective_f_critical": EFFECTIVE_F_CRITICAL if L == 1 else np.nan,
+    }
+
+    # ── Overidentification (L > 1) ──
+    if L > 1:
+        u = tsls["resid"]
+        zu = zt.T @ u
+        diag["sargan"] = n * (zu @ np.linalg.solve(zz, zu)) / (u @ u)
+        diag["sargan_pvalue"] = stats.chi2.sf(diag["sargan"], L - 1)
+
+        s_hat = np.einsum("ni,nj,n->ij", zt, zt, u * u) / n
+        zx, zy = zt.T @ M[:, x], zt.T @ M[:, y]
+        b_gmm = (zx @ np.linalg.solve(s_hat, zy)) / (zx @ np.linalg.solve(s_hat, zx))
+        g = zy - b_gmm * zx
+        diag["hansen_j"] = g @ np.linalg.solve(s_hat, g) / n
+        diag["hansen_j_pvalue"] = stats.chi2.sf(diag["hansen_j"], L - 1)
+        diag["gmm_coef"] = b_gmm
+
+    return {"first_stage": first, "reduced_form": reduced, "ols": ols,
+            "tsls": tsls, "diagnostics": diag, "ar": ar,
+            "endog": endog, "instruments": instruments}
@@ -0,0 +1,292 @@
+"""
+Subsamples as boolean masks over one base design, for robustness tables.
+
+A robustness table fits one specification on many samples (South only,
+before 2011, each outcome, ...).  Subsetting the DataFrame for each sample
+copies every column and starts every demeaning from scratch.  Design takes
+the columns the models use once, as one float matrix, together with the
+fixed-effect and cluster codes; a sample is then a boolean mask over its
+rows:
+
+    design = Design(df, ["fatal_crashes", "post_treated", "log_pop"],
+                    fixef=["state_fips", "year"], vcov={"CRV1": "state_fips"})
+    south = design.sample(df["region"] == "South")
+    m3 = south.fit("fatal_crashes", ["post_treated"])
+
+The mask enters the fixed-effect projections as zero weights
+(hdfe.demean), so out-of-sample rows take part in no group mean and no
+frame is subset.  Each sample demeans all the design's columns at once
+(Frisch-Waugh-Lovell) and keeps only the sufficient statistics the
+design's vcov needs:
+
+  C     = Z'WZ                      always
+  C_g   = Z_g'W_g Z_g per cluster   CRV1
+  rows  = W^1/2 Z over the sample   hetero (the meat needs every residual)
+
+Every model on a sample, with any outcome and any subset of the regressors,
+is then a solve on C, as in hdfe.feols() and with its small-sample
+corrections, so the estimates and SEs match a fit on the subset frame.
+Samples are cached by mask: the models of a region x period x outcome grid
+that share a sample share one demeaning, and for iid or CRV1 SEs each
+sample adds only C (and C_g), not a copy of its rows.
+
+Rows with a missing value in any of the design's columns are out of every
+sample; singletons are dropped within each sample, as hdfe.feols() does.
+
+fit() returns hdfe.FeolsResult, which pyfixest's etable() does not accept;
+etable() below lays out any mix of pyfixest and hdfe results in the same
+way (Markdown, or LaTeX with booktabs).
+"""
+
+import hashlib
+import re
+
+import numpy as np
+import pandas as pd
+
+import hdfe
+
+
+# ─── Design and samples ───────────────────────────────────────────────────────
+
+class Design:
+    """The base design: the columns as floats, the fixed-effect terms and
+    the cluster codes, encoded once for all samples.  vcov is as in
+    hdfe.feols() and applies to every fit."""
+
+    def __init__(self, data, columns, fixef=(), vcov=None, weights=None,
+                 tol=hdfe.TOL, maxiter=hdfe.MAXITER):
+        self.columns = list(dict.fromkeys(columns))
+        self.fixef = list(fixef)
+        self.vcov_type, self.cluster = hdfe._vcov_spec(vcov)
+        self.tol, self.maxiter = tol, maxiter
+        self.M = data[self.columns].to_numpy(dtype=float)
+        self.w = (np.ones(len(data)) if weights is None
+                  else data[weights].to_numpy(dtype=float))
+        self.terms = hdfe._encode(data, hdfe.fe_terms(data, self.fixef))
+        self.cluster_codes = None if self.cluster is None else hdfe._factor(data, [self.cluster])
+        self.complete = np.isfinite(self.M).all(axis=1) & np.isfinite(self.w)
+        for t in self.terms:
+            if t["basis"] is not None:
+                self.complete &= np.isfinite(t["basis"]).all(axis=1)
+        self._samples = {}
+
+    def sample(self, mask=None):
+        """The Sample of the rows where mask is True (all rows if None),
+        built on first use and cached."""
+        mask = self.complete if mask is None else np.asarray(mask, dtype=bool) & self.complete
+        key = hashlib.sha1(np.packbits(mask).tobytes()).hexdigest()
+        if key not in self._samples:
+            self._samples[key] = Sample(self, mask)
+        return self._samples[key]
+
+
+def _drop_singletons(terms, mask):
+    """mask less the rows alone in their level of some factor, repeatedly."""
+    keep = mask.copy()
+    codes = [t["codes"] for t in terms if t["intercept"]]
+    while codes:
+        single = np.zeros(len(keep), dtype=bool)
+        for c in codes:
+            counts = np.bincount(c[keep], minlength=c.max() + 1)
+            single |= keep & (counts[c] == 1)
+        if not single.any():
+            break
+        keep &= ~single
+    return keep
+
+
+def _restrict(terms, idx):
+    """terms re-encoded for the rows idx (levels absent from them dropped)."""
+    out = []
+    for t in terms:
+        codes, levels = pd.factorize(t["codes"][idx], sort=True)
+        out.append({**t, "codes": codes, "n_levels": len(levels),
+                    "basis": None if t["basis"] is None else t["basis"][idx]})
+    return out
+
+
+class Sample:
+    """Sufficient statistics of one masked sample of a Design."""
+
+    def __init__(self, design, mask):
+        self.design = design
+        self.mask = _drop_singletons(design.terms, mask)
+        self.n_singletons = int(mask.sum() - self.mask.sum())
+        idx = np.flatnonzero(self.mask)
+        self.N = len(idx)
+        if not self.N:
+            raise ValueError("the sample has no observations")
+        w = np.where(self.mask, design.w, 0.0)
+
+        if design.terms:
+            Z, self.demean_info = hdfe.demean(design.M, design.terms, w,
+                                              design.tol, design.maxiter)
+            self.names = list(design.columns)
+        else:
+            Z, self.demean_info = np.column_stack([np.ones(len(w)), design.M]), None
+            self.names = ["Intercept"] + list(design.columns)
+        Zw = Z[idx] * np.sqrt(w[idx])[:, None]
+        self.C = Zw.T @ Zw
+
+        # Weighted means and raw sums of squares, for the R2
+        ws = w[idx]
+        raw = design.M[idx]
+        self.mean = ws @ raw / ws.sum()
+        self.tss = ws @ (raw - self.mean) ** 2
+
+        self.terms = _restrict(design.terms, idx)
+        self.fixef_dof = hdfe._fixef_dof(self.terms) if self.terms else 0
+        self.G = self.Cg = self.fixef_dof_cl = self.rows = None
+        if design.vcov_type == "CRV1":
+            cl, _ = pd.factorize(design.cluster_codes[idx], sort=True)
+            self.G = int(cl.max()) + 1
+            order = np.argsort(cl, kind="stable")
+            bounds = np.searchsorted(cl[order], np.arange(self.G + 1))
+            Zs = Zw[order]
+            self.Cg = np.stack([Zs[a:b].T @ Zs[a:b] for a, b in zip(bounds[:-1], bounds[1:])])
+            self.fixef_dof_cl = hdfe._fixef_dof(self.terms, cl) if self.terms else 0
+        elif design.vcov_type == "hetero":
+            self.rows = Zw
+
+    def fit(self, depvar, xs):
+        """hdfe.FeolsResult of depvar on xs (plus the fixed effects, or an
+        intercept without them) on this sample."""
+        vcov_type, cluster = self.design.vcov_type, self.design.cluster
+        names = ([] if self.design.terms else ["Intercept"]) + list(xs)
+        R = [self.names.index(x) for x in names]
+        yi = self.names.index(depvar)
+
+        # Collinear regressors: pivoted QR of a square root of C[R, R] has the
+        # same R factor as the weighted, demeaned regressors
+        A = self.C[np.ix_(R, R)]
+        vals, vecs = np.linalg.eigh(A)
+        root = (vecs * np.sqrt(np.clip(vals, 0, None))).T
+        keep, dropped = hdfe._drop_collinear(root, names)
+        R = [R[i] for i in keep]
+        names = [names[i] for i in keep]
+
+        A = self.C[np.ix_(R, R)]
+        bread = np.linalg.inv(A)
+        beta = bread @ self.C[R, yi]
+        ssu = self.C[yi, yi] - 2 * beta @ self.C[R, yi] + beta @ A @ beta
+        N, k = self.N, len(beta)
+
+        G, u_hat = None, None
+        if vcov_type == "CRV1":
+            G = self.G
+            df_k = k + self.fixef_dof_cl
+            scores = self.Cg[:, R, yi] - self.Cg[:, R][:, :, R] @ beta        # (G, k)
+            V = bread @ (scores.T @ scores) @ bread * G / (G - 1) * (N - 1) / (N - df_k)
+            df_t = G - 1
+        elif vcov_type == "hetero":
+            df_k = k + self.fixef_dof
+            Xw = self.rows[:, R]
+            u_hat = self.rows[:, yi] - Xw @ beta
+            V = bread @ ((Xw * (u_hat ** 2)[:, None]).T @ Xw) @ bread * N / (N - df_k)
+            df_t = N - df_k
+        else:
+            df_k = k + self.fixef_dof
+            V = bread * ssu / (N - df_k)
+            df_t = N - df_k
+
+        ssy = self.tss[self.design.columns.index(depvar)]
+        if self.terms:
+            k_fe_r2 = sum(kf - 1 for kf in hdfe._fe_params(self.terms)) + 1
+            adj = (N - 1) / (N - k - k_fe_r2)
+            r2_within = 1 - ssu / self.C[yi, yi]
+        else:
+            adj = (N - 1) / (N - k)
+            r2_within = np.nan
+
+        fml = f"{depvar} ~ {' + '.join(xs)}" + (f" | {' + '.join(self.design.fixef)}" if self.design.fixef else "")
+        return hdfe.FeolsResult(
+            fml=fml, depvar=depvar, coefnames=names, beta=beta, vcov=V,
+            vcov_type=vcov_type, clustervar=cluster, N=N, G=G, df_t=df_t,
+            u_hat=u_hat, r2=1 - ssu / ssy, adj_r2=1 - ssu / ssy * adj,
+            r2_within=r2_within, rmse=np.sqrt(ssu / N), fixef=self.design.fixef,
+            n_singletons=self.n_singletons, demean=self.demean_info, dropped=dropped,
+        )
+
+
+def grid(design, samples, outcomes, xs, coefficient=None):
+    """One row per (sample, outcome): samples maps a label (or a tuple of
+    labels) to a mask.  Returns the sample labels, outcome, n_obs,
+    coefficient, std_error, pvalue, ci_lower and ci_upper of coefficient
+    (default: the first of xs)."""
+    coefficient = coefficient or xs[0]
+    rows = []
+    for label, mask in samples.items():
+        sample = design.sample(mask)
+        for outcome in outcomes:
+            fit = sample.fit(outcome, xs)
+            ci = fit.confint().loc[coefficient]
+            labels = label if isinstance(label, tuple) else (label,)
+            rows.append({**{f"sample_{i}": l for i, l in enumerate(labels)}, "outcome": outcome,
+                         "n_obs": fit._N, "coefficient": fit.coef()[coefficient],
+                         "std_error": fit.se()[coefficient], "pvalue": fit.pvalue()[coefficient],
+                         "ci_lower": ci.iloc[0], "ci_upper": ci.iloc[1]})
+    return pd.DataFrame(rows)
+
+
+# ─── Tables ───────────────────────────────────────────────────────────────────
+
+def _fixef_names(model):
+    fixef = getattr(model, "_fixef", None)
+    if not fixef:
+        return []
+    names = fixef.split("+") if isinstance(fixef, str) else fixef
+    return [f.strip() for f in names]
+
+
+def _stars(p):
+    return "***" if p < 0.001 else "**" if p < 0.01 else "*" if p < 0.05 else ""
+
+
+def etable(models, labels=None, type="md", digits=3, notes=None):
+    """Side-by-side table of fitted models (pyfixest or hdfe results):
+    coefficients with stars over SEs, fixed effects, observations and R2.
+    labels renames variables and dependent variables; type is "md" or "tex";
+    notes is a list of extra footnote lines (what each column's sample is)."""
+    labels = labels or {}
+    name = lambda v: labels.get(v, v)
+    coefs = list(dict.fromkeys(c for m in models for c in m.coef().index if c != "Intercept"))
+    fixef = list(dict.fromkeys(f for m in models for f in _fixef_names(m)))
+    heads = [f"({i})" for i in range(1, len(models) + 1)]
+    f = f"{{:.{digits}f}}"
+
+    body = [[""] + [name(m._depvar) for m in models]]
+    for c in coefs:
+        est, se = [name(c)], [""]
+        for m in models:
+            if c in m.coef().index:
+                est.append(f.format(m.coef()[c]) + _stars(m.pvalue()[c]))
+                se.append("(" + f.format(m.se()[c]) + ")")
+            else:
+                est.append("")
+                se.append("")
+        body += [est, se]
+    rule = len(body)
+    body += [[v] + ["x" if v in _fixef_names(m) else "-" for m in models] for v in fixef]
+    body += [["Observations"] + [f"{m._N:,}" for m in models],
+             ["R2"] + [f.format(m._r2) for m in models]]
+    footer = ["Significance levels: * p < 0.05, ** p < 0.01, *** p < 0.001; SEs in parentheses."]
+    footer += notes or []
+
+    if type == "md":
+        table = pd.DataFrame(body, columns=[""] + heads).to_markdown(index=False)
+        return table + "\n" + "\n".join(footer)
+    if type != "tex":
+        raise ValueError(f"type must be 'md' or 'tex', not {type!r}")
+
+    def row(cells):
+        cells = [str(c) if "$" in str(c) else str(c).replace("_", r"\_") for c in cells]
+        cells = [re.sub(r"(\*+)$", r"$^{\1}$", c) for c in cells]
+        return " & ".join(cells) + r" \\"
+    lines = [r"\begin{tabular}{l" + "c" * len(models) + "}", r"\toprule",
+             row([""] + heads), row(body[0]), r"\midrule"]
+    lines += [row(r) for r in body[1:rule]] + [r"\midrule"]
+    body[-1][0] = "$R^2$"
+    lines += [row(r) for r in body[rule:]] + [r"\bottomrule", r"\end{tabular}"]
+    lines += [r"\par\footnotesize " + " ".join(footer)]
+    return "\n".join(lines)
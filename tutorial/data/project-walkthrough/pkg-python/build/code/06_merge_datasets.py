@@ -1,7 +1,8 @@
 """
 Build Script 06: Merge Datasets
 Merges crash, demographic, policy adoption, and state name
-datasets into a single analysis panel.
+datasets into a single analysis panel, cast to its dtype contract
+(SCHEMA; see schema.py) before it is written.
 """
 import os
 from pathlib import Path
@@ -12,6 +13,19 @@ ROOT = Path(os.environ.get("PROJECT_ROOT", Path(__file__).parent.parent.parent))
 import numpy as np
 import pandas as pd
 
+import schema
+
+# One row per state-year.  adoption_year is missing for states that never
+# adopt, so it is a float; years are exact in float32.
+SCHEMA = {
+    "state_fips": "int8", "year": "int16",
+    "fatal_crashes": "int32", "serious_crashes": "int32", "total_crashes": "int32",
+    "fatal_share": "float32", "population": "float64", "median_income": "float64",
+    "pct_urban": "float32", "policy_adopted": "int8", "adoption_year": "float32",
+    "state_name": "category", "region": "category", "post_treated": "int8",
+    "log_pop": "float64",
+}
+
 crashes     = pd.read_csv(ROOT / "build" / "output" / "crashes_state_year.csv")
 demo        = pd.read_csv(ROOT / "build" / "output" / "demographics_state_year.csv")
 policy      = pd.read_csv(ROOT / "build" / "input" / "policy_adoptions.csv")
@@ -30,6 +44,7 @@ panel["post_treated"] = (
 # Log population
 panel["log_pop"] = np.log(panel["population"])
 
+panel = schema.conform(panel, SCHEMA)
 panel.to_csv(ROOT / "build" / "output" / "analysis_panel.csv", index=False)
 
 print(f"  Rows in analysis panel: {len(panel):,}")
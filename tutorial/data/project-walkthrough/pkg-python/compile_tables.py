@@ -0,0 +1,201 @@
+"""
+Compile LaTeX tables to standalone PDFs.
+
+Each analysis/output/tables/*.tex fragment is wrapped in a standalone
+document and compiled with pdflatex.  Compilation is incremental and
+parallel:
+
+  - A SHA-256 hash of each table (fragment + wrapper preamble) is stored in
+    .compile_cache.json.  Tables whose hash is unchanged and whose PDF still
+    exists are skipped.
+  - Changed tables compile concurrently, each in its own temporary
+    directory, so no .aux/.log files ever land in the tables folder.  The
+    finished PDF is moved into place with os.replace(), which is atomic:
+    a failed or interrupted run never leaves a half-written PDF behind.
+
+Used by main.py; can also be run on its own:
+    python compile_tables.py            # incremental
+    python compile_tables.py --force    # recompile everything
+
+Set PDFLATEX=/path/to/pdflatex to use a specific (or fake) executable.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+ROOT = Path(os.environ.get("PROJECT_ROOT", Path(__file__).parent)).resolve()
+TABLES_DIR = ROOT / "analysis" / "output" / "tables"
+CACHE_NAME = ".compile_cache.json"
+
+PREAMBLE = (
+    "\\documentclass[border=10pt]{standalone}\n"
+    "\\usepackage{booktabs,amsmath,threeparttable,makecell}\n"
+    "\\begin{document}\n"
+)
+
+
+def wrapper_source(tex_file):
+    """Standalone document that \\input's one table fragment."""
+    return PREAMBLE + f"\\input{{{tex_file.name}}}\n" + "\\end{document}\n"
+
+
+def source_hash(tex_file):
+    """Hash of everything that determines the compiled PDF."""
+    h = hashlib.sha256()
+    h.update(wrapper_source(tex_file).encode())
+    h.update(tex_file.read_bytes())
+    return h.hexdigest()
+
+
+def load_cache(tables_dir):
+    path = tables_dir / CACHE_NAME
+    if not path.exists():
+        return {}
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def save_cache(tables_dir, cache):
+    # Write-then-rename so an interrupted run can't corrupt the cache
+    path = tables_dir / CACHE_NAME
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(cache, indent=2, sort_keys=True) + "\n")
+    os.replace(tmp, path)
+
+
+def compile_table(tex_file, pdflatex):
+    """Compile one table in a private temp directory.
+
+    Returns (ok, seconds, log_tail).
+    """
+    t0 = time.perf_counter()
+    target = tex_file.with_suffix(".pdf")
+    with tempfile.TemporaryDirectory(prefix=f"{tex_file.stem}-") as tmp:
+        tmp = Path(tmp)
+        shutil.copy2(tex_file, tmp / tex_file.name)
+        wrapper = tmp / f"{tex_file.stem}.compile.tex"
+        wrapper.write_text(wrapper_source(tex_file))
+
+        result = subprocess.run(
+            [pdflatex, "-interaction=nonstopmode", wrapper.name],
+            cwd=str(tmp),
+            capture_output=True,
+            text=True,
+        )
+        pdf_out = wrapper.with_suffix(".pdf")
+        ok = pdf_out.exists()
+        if ok:
+            # Stage next to the target first: os.replace() is only atomic
+            # within one filesystem, and /tmp is often a different one.
+            staged = target.with_name(f".{target.name}.part")
+            shutil.copyfile(pdf_out, staged)
+            os.replace(staged, target)
+        log_tail = "\n".join((result.stdout or "").splitlines()[-5:])
+    # The temp directory (and every aux/log file in it) is gone at this point
+    return ok, time.perf_counter() - t0, log_tail
+
+
+def compile_tables(tables_dir=TABLES_DIR, pdflatex=None, jobs=None, force=False):
+    """Compile every changed .tex table in tables_dir.
+
+    Returns a list of dicts with one entry per table:
+    {"table", "status" ("compiled" | "cached" | "failed"), "seconds"}.
+    """
+    tables_dir = Path(tables_dir)
+    tex_files = sorted(
+        p for p in tables_dir.glob("*.tex") if not p.name.endswith(".compile.tex")
+    )
+    if not tex_files:
+        return []
+
+    cache = {} if force else load_cache(tables_dir)
+    hashes = {p.name: source_hash(p) for p in tex_files}
+
+    todo, report = [], []
+    for p in tex_files:
+        if cache.get(p.name) == hashes[p.name] and p.with_suffix(".pdf").exists():
+            report.append({"table": p.name, "status": "cached", "seconds": 0.0})
+        else:
+            todo.append(p)
+
+    if todo:
+        jobs = jobs or min(len(todo), os.cpu_count() or 1)
+        # pdflatex runs in a subprocess, so threads are enough to keep
+        # several compilers busy at once
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            results = list(pool.map(lambda p: compile_table(p, pdflatex), todo))
+        for p, (ok, seconds, log_tail) in zip(todo, results):
+            if ok:
+                cache[p.name] = hashes[p.name]
+                report.append({"table": p.name, "status": "compiled", "seconds": seconds})
+            else:
+                cache.pop(p.name, None)
+                report.append({"table": p.name, "status": "failed",
+                               "seconds": seconds, "log": log_tail})
+
+    # Forget tables that no longer exist
+    cache = {k: v for k, v in cache.items() if k in hashes}
+    save_cache(tables_dir, cache)
+    return sorted(report, key=lambda r: r["table"])
+
+
+def print_report(report):
+    for r in report:
+        name = Path(r["table"]).with_suffix(".pdf").name
+        if r["status"] == "compiled":
+            print(f"  Compiled: {name:<32} {r['seconds']:6.2f}s")
+        elif r["status"] == "cached":
+            print(f"  Cached:   {name:<32}   (unchanged)")
+        else:
+            print(f"  WARNING: Failed to compile {r['table']} ({r['seconds']:.2f}s)")
+            if r.get("log"):
+                print("    " + r["log"].replace("\n", "\n    "))
+    n_compiled = sum(r["status"] == "compiled" for r in report)
+    n_cached = sum(r["status"] == "cached" for r in report)
+    total = sum(r["seconds"] for r in report)
+    print(f"  {n_compiled} compiled, {n_cached} unchanged "
+          f"({total:.2f}s of pdflatex time)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--force", action="store_true",
+                        help="recompile every table, ignoring the cache")
+    parser.add_argument("--jobs", type=int, default=None,
+                        help="number of tables to compile at once")
+    args = parser.parse_args(argv)
+
+    tex_files = sorted(TABLES_DIR.glob("*.tex"))
+    pdflatex = os.environ.get("PDFLATEX") or shutil.which("pdflatex")
+
+    if not tex_files:
+        print("\nNo .tex files found — skipping PDF compilation.")
+        return 0
+    if not pdflatex:
+        print("\npdflatex not found — skipping PDF compilation.")
+        print("Install LaTeX to compile tables: https://www.tug.org/texlive/")
+        return 0
+
+    print(f"\n{'='*60}")
+    print("COMPILING LATEX TABLES TO PDF")
+    print(f"{'='*60}")
+    t0 = time.perf_counter()
+    report = compile_tables(TABLES_DIR, pdflatex, jobs=args.jobs, force=args.force)
+    print_report(report)
+    print(f"  Wall time: {time.perf_counter() - t0:.2f}s")
+    return 1 if any(r["status"] == "failed" for r in report) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
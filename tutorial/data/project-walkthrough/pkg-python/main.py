@@ -2,80 +2,97 @@
 
 Usage: cd into the pkg-python/ folder, then run:
     python main.py
+
+Every script is profiled (wall and CPU time, peak memory, rows read and
+written; see run_report.py).  The run is saved to run_report.json and
+appended to run_history.jsonl, and a summary is printed at the end.
 """
-import os, subprocess, sys
+import os, sys
 from pathlib import Path
 
+import run_report
+
 ROOT = Path(__file__).parent.resolve()
-os.environ["PROJECT_ROOT"] = str(ROOT)
-
-# Create output directories (zip may strip empty folders)
-(ROOT / "build" / "output").mkdir(parents=True, exist_ok=True)
-(ROOT / "analysis" / "output" / "tables").mkdir(parents=True, exist_ok=True)
-(ROOT / "analysis" / "output" / "figures").mkdir(parents=True, exist_ok=True)
-
-scripts = [
-    "build/code/01_filter_crashes.py",
-    "build/code/02_collapse_crashes.py",
-    "build/code/03_reshape_crashes.py",
-    "build/code/04_append_demographics.py",
-    "build/code/05_collapse_demographics.py",
-    "build/code/06_merge_datasets.py",
-    "analysis/code/01_descriptive_table.py",
-    "analysis/code/02_dd_regression.py",
-    "analysis/code/03_event_study.py",
-    "analysis/code/04_dd_table.py",
-    "analysis/code/05_iv.py",
-    "analysis/code/06_rd.py",
+
+# Each script with the data files it reads (for the rows-in count; what it
+# writes is found by looking for new or modified files in the output folders)
+SCRIPTS = [
+    ("build/code/01_filter_crashes.py",       ["build/input/crash_data.csv"]),
+    ("build/code/02_collapse_crashes.py",     ["build/output/crashes_filtered.csv"]),
+    ("build/code/03_reshape_crashes.py",      ["build/output/crashes_collapsed.csv"]),
+    ("build/code/04_append_demographics.py",  ["build/input/demographic_survey"]),
+    ("build/code/05_collapse_demographics.py", ["build/output/demographics_combined.csv"]),
+    ("build/code/06_merge_datasets.py",       ["build/output/crashes_state_year.csv",
+                                               "build/output/demographics_state_year.csv",
+                                               "build/input/policy_adoptions.csv",
+                                               "build/input/state_names.csv"]),
+    ("analysis/code/01_descriptive_table.py", ["build/output/analysis_panel.csv"]),
+    ("analysis/code/02_dd_regression.py",     ["build/output/analysis_panel.csv"]),
+    ("analysis/code/03_event_study.py",       ["build/output/analysis_panel.csv"]),
+    ("analysis/code/04_dd_table.py",          ["build/output/analysis_panel.csv"]),
+    ("analysis/code/05_iv.py",                ["analysis/code/iv_data.csv"]),
+    ("analysis/code/06_rd.py",                ["analysis/code/rd_data.csv"]),
 ]
+OUTPUT_DIRS = ["build/output", "analysis/output"]
+
+
+def run_scripts(root, report, scripts=SCRIPTS):
+    """Run scripts (paths relative to root) with PROJECT_ROOT=root, adding one
+    record per script to report.  Stops at the first failure; returns whether
+    every script succeeded."""
+    root = Path(root)
+    # Create output directories (zip may strip empty folders)
+    (root / "build" / "output").mkdir(parents=True, exist_ok=True)
+    (root / "analysis" / "output" / "tables").mkdir(parents=True, exist_ok=True)
+    (root / "analysis" / "output" / "figures").mkdir(parents=True, exist_ok=True)
+    env = dict(os.environ, PROJECT_ROOT=str(root))
+    output_dirs = [root / d for d in OUTPUT_DIRS]
+
+    for i, (script, inputs) in enumerate(scripts, 1):
+        print(f"\n[{i}/{len(scripts)}] Running: {script}")
+        before = run_report.snapshot(output_dirs)
+        returncode, metrics = run_report.run_script([sys.executable, str(root / script)],
+                                                    cwd=str(root), env=env)
+        name = f"{script.split('/')[0]}/{Path(script).stem}"
+        report.add(run_report.stage_record(
+            name, "ran" if returncode == 0 else "failed", **metrics,
+            rows_in=run_report.total_rows(root / p for p in inputs),
+            rows_out=run_report.total_rows(run_report.written_since(before, output_dirs)),
+        ))
+        if returncode != 0:
+            print(f"ERROR: {script} failed")
+            return False
+    return True
+
 
-for i, script in enumerate(scripts, 1):
-    print(f"\n[{i}/{len(scripts)}] Running: {script}")
-    result = subprocess.run([sys.executable, str(ROOT / script)], cwd=str(ROOT))
-    if result.returncode != 0:
-        print(f"ERROR: {script} failed")
+def main():
+    os.environ["PROJECT_ROOT"] = str(ROOT)
+    report = run_report.RunReport(ROOT, "pkg-python")
+    if not run_scripts(ROOT, report):
+        report.finish("failed")
         sys.exit(1)
 
-# ─── Compile LaTeX tables to PDF ─────────────────────────────────────────────
-import shutil
-
-tables_dir = ROOT / "analysis" / "output" / "tables"
-tex_files = sorted(tables_dir.glob("*.tex"))
-
-if tex_files and shutil.which("pdflatex"):
-    print(f"\n{'='*60}")
-    print("COMPILING LATEX TABLES TO PDF")
-    print(f"{'='*60}")
-    for tex_file in tex_files:
-        wrapper = tex_file.with_suffix(".compile.tex")
-        wrapper.write_text(
-            "\\documentclass[border=10pt]{standalone}\n"
-            "\\usepackage{booktabs,amsmath,threeparttable,makecell}\n"
-            "\\begin{document}\n"
-            f"\\input{{{tex_file.name}}}\n"
-            "\\end{document}\n"
-        )
-        result = subprocess.run(
-            ["pdflatex", "-interaction=nonstopmode", wrapper.name],
-            cwd=str(tables_dir),
-            capture_output=True,
-        )
-        pdf_out = wrapper.with_suffix(".pdf")
-        target = tex_file.with_suffix(".pdf")
-        if pdf_out.exists():
-            pdf_out.rename(target)
-            print(f"  Compiled: {target.name}")
-        else:
-            print(f"  WARNING: Failed to compile {tex_file.name}")
-        # Clean up auxiliary files
-        for ext in [".compile.tex", ".compile.aux", ".compile.log"]:
-            f = tables_dir / (tex_file.stem + ext)
-            if f.exists():
-                f.unlink()
-elif not tex_files:
-    print("\nNo .tex files found — skipping PDF compilation.")
-else:
-    print("\npdflatex not found — skipping PDF compilation.")
-    print("Install LaTeX to compile tables: https://www.tug.org/texlive/")
-
-print("\nAll scripts completed successfully.")
+    # ─── Compile LaTeX tables to PDF ─────────────────────────────────────────
+    # Only tables whose .tex changed since the last run are recompiled; see
+    # compile_tables.py for the caching and parallel-compile details.
+    import compile_tables
+
+    metrics = {}
+    with run_report.measure(metrics):
+        returncode = compile_tables.main([])
+    report.add(run_report.stage_record(
+        "latex/compile_tables", "ran" if returncode == 0 else "failed", **metrics))
+    if returncode != 0:
+        print("ERROR: compile_tables failed")
+        report.finish("failed")
+        sys.exit(1)
+
+    report.finish()
+    print("\nRun profile (run_report.json, run_history.jsonl):")
+    print(report.summary())
+
+    print("\nAll scripts completed successfully.")
+
+
+if __name__ == "__main__":
+    main()
@@ -187,7 +187,9 @@ plt.show()
 
 print("""
 Key things to check in event studies:
-1. Pre-treatment coefficients should be near zero (parallel trends)
+1. Pre-treatment coefficients should be near zero (parallel trends);
+   how far the conclusions survive if they are not: HonestDiD-style robust
+   CIs (honest_did.py in the worked examples)
 2. Look for anticipation effects (significant coefficients before t=0)
 3. Post-treatment coefficients show the treatment effect over time
 
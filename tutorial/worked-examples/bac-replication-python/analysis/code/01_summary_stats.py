@@ -1,37 +1,68 @@
 # 01_summary_stats.py - Summary statistics
+#
+# Streams analysis_data.parquet one record batch at a time and folds each
+# batch into mergeable per-group accumulators (stream_stats.py), so the same
+# code works when the input is crash- or person-level FARS that does not fit
+# in memory.  One pass produces the overall table, the by-treatment table
+# and approximate quantiles.
 
-import pandas as pd
 import numpy as np
+import pyarrow.parquet as pq
 
-# Load analysis data
-analysis_data = pd.read_parquet(BUILD / "output" / "analysis_data.parquet")
+import stream_stats
 
-print(f"  Observations: {len(analysis_data)}")
-print(f"  States: {analysis_data['state_fips'].nunique()}")
-print(f"  Years: {analysis_data['year'].min()}-{analysis_data['year'].max()}")
+INPUTS = ["build/output/analysis_data.parquet"]
+OUTPUTS = [
+    "analysis/output/tables/summary_stats.csv",
+    "analysis/output/tables/summary_by_treatment.csv",
+    "analysis/output/tables/summary_quantiles.csv",
+]
 
-# Create output directories
-(ANALYSIS / "output" / "tables").mkdir(parents=True, exist_ok=True)
-(ANALYSIS / "output" / "figures").mkdir(parents=True, exist_ok=True)
 
-# Summary statistics
-summary_cols = ['total_fatalities', 'hr_fatalities', 'nhr_fatalities',
-                'treated', 'ln_hr', 'ln_nhr']
-if 'unemployment' in analysis_data.columns:
-    summary_cols.append('unemployment')
-if 'income' in analysis_data.columns:
-    summary_cols.append('income')
+def run(build, analysis):
+    """Overall, by-treatment and quantile summary tables in one streaming pass."""
+    data_path = build / "output" / "analysis_data.parquet"
 
-summary_stats = analysis_data[summary_cols].describe().T
-summary_stats = summary_stats[['count', 'mean', 'std', 'min', 'max']]
+    # Summary statistics
+    available = set(pq.ParquetFile(data_path).schema_arrow.names)
+    summary_cols = ['total_fatalities', 'hr_fatalities', 'nhr_fatalities',
+                    'treated', 'ln_hr', 'ln_nhr']
+    if 'unemployment' in available:
+        summary_cols.append('unemployment')
+    if 'income' in available:
+        summary_cols.append('income')
 
-# Save
-summary_stats.to_csv(ANALYSIS / "output" / "tables" / "summary_stats.csv")
-print(f"  Saved summary statistics to analysis/output/tables/summary_stats.csv")
+    summary = stream_stats.GroupedSummary(summary_cols, by='treated')
+    n_obs, states, years = 0, set(), [np.inf, -np.inf]
+    for batch in stream_stats.iter_batches(data_path, columns=summary_cols + ['state_fips', 'year']):
+        summary.update(batch)
+        n_obs += batch.num_rows
+        states.update(batch.column('state_fips').unique().to_pylist())
+        year = stream_stats.column_values(batch, 'year')
+        years = [min(years[0], year.min()), max(years[1], year.max())]
 
-# Also by treatment status
-by_treated = analysis_data.groupby('treated')[summary_cols].agg(['mean', 'std', 'count'])
-by_treated.to_csv(ANALYSIS / "output" / "tables" / "summary_by_treatment.csv")
+    print(f"  Observations: {n_obs}")
+    print(f"  States: {len(states)}")
+    print(f"  Years: {int(years[0])}-{int(years[1])}")
 
-print("\n  Summary Statistics:")
-print(summary_stats.round(2).to_string())
+    # Create output directories
+    (analysis / "output" / "tables").mkdir(parents=True, exist_ok=True)
+    (analysis / "output" / "figures").mkdir(parents=True, exist_ok=True)
+
+    summary_stats = summary.summary_table()
+
+    # Save
+    summary_stats.to_csv(analysis / "output" / "tables" / "summary_stats.csv")
+    print(f"  Saved summary statistics to analysis/output/tables/summary_stats.csv")
+
+    # Also by treatment status
+    by_treated = summary.group_table(['mean', 'std', 'count'])
+    by_treated.to_csv(analysis / "output" / "tables" / "summary_by_treatment.csv")
+
+    # Approximate quantiles, overall and by treatment status
+    quantiles = summary.quantile_table()
+    quantiles.to_csv(analysis / "output" / "tables" / "summary_quantiles.csv", index=False)
+    print(f"  Saved quantiles to analysis/output/tables/summary_quantiles.csv")
+
+    print("\n  Summary Statistics:")
+    print(summary_stats.round(2).to_string())
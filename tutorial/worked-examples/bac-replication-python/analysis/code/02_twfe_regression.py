@@ -4,66 +4,153 @@ import pandas as pd
 import numpy as np
 import pyfixest as pf
 
-# Load analysis data
-analysis_data = pd.read_parquet(BUILD / "output" / "analysis_data.parquet")
-
-# Build formula with available controls
-# Policy controls are always present (created in build script)
-controls = ['alr', 'zero_tolerance', 'primary_seatbelt', 'secondary_seatbelt',
-            'mlda21', 'gdl', 'speed_70', 'aggravated_dui']
-if 'unemployment' in analysis_data.columns:
-    controls.append('unemployment')
-if 'income' in analysis_data.columns:
-    controls.append('income')
-
-control_str = ' + '.join(controls) if controls else ''
-
-# TWFE regression: Hit-and-run
-if control_str:
-    hr_formula = f'ln_hr ~ treated + {control_str} | state_fips + year'
-else:
-    hr_formula = 'ln_hr ~ treated | state_fips + year'
-
-print(f"  Running: {hr_formula}")
-hr_results = pf.feols(hr_formula, data=analysis_data, vcov={'CRV1': 'state_fips'})
-
-# TWFE regression: Non-hit-and-run (placebo)
-if control_str:
-    nhr_formula = f'ln_nhr ~ treated + {control_str} | state_fips + year'
-else:
-    nhr_formula = 'ln_nhr ~ treated | state_fips + year'
-
-print(f"  Running: {nhr_formula}")
-nhr_results = pf.feols(nhr_formula, data=analysis_data, vcov={'CRV1': 'state_fips'})
-
-# Save results
-results_summary = pd.DataFrame({
-    'outcome': ['Hit-Run', 'Non-Hit-Run'],
-    'coefficient': [hr_results.coef()['treated'], nhr_results.coef()['treated']],
-    'std_error': [hr_results.se()['treated'], nhr_results.se()['treated']],
-    'pvalue': [hr_results.pvalue()['treated'], nhr_results.pvalue()['treated']],
-    'n_obs': [hr_results._N, nhr_results._N],
-    'r2': [hr_results._adj_r2, nhr_results._adj_r2]
-})
-
-results_summary.to_csv(ANALYSIS / "output" / "tables" / "twfe_results.csv", index=False)
-
-# Print results
-hr_coef = hr_results.coef()['treated']
-hr_se = hr_results.se()['treated']
-hr_pval = hr_results.pvalue()['treated']
-nhr_coef = nhr_results.coef()['treated']
-nhr_se = nhr_results.se()['treated']
-nhr_pval = nhr_results.pvalue()['treated']
-
-print("\n  TWFE Results:")
-print("  " + "="*60)
-print(f"  {'':20} {'Coefficient':>12} {'Std Error':>12} {'p-value':>10}")
-print("  " + "-"*60)
-print(f"  {'Hit-Run:':20} {hr_coef:12.4f} {hr_se:12.4f} {hr_pval:10.4f}")
-print(f"  {'Non-Hit-Run:':20} {nhr_coef:12.4f} {nhr_se:12.4f} {nhr_pval:10.4f}")
-print("  " + "="*60)
-
-# Store results for other scripts
-TWFE_HR_RESULTS = hr_results
-TWFE_NHR_RESULTS = nhr_results
+import figure_export
+import hdfe
+import influence
+
+INPUTS = ["build/output/analysis_data.parquet"]
+OUTPUTS = ["analysis/output/tables/twfe_results.csv",
+           "analysis/output/tables/twfe_trends.csv",
+           "analysis/output/tables/twfe_ppml.csv",
+           "analysis/output/tables/twfe_influence.csv",
+           "analysis/output/figures/twfe_influence.png"]
+
+
+def run(build, analysis):
+    """TWFE estimates for hit-run and non-hit-run fatalities."""
+    # Load analysis data
+    analysis_data = pd.read_parquet(build / "output" / "analysis_data.parquet")
+
+    # Build formula with available controls
+    # Policy controls are always present (created in build script)
+    controls = ['alr', 'zero_tolerance', 'primary_seatbelt', 'secondary_seatbelt',
+                'mlda21', 'gdl', 'speed_70', 'aggravated_dui']
+    if 'unemployment' in analysis_data.columns:
+        controls.append('unemployment')
+    if 'income' in analysis_data.columns:
+        controls.append('income')
+
+    control_str = ' + '.join(controls) if controls else ''
+
+    # TWFE regression: Hit-and-run
+    if control_str:
+        hr_formula = f'ln_hr ~ treated + {control_str} | state_fips + year'
+    else:
+        hr_formula = 'ln_hr ~ treated | state_fips + year'
+
+    print(f"  Running: {hr_formula}")
+    hr_results = pf.feols(hr_formula, data=analysis_data, vcov={'CRV1': 'state_fips'})
+
+    # TWFE regression: Non-hit-and-run (placebo)
+    if control_str:
+        nhr_formula = f'ln_nhr ~ treated + {control_str} | state_fips + year'
+    else:
+        nhr_formula = 'ln_nhr ~ treated | state_fips + year'
+
+    print(f"  Running: {nhr_formula}")
+    nhr_results = pf.feols(nhr_formula, data=analysis_data, vcov={'CRV1': 'state_fips'})
+
+    # Save results
+    results_summary = pd.DataFrame({
+        'outcome': ['Hit-Run', 'Non-Hit-Run'],
+        'coefficient': [hr_results.coef()['treated'], nhr_results.coef()['treated']],
+        'std_error': [hr_results.se()['treated'], nhr_results.se()['treated']],
+        'pvalue': [hr_results.pvalue()['treated'], nhr_results.pvalue()['treated']],
+        'n_obs': [hr_results._N, nhr_results._N],
+        'r2': [hr_results._adj_r2, nhr_results._adj_r2]
+    })
+
+    results_summary.to_csv(analysis / "output" / "tables" / "twfe_results.csv", index=False)
+
+    # Robustness: state-specific linear trends (state_fips[year] absorbs a
+    # separate intercept and slope on year for every state), which pyfixest
+    # cannot absorb; hdfe takes the same formulas
+    trend_results = {}
+    for outcome, formula in [('Hit-Run', hr_formula), ('Non-Hit-Run', nhr_formula)]:
+        trend_formula = formula.replace('| state_fips + year', '| state_fips[year] + year')
+        print(f"  Running: {trend_formula}")
+        trend_results[outcome] = hdfe.feols(trend_formula, analysis_data, vcov={'CRV1': 'state_fips'})
+
+    pd.DataFrame({
+        'outcome': list(trend_results),
+        'coefficient': [m.coef()['treated'] for m in trend_results.values()],
+        'std_error': [m.se()['treated'] for m in trend_results.values()],
+        'pvalue': [m.pvalue()['treated'] for m in trend_results.values()],
+        'n_obs': [m._N for m in trend_results.values()],
+        'r2': [m._adj_r2 for m in trend_results.values()]
+    }).to_csv(analysis / "output" / "tables" / "twfe_trends.csv", index=False)
+
+    # Robustness: Poisson (PPML) on the fatality counts themselves, so the
+    # coefficient is a proportional effect without the log(x + 1) transform
+    ppml_results = {}
+    for outcome, formula in [('Hit-Run', hr_formula), ('Non-Hit-Run', nhr_formula)]:
+        count_formula = formula.replace('ln_hr ~', 'hr_fatalities ~').replace('ln_nhr ~', 'nhr_fatalities ~')
+        print(f"  Running (PPML): {count_formula}")
+        ppml_results[outcome] = hdfe.fepois(count_formula, analysis_data, vcov={'CRV1': 'state_fips'})
+
+    pd.DataFrame({
+        'outcome': list(ppml_results),
+        'coefficient': [m.coef()['treated'] for m in ppml_results.values()],
+        'std_error': [m.se()['treated'] for m in ppml_results.values()],
+        'pvalue': [m.pvalue()['treated'] for m in ppml_results.values()],
+        'n_obs': [m._N for m in ppml_results.values()],
+        'deviance': [m._deviance for m in ppml_results.values()]
+    }).to_csv(analysis / "output" / "tables" / "twfe_ppml.csv", index=False)
+
+    # Influence: the TWFE estimate without each state and without each
+    # adoption cohort, from downdated cross-products (hdfe.jackknife)
+    names = analysis_data.drop_duplicates('state_fips').set_index('state_fips')['state_name'].to_dict()
+    jackknives = []
+    for outcome, formula in [('Hit-Run', hr_formula), ('Non-Hit-Run', nhr_formula)]:
+        for dropped, column in [('state', 'state_fips'), ('cohort', 'adoption_year')]:
+            jk = hdfe.jackknife(formula, analysis_data, column, vcov={'CRV1': 'state_fips'})
+            jackknives.append(jk.assign(outcome=outcome, dropped=dropped))
+    jk_all = pd.concat(jackknives, ignore_index=True)
+    jk_all = jk_all[['outcome', 'dropped'] + [c for c in jk_all.columns if c not in ('outcome', 'dropped')]]
+    jk_all.to_csv(analysis / "output" / "tables" / "twfe_influence.csv", index=False)
+
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    fig, axes = plt.subplots(2, 2, figsize=(14, 9), layout='constrained',
+                             gridspec_kw={'width_ratios': [3, 1]})
+    for i, outcome in enumerate(['Hit-Run', 'Non-Hit-Run']):
+        for j, dropped in enumerate(['state', 'cohort']):
+            jk = jk_all[(jk_all['outcome'] == outcome) & (jk_all['dropped'] == dropped)]
+            influence.dfbeta(axes[i, j], jk, 'treated', title=f"{outcome}: leave one {dropped} out",
+                             labels=names if dropped == 'state' else None)
+    fig.suptitle("Influence on the TWFE Coefficient on treated", fontsize=14)
+    figure_export.export(fig, analysis / "output" / "figures" / "twfe_influence.png")
+    plt.close(fig)
+
+    # Print results
+    hr_coef = hr_results.coef()['treated']
+    hr_se = hr_results.se()['treated']
+    hr_pval = hr_results.pvalue()['treated']
+    nhr_coef = nhr_results.coef()['treated']
+    nhr_se = nhr_results.se()['treated']
+    nhr_pval = nhr_results.pvalue()['treated']
+
+    print("\n  TWFE Results:")
+    print("  " + "="*60)
+    print(f"  {'':20} {'Coefficient':>12} {'Std Error':>12} {'p-value':>10}")
+    print("  " + "-"*60)
+    print(f"  {'Hit-Run:':20} {hr_coef:12.4f} {hr_se:12.4f} {hr_pval:10.4f}")
+    print(f"  {'Non-Hit-Run:':20} {nhr_coef:12.4f} {nhr_se:12.4f} {nhr_pval:10.4f}")
+    print("  " + "-"*60)
+    print("  With state-specific linear trends:")
+    for outcome, m in trend_results.items():
+        print(f"  {outcome + ':':20} {m.coef()['treated']:12.4f} {m.se()['treated']:12.4f} "
+              f"{m.pvalue()['treated']:10.4f}")
+    print("  " + "-"*60)
+    print("  Poisson (PPML) on fatality counts:")
+    for outcome, m in ppml_results.items():
+        print(f"  {outcome + ':':20} {m.coef()['treated']:12.4f} {m.se()['treated']:12.4f} "
+              f"{m.pvalue()['treated']:10.4f}")
+    print("  " + "="*60)
+
+    print("\n  Leave-one-out influence on treated:")
+    for (outcome, dropped), jk in jk_all.groupby(['outcome', 'dropped'], sort=False):
+        print(f"  {outcome}, leave one {dropped} out")
+        for line in influence.summary(jk, 'treated', labels=names if dropped == 'state' else None, n=3):
+            print("    " + line)
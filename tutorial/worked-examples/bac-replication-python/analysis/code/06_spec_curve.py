@@ -0,0 +1,50 @@
+# 06_spec_curve.py - Specification curve (multiverse) for the TWFE estimate
+
+import pandas as pd
+
+import figure_export
+import spec_curve
+
+INPUTS = ["build/output/analysis_data.parquet"]
+OUTPUTS = [
+    "analysis/output/tables/spec_curve.csv",
+    "analysis/output/figures/spec_curve_hr.png",
+    "analysis/output/figures/spec_curve_nhr.png",
+]
+
+
+def run(build, analysis):
+    """Treatment coefficient across every control subset, outcome transform
+    and treatment coding (see spec_curve.py)."""
+    analysis_data = pd.read_parquet(build / "output" / "analysis_data.parquet")
+
+    # The controls of 02_twfe_regression.py; each may be in or out
+    controls = ['alr', 'zero_tolerance', 'primary_seatbelt', 'secondary_seatbelt',
+                'mlda21', 'gdl', 'speed_70', 'aggravated_dui']
+    if 'unemployment' in analysis_data.columns:
+        controls.append('unemployment')
+    if 'income' in analysis_data.columns:
+        controls.append('income')
+
+    n_specs = 2 ** len(controls) * len(spec_curve.TRANSFORMS) * len(spec_curve.CODINGS)
+    print(f"  {2 ** len(controls):,} control subsets x {len(spec_curve.TRANSFORMS)} transforms "
+          f"x {len(spec_curve.CODINGS)} codings = {n_specs:,} specifications per outcome")
+    results = spec_curve.run(analysis_data, controls)
+    results.to_csv(analysis / "output" / "tables" / "spec_curve.csv", index=False)
+
+    print("\n  Specification curve:")
+    print("  " + "="*66)
+    print(f"  {'':14} {'Median':>10} {'Min':>10} {'Max':>10} {'Positive':>9} {'p < .05':>9}")
+    print("  " + "-"*66)
+    for outcome, res in results.groupby('outcome', sort=False):
+        coef = res['coefficient']
+        print(f"  {outcome + ':':14} {coef.median():10.4f} {coef.min():10.4f} {coef.max():10.4f} "
+              f"{(coef > 0).mean():9.1%} {(res['pvalue'] < 0.05).mean():9.1%}")
+    print("  " + "="*66)
+
+    figures = analysis / "output" / "figures"
+    for outcome, name in [('Hit-Run', 'spec_curve_hr.png'), ('Non-Hit-Run', 'spec_curve_nhr.png')]:
+        fig = spec_curve.plot(results[results['outcome'] == outcome], controls,
+                              title=f"Specification Curve: {outcome} Fatalities")
+        figure_export.export(fig, figures / name)
+        print(f"  Saved {name}")
@@ -0,0 +1,47 @@
+# 07_honest_did.py - Sensitivity of the event study to parallel-trend violations
+
+import pandas as pd
+
+import figure_export
+import honest_did
+
+INPUTS = [
+    "analysis/output/tables/es_coefficients_hr.csv",
+    "analysis/output/tables/es_coefficients_nhr.csv",
+    "analysis/output/tables/es_vcov_hr.csv",
+    "analysis/output/tables/es_vcov_nhr.csv",
+]
+OUTPUTS = [
+    "analysis/output/tables/honest_did.csv",
+    "analysis/output/figures/honest_did_hr.png",
+    "analysis/output/figures/honest_did_nhr.png",
+]
+
+
+def run(build, analysis):
+    """Robust confidence intervals for the adoption-year effect under
+    smoothness and relative-magnitude restrictions (see honest_did.py)."""
+    tables = analysis / "output" / "tables"
+    results = []
+    for outcome, suffix in [('Hit-Run', 'hr'), ('Non-Hit-Run', 'nhr')]:
+        # -5 and +10 pool every year beyond them (03_event_study.py)
+        beta, sigma = honest_did.read_event_study(tables / f"es_coefficients_{suffix}.csv",
+                                                  tables / f"es_vcov_{suffix}.csv",
+                                                  binned_ends=True)
+        res = honest_did.sensitivity(beta, sigma, cache=tables / f".honest_did_{suffix}.json")
+        results.append(res.assign(outcome=outcome))
+
+        print(f"\n  {outcome}: 95% CI for the adoption-year effect")
+        for _, row in res.iterrows():
+            m = "" if pd.isna(row['m']) else f"{row['m']:.3g}"
+            print(f"    {row['restriction']:9} {m:>7}  [{row['lower']:8.4f}, {row['upper']:8.4f}]")
+
+        fig = honest_did.plot(
+            res, title=f"Sensitivity to Parallel Trends: {outcome} Fatalities",
+            target="effect in the adoption year")
+        figure_export.export(fig, analysis / "output" / "figures" / f"honest_did_{suffix}.png")
+        print(f"  Saved honest_did_{suffix}.png")
+
+    results = pd.concat(results, ignore_index=True)
+    results = results[['outcome', 'restriction', 'm', 'lower', 'upper']]
+    results.to_csv(tables / "honest_did.csv", index=False)
@@ -0,0 +1,55 @@
+# 08_synth_control.py - Synthetic control for the early adopters, with placebos
+
+import pandas as pd
+
+import figure_export
+import synth
+
+INPUTS = ["build/output/analysis_data.parquet"]
+OUTPUTS = [
+    "analysis/output/tables/synth_weights.csv",
+    "analysis/output/tables/synth_gaps.csv",
+    "analysis/output/tables/synth_pvalues.csv",
+    "analysis/output/figures/synth_gaps_hr.png",
+    "analysis/output/figures/synth_gaps_nhr.png",
+]
+
+
+def run(build, analysis):
+    """One synthetic control per treated state that has a long enough pre
+    period and a not-yet-treated donor pool, with in-space placebo
+    p-values (see synth.py)."""
+    analysis_data = pd.read_parquet(build / "output" / "analysis_data.parquet")
+    names = analysis_data.drop_duplicates('state_fips').set_index('state_fips')['state_name'].to_dict()
+
+    weights, gaps, pvalues, skipped = synth.run(analysis_data)
+    tables = analysis / "output" / "tables"
+    weights.to_csv(tables / "synth_weights.csv", index=False)
+    gaps.to_csv(tables / "synth_gaps.csv", index=False)
+    pvalues.to_csv(tables / "synth_pvalues.csv", index=False)
+
+    no_pre = sorted(names[s] for s in skipped.loc[skipped['reason'].str.contains('pre-period'), 'state'].unique())
+    print(f"  {pvalues['treated'].nunique()} treated states with a design "
+          f"({synth.MIN_PRE}+ pre-period years, donors untreated for {synth.POST_YEARS} years); "
+          f"too early for one: {', '.join(no_pre) or 'none'}")
+
+    print("\n  Synthetic control (demeaned), in-space placebo p-values:")
+    print("  " + "="*78)
+    print(f"  {'':28} {'Adopted':>7} {'Donors':>6} {'Pre RMSPE':>9} {'Post gap':>9} {'Ratio':>7} {'p':>6}")
+    print("  " + "-"*78)
+    for _, row in pvalues.iterrows():
+        label = f"{row['outcome']}, {names[row['treated']]}"
+        top = (weights[(weights['outcome'] == row['outcome']) & (weights['treated'] == row['treated'])]
+               .nlargest(1, 'weight'))
+        print(f"  {label:28} {row['adoption_year']:7d} {row['n_donors']:6d} {row['pre_rmspe']:9.4f} "
+              f"{row['mean_post_gap']:+9.4f} {row['ratio']:7.2f} {row['p_value']:6.3f}"
+              f"   (top donor {names[top['donor'].iloc[0]]} {top['weight'].iloc[0]:.2f})")
+    print("  " + "="*78)
+
+    figures = analysis / "output" / "figures"
+    for outcome, name in [('Hit-Run', 'synth_gaps_hr.png'), ('Non-Hit-Run', 'synth_gaps_nhr.png')]:
+        fig = synth.plot(gaps[gaps['outcome'] == outcome], pvalues[pvalues['outcome'] == outcome],
+                         title=f"Synthetic Control Gaps and Placebos: {outcome} Fatalities",
+                         labels=names)
+        figure_export.export(fig, figures / name)
+        print(f"  Saved {name}")
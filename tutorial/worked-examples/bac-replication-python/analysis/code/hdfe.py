@@ -0,0 +1,770 @@
+"""
+Regressions with high-dimensional fixed effects: OLS and Poisson.
+
+feols() takes the formulas and vcov argument of pyfixest.feols() and
+returns a result with the same accessors (coef, se, tstat, pvalue,
+confint, tidy, summary, _N, _adj_r2), but never builds the fixed effects
+as dummies, so it scales to county-month panels with tens of thousands of
+levels and to specifications pyfixest cannot absorb:
+
+    y ~ x1 + x2 | state + year         two-way fixed effects
+    y ~ x | county + state^year        ^ crosses factors (state-by-year)
+    y ~ x | state[t] + year            state effects plus state slopes on t
+    y ~ x | state + year + state[[t]]  [[ ]] adds the slopes only
+
+Each fixed-effect term is a projection: onto group means for a factor, and
+onto a per-group regression on [1, t] (or [t]) for a varying slope.  By
+Frisch-Waugh-Lovell the coefficients are OLS of the outcome on the
+regressors after both are residualized on all the terms, and demean() does
+the residualizing:
+
+  method="at"    alternating projections: one sweep applies every term's
+                 projection in turn, and sweeps are repeated until the
+                 residuals stop changing.  Every second sweep is replaced by
+                 an Irons-Tuck (1969) extrapolation from the last three
+                 iterates, which turns the slow zig-zag between nearly
+                 collinear terms into a few steps (fixest does the same).
+                 Each sweep is O(n x columns); columns that have converged
+                 drop out of the sweeps.
+  method="lsmr"  LSMR on the sparse incidence matrix of all the terms, one
+                 column at a time.  Slower per column, but its convergence
+                 does not depend on the order of the terms.
+
+Convergence is |change| / (0.1 + |value|) < tol for every entry (fixest's
+criterion); the iterations and the final change are reported in
+result._demean, and a warning is issued if maxiter is reached first.
+
+Observations whose level of any factor occurs only once (singletons) are
+dropped, repeatedly until none are left, as pyfixest does by default: they
+are fitted perfectly and would only understate the standard errors.
+
+fepois() fits Poisson pseudo-maximum likelihood (PPML) on raw counts,
+zeros included, by iteratively reweighted least squares: each step is a
+weighted feols of the working outcome, demeaned with weights mu.  The
+fixed-effect part removed at one step is subtracted from the next step's
+working outcome before demeaning (that leaves it in the same coset, so
+the result is unchanged), which means the alternating projections only
+have to remove the change between steps -- a handful of sweeps once the
+fit settles.  start= warm-starts the IRLS from an earlier fit.  Levels
+whose counts are all zero are dropped first (their effect is -infinity).
+
+jackknife() gives every coefficient without each level of a grouping
+column (each state, each adoption cohort), fixed effects re-estimated, from
+downdates of the full fit's cross-products instead of one refit per group;
+with its DFBETA that is the influence analysis of the stages.
+
+Small-sample corrections follow pyfixest's defaults, so for the formulas
+both accept the estimates and SEs agree: (N-1)/(N-k) (N/(N-k) for HC1),
+times G/(G-1) for CRV1, where k counts the fixed effects that are not
+nested in the cluster variable; p-values use t(G-1) for CRV1 and t(N-k)
+otherwise (normal for fepois).  A slope term counts one parameter per
+group and slope.
+"""
+
+import re
+import warnings
+
+import numpy as np
+import pandas as pd
+from scipy import sparse, stats
+from scipy.linalg import qr
+from scipy.sparse.linalg import lsmr
+
+TOL = 1e-8
+MAXITER = 10_000
+IRLS_TOL = 1e-8           # on the relative change in the Poisson deviance
+IRLS_MAXITER = 100
+COLLINEAR_TOL = 1e-10     # relative pivot size below which a regressor is dropped
+LEAVE_OUT_TOL = 1e-8      # jackknife(): variance share below which a direction counts as gone
+
+_FE_TERM = re.compile(r"^(\w+(?:\^\w+)*)(?:\[(\[?)(\w+)\]?\])?$")
+
+
+# ─── Formula and fixed-effect terms ───────────────────────────────────────────
+
+def parse_formula(fml):
+    """Split 'y ~ x1 + x2 | fe1 + fe2' into (y, [x1, x2], [fe1, fe2])."""
+    lhs, sep, rest = fml.partition("~")
+    if not sep:
+        raise ValueError(f"formula needs a '~': {fml!r}")
+    rhs, _, fes = rest.partition("|")
+    depvar = lhs.strip()
+    xs = [t.strip() for t in rhs.split("+") if t.strip() not in ("", "1")]
+    fe_terms = [t.strip() for t in fes.split("+") if t.strip()]
+    if "0" in xs:
+        raise ValueError("'0' (no intercept) is implied by fixed effects and not supported")
+    return depvar, xs, fe_terms
+
+
+def _factor(data, names):
+    """Integer codes 0..G-1 of one factor or of the cross of several."""
+    codes = np.zeros(len(data), dtype=np.int64)
+    for name in names:
+        c, levels = pd.factorize(data[name], sort=True)
+        codes = codes * len(levels) + c
+    codes, _ = pd.factorize(codes, sort=True)
+    return codes
+
+
+def fe_terms(data, terms):
+    """Fixed-effect terms as dicts: name, codes, slope (column or None) and
+    intercept (False for [[t]] slopes-only terms)."""
+    out = []
+    for term in terms:
+        m = _FE_TERM.match(term.replace(" ", ""))
+        if m is None:
+            raise ValueError(f"cannot parse fixed-effect term {term!r}")
+        factors, slopes_only, slope = m.groups()
+        out.append({
+            "name": term,
+            "factors": factors.split("^"),
+            "slope": slope,
+            "intercept": not (slope and slopes_only),
+        })
+    return out
+
+
+def _encode(data, terms):
+    """Attach factor codes and slope bases to parsed terms (for data's rows)."""
+    out = []
+    for t in terms:
+        codes = _factor(data, t["factors"])
+        if t["slope"] is None:
+            basis = None
+        else:
+            z = data[t["slope"]].to_numpy(dtype=float)
+            if t["intercept"]:
+                # span{1, z} = span{1, z - mean}: centering keeps the 2 x 2 systems well conditioned
+                basis = np.column_stack([np.ones(len(z)), z - z.mean()])
+            else:
+                basis = z[:, None]
+        out.append({**t, "codes": codes, "n_levels": int(codes.max()) + 1 if len(codes) else 0,
+                    "basis": basis})
+    return out
+
+
+def drop_singletons(data, terms):
+    """Boolean mask of the rows kept after repeatedly removing observations
+    that are alone in their level of some factor."""
+    keep = np.ones(len(data), dtype=bool)
+    codes = [_factor(data, t["factors"]) for t in terms if t["intercept"]]
+    while True:
+        single = np.zeros(len(data), dtype=bool)
+        for c in codes:
+            counts = np.bincount(c[keep], minlength=c.max() + 1 if len(c) else 0)
+            single |= keep & (counts[c] == 1)
+        if not single.any():
+            return keep
+        keep &= ~single
+
+
+def drop_all_zero(data, terms, depvar):
+    """Boolean mask of the rows kept after removing levels of any factor whose
+    outcome is zero throughout (their Poisson fixed effect is -infinity)."""
+    y = data[depvar].to_numpy(dtype=float)
+    keep = np.ones(len(data), dtype=bool)
+    for t in terms:
+        if t["intercept"]:
+            c = _factor(data, t["factors"])
+            keep &= (np.bincount(c, weights=y, minlength=c.max() + 1) > 0)[c]
+    return keep
+
+
+# ─── Demeaning ────────────────────────────────────────────────────────────────
+
+def _projector(term, weights):
+    """Precompute one term's projection; returns f(R) = fitted values of R."""
+    codes, G, B = term["codes"], term["n_levels"], term["basis"]
+    n = len(codes)
+    D = sparse.csr_matrix((np.ones(n), (np.arange(n), codes)), shape=(n, G))
+    w = np.ones(n) if weights is None else weights
+
+    if B is None:
+        wsum = np.bincount(codes, weights=w, minlength=G)
+        inv = np.divide(1.0, wsum, out=np.zeros(G), where=wsum > 0)
+
+        def fitted(R):
+            sums = D.T @ (R * w[:, None])
+            return (sums * inv[:, None])[codes]
+        return fitted
+
+    m = B.shape[1]
+    gram = np.empty((G, m, m))
+    for i in range(m):
+        for j in range(m):
+            gram[:, i, j] = np.bincount(codes, weights=w * B[:, i] * B[:, j], minlength=G)
+    inv = np.linalg.pinv(gram, hermitian=True)     # pinv: a group with constant t has no slope
+
+    def fitted(R):
+        WR = R * w[:, None]
+        rhs = np.stack([D.T @ (B[:, [i]] * WR) for i in range(m)], axis=1)    # (G, m, k)
+        coef = inv @ rhs
+        return sum(B[:, [i]] * coef[codes, i, :] for i in range(m))
+    return fitted
+
+
+def _change(new, old):
+    return np.max(np.abs(new - old) / (0.1 + np.abs(old)), axis=0)
+
+
+def _alternating(X, projectors, tol, maxiter):
+    """Irons-Tuck accelerated alternating projections, column-wise."""
+    def sweep(R):
+        for fitted in projectors:
+            R = R - fitted(R)
+        return R
+
+    GX = sweep(X)
+    if len(projectors) == 1:            # one projection is exact
+        return GX, np.ones(X.shape[1], dtype=int), np.zeros(X.shape[1])
+
+    out = GX.copy()
+    iters = np.ones(X.shape[1], dtype=int)
+    change = np.full(X.shape[1], np.inf)
+    active = np.arange(X.shape[1])
+    X = X.copy()
+    for it in range(1, maxiter + 1):
+        x, gx = X[:, active], GX[:, active]
+        ggx = sweep(gx)
+        d1 = ggx - gx
+        d2 = d1 - gx + x
+        num, den = (d1 * d2).sum(axis=0), (d2 * d2).sum(axis=0)
+        coef = np.divide(num, den, out=np.zeros_like(num), where=den > 0)
+        x_new = ggx - coef * d1
+        gx_new = sweep(x_new)
+        step = _change(gx_new, gx)
+
+        X[:, active], GX[:, active] = x_new, gx_new
+        out[:, active] = gx_new
+        iters[active] = 2 * it + 1
+        change[active] = step
+        active = active[step >= tol]
+        if not len(active):
+            break
+    return out, iters, change
+
+
+def _lsmr(X, terms, weights, tol, maxiter):
+    """Residuals of each column on the sparse incidence matrix, by LSMR."""
+    blocks = []
+    for t in terms:
+        n, G = len(t["codes"]), t["n_levels"]
+        B = np.ones((n, 1)) if t["basis"] is None else t["basis"]
+        for i in range(B.shape[1]):
+            blocks.append(sparse.csr_matrix((B[:, i], (np.arange(n), t["codes"])), shape=(n, G)))
+    D = sparse.hstack(blocks).tocsr()
+    sw = np.ones(len(X)) if weights is None else np.sqrt(weights)
+    Dw = sparse.diags(sw) @ D
+
+    out = np.empty_like(X)
+    iters = np.zeros(X.shape[1], dtype=int)
+    change = np.zeros(X.shape[1])
+    for c in range(X.shape[1]):
+        sol = lsmr(Dw, sw * X[:, c], atol=tol, btol=tol, maxiter=maxiter)
+        out[:, c] = X[:, c] - D @ sol[0]
+        iters[c] = sol[2]
+        change[c] = 0.0 if sol[1] in (1, 2, 4, 5) else np.inf
+    return out, iters, change
+
+
+def demean(X, terms, weights=None, tol=TOL, maxiter=MAXITER, method="at"):
+    """Residualize the columns of X on the fixed-effect terms.
+
+    terms come from fe_terms() and must be encoded for X's rows (feols()
+    does this).  Returns (residuals, info) where info has the method, the
+    iterations and final change per column and whether all converged.
+    """
+    X = np.asarray(X, dtype=float)
+    X = X[:, None] if X.ndim == 1 else X
+    if method == "at":
+        projectors = [_projector(t, weights) for t in terms]
+        out, iters, change = _alternating(X, projectors, tol, maxiter)
+        converged = bool((change < tol).all())
+    elif method == "lsmr":
+        out, iters, change = _lsmr(X, terms, weights, tol, maxiter)
+        converged = bool(np.isfinite(change).all())
+    else:
+        raise ValueError(f"method must be 'at' or 'lsmr', not {method!r}")
+    if not converged:
+        warnings.warn(f"fixed effects did not converge in {maxiter} iterations "
+                      f"(max change {np.max(change):.2e}, tol {tol:.0e})", RuntimeWarning)
+    return out, {"method": method, "iterations": iters, "change": change,
+                 "converged": converged}
+
+
+# ─── Estimation ───────────────────────────────────────────────────────────────
+
+def _vcov_spec(vcov):
+    """('iid' | 'hetero' | 'CRV1', cluster column or None); iid by default,
+    as in pyfixest."""
+    if vcov is None:
+        return "iid", None
+    if isinstance(vcov, dict):
+        (kind, cluster), = vcov.items()
+        if kind != "CRV1":
+            raise ValueError(f"only CRV1 clustering is supported, not {kind!r}")
+        return "CRV1", cluster
+    if vcov in ("iid", "hetero", "HC1"):
+        return ("hetero" if vcov == "HC1" else vcov), None
+    raise ValueError(f"vcov must be 'iid', 'hetero' or {{'CRV1': column}}, not {vcov!r}")
+
+
+def _nested(codes, cluster):
+    """True if every level of codes lies within one cluster."""
+    some = np.empty(codes.max() + 1, dtype=cluster.dtype)
+    some[codes] = cluster                   # one cluster per level (whichever is written last)
+    return bool((some[codes] == cluster).all())
+
+
+def _model_frame(fml, data, vcov, weights, singletons, separation=False):
+    """Parse the formula and keep the rows the model can use: complete
+    cases, minus singletons (and, for count models, separated groups)."""
+    depvar, xs, fe_names = parse_formula(fml)
+    terms = fe_terms(data, fe_names)
+    vcov_type, cluster = _vcov_spec(vcov)
+
+    needed = [depvar] + xs + [c for t in terms for c in t["factors"] + [t["slope"]] if c]
+    needed += [c for c in (cluster, weights) if c]
+    df = data[list(dict.fromkeys(needed))].dropna()
+    n_singletons = n_separated = 0
+    while terms:
+        dropped = 0
+        if singletons == "drop":
+            keep = drop_singletons(df, terms)
+            n_singletons += int((~keep).sum())
+            dropped += int((~keep).sum())
+            df = df[keep]
+        if separation:
+            keep = drop_all_zero(df, terms, depvar)
+            n_separated += int((~keep).sum())
+            dropped += int((~keep).sum())
+            df = df[keep]
+        if not dropped or not separation:
+            break
+    if not len(df):
+        raise ValueError(f"no observations left to estimate {fml!r}")
+    return {"depvar": depvar, "xs": xs, "fixef": fe_names, "terms": _encode(df, terms),
+            "df": df, "vcov_type": vcov_type, "cluster": cluster,
+            "n_singletons": n_singletons, "n_separated": n_separated}
+
+
+def _drop_collinear(Xw, coefnames):
+    """Columns of Xw to keep: those absorbed by (or collinear with) the fixed
+    effects or each other are dropped, with a warning."""
+    if not Xw.shape[1]:
+        return np.arange(0), []
+    _, R, piv = qr(Xw, mode="economic", pivoting=True)
+    diag = np.abs(np.diag(R))
+    rank = int((diag > COLLINEAR_TOL * diag.max()).sum())
+    keep_cols = np.sort(piv[:rank])
+    dropped = [name for i, name in enumerate(coefnames) if i not in keep_cols]
+    if dropped:
+        warnings.warn(f"dropped collinear regressor(s): {', '.join(dropped)}", UserWarning)
+    return keep_cols, dropped
+
+
+def _fe_params(terms):
+    """Parameters per fixed-effect term (levels x basis columns)."""
+    return [t["n_levels"] * (1 if t["basis"] is None else t["basis"].shape[1]) for t in terms]
+
+
+def _fixef_dof(terms, cluster=None):
+    """Fixed-effect parameters counted in k: all of them less one per extra
+    term, less those nested in the cluster codes (each fully nested term
+    still counts one), as pyfixest's "nonnested" rule."""
+    k_fe = _fe_params(terms)
+    dof = sum(k_fe) - (len(terms) - 1) if len(terms) > 1 else sum(k_fe)
+    if cluster is not None:
+        nested = [j for j, t in enumerate(terms) if _nested(t["codes"], cluster)]
+        dof += len(nested) - sum(k_fe[j] for j in nested)
+    return dof
+
+
+def _vcov(frame, Xw, uw, bread, iid_scale):
+    """Variance matrix and t degrees of freedom for scores Xw * uw.
+
+    iid_scale multiplies the bread for vcov='iid' (sigma^2 for OLS, 1 for
+    Poisson).  The fixed effects enter k as pyfixest's "nonnested" does.
+    """
+    terms, df, vcov_type = frame["terms"], frame["df"], frame["vcov_type"]
+    N, k = len(df), Xw.shape[1]
+    G = None
+    if vcov_type == "CRV1":
+        cl = _factor(df, [frame["cluster"]])
+        G = int(cl.max()) + 1
+        df_k = k + _fixef_dof(terms, cl)
+        scores = sparse.csr_matrix((np.ones(N), (cl, np.arange(N))), shape=(G, N)) @ (Xw * uw[:, None])
+        meat = scores.T @ scores
+        V = bread @ meat @ bread * G / (G - 1) * (N - 1) / (N - df_k)
+        df_t = G - 1
+    elif vcov_type == "hetero":
+        df_k = k + _fixef_dof(terms)
+        meat = (Xw * (uw ** 2)[:, None]).T @ Xw
+        V = bread @ meat @ bread * N / (N - df_k)
+        df_t = N - df_k
+    else:
+        df_k = k + _fixef_dof(terms)
+        V = bread * iid_scale(N - df_k)
+        df_t = N - df_k
+    return V, df_t, G
+
+
+def partial_out(data, columns, fixef, cluster=None, weights=None, tol=TOL,
+                maxiter=MAXITER, method="at"):
+    """Residualize data[columns] on the fixed-effect terms in fixef (e.g.
+    ["state_fips", "year"]) -- the Frisch-Waugh-Lovell step on its own, for
+    callers that reuse one demeaned matrix across many regressions.
+
+    data must already be complete and free of singletons.  Returns
+    (residuals, info); info is demean()'s plus "fixef_dof", the fixed-effect
+    parameters that feols() would count in k (for CRV1 by cluster, if given).
+    """
+    terms = _encode(data, fe_terms(data, fixef))
+    Z, info = demean(data[list(columns)].to_numpy(dtype=float), terms, weights,
+                     tol, maxiter, method)
+    cl = None if cluster is None else _factor(data, [cluster])
+    return Z, {**info, "fixef_dof": _fixef_dof(terms, cl)}
+
+
+def _ols(frame, weights, tol, maxiter, method):
+    """Demean and solve one OLS model frame; returns the pieces feols() and
+    jackknife() build on (all in the sqrt-weighted metric where noted)."""
+    df, terms, depvar = frame["df"], frame["terms"], frame["depvar"]
+    y = df[depvar].to_numpy(dtype=float)
+    X = df[frame["xs"]].to_numpy(dtype=float).reshape(len(df), len(frame["xs"]))
+    w = None if weights is None else df[weights].to_numpy(dtype=float)
+    coefnames = list(frame["xs"])
+    if terms:
+        Z, info = demean(np.column_stack([y, X]), terms, w, tol, maxiter, method)
+    else:
+        X = np.column_stack([np.ones(len(df)), X])
+        coefnames = ["Intercept"] + coefnames
+        Z, info = np.column_stack([y, X]), None
+    yd, Xd = Z[:, 0], Z[:, 1:]
+
+    sw = np.ones(len(df)) if w is None else np.sqrt(w)
+    Xw, yw = Xd * sw[:, None], yd * sw
+    keep_cols, dropped = _drop_collinear(Xw, coefnames)
+    Xw, Xd = Xw[:, keep_cols], Xd[:, keep_cols]
+    coefnames = [coefnames[i] for i in keep_cols]
+
+    bread = np.linalg.inv(Xw.T @ Xw)
+    beta = bread @ (Xw.T @ yw)
+    resid = yd - Xd @ beta
+    return {"y": y, "yd": yd, "w": w, "sw": sw, "Xw": Xw, "yw": yw, "bread": bread,
+            "beta": beta, "resid": resid, "uw": resid * sw, "coefnames": coefnames,
+            "dropped": dropped, "info": info}
+
+
+def feols(fml, data, vcov=None, weights=None, tol=TOL, maxiter=MAXITER,
+          method="at", singletons="drop"):
+    """OLS with absorbed fixed effects, e.g. feols('y ~ x | state + year', df).
+
+    vcov is 'iid' (the default), 'hetero' or {'CRV1': column}; weights
+    names a column of analytic weights;
+    singletons='keep' keeps singleton observations.
+    """
+    frame = _model_frame(fml, data, vcov, weights, singletons)
+    df, terms, depvar = frame["df"], frame["terms"], frame["depvar"]
+    fit = _ols(frame, weights, tol, maxiter, method)
+    y, yd, w, sw, Xw = fit["y"], fit["yd"], fit["w"], fit["sw"], fit["Xw"]
+    beta, bread, resid, uw = fit["beta"], fit["bread"], fit["resid"], fit["uw"]
+    N, k = len(df), len(beta)
+    ssu = uw @ uw
+    V, df_t, G = _vcov(frame, Xw, uw, bread, lambda dof: ssu / dof)
+
+    # Goodness of fit, as pyfixest computes it
+    wt = np.ones(N) if w is None else w
+    ssy = np.sum(wt * (y - np.average(y, weights=wt)) ** 2)
+    if terms:
+        k_fe_r2 = sum(kf - 1 for kf in _fe_params(terms)) + 1
+        adj = (N - 1) / (N - k - k_fe_r2)
+        r2_within = 1 - ssu / np.sum((yd * sw) ** 2)
+    else:
+        adj = (N - 1) / (N - k)
+        r2_within = np.nan
+
+    return FeolsResult(
+        fml=fml, depvar=depvar, coefnames=fit["coefnames"], beta=beta, vcov=V,
+        vcov_type=frame["vcov_type"], clustervar=frame["cluster"], N=N, G=G, df_t=df_t,
+        u_hat=resid, r2=1 - ssu / ssy, adj_r2=1 - ssu / ssy * adj,
+        r2_within=r2_within, rmse=np.sqrt(ssu / N), fixef=frame["fixef"],
+        n_singletons=frame["n_singletons"], demean=fit["info"], dropped=fit["dropped"],
+    )
+
+
+def _deviance(y, mu):
+    ratio = np.where(y > 0, y / mu, 1.0)
+    return 2 * np.sum(y * np.log(ratio) - (y - mu))
+
+
+def fepois(fml, data, vcov=None, start=None, tol=IRLS_TOL, maxiter=IRLS_MAXITER,
+           fixef_tol=TOL, fixef_maxiter=MAXITER, method="at"):
+    """Poisson pseudo-maximum likelihood (PPML) with absorbed fixed effects,
+    e.g. fepois('hr_fatalities ~ treated | state_fips + year', df).
+
+    Counts of zero are fine.  Levels of a factor whose outcome is zero
+    throughout are dropped first (with singletons), as pyfixest does.
+    start is an earlier fepois() result on the same rows (say, the same
+    outcome with fewer controls) whose fitted means start the iterations.
+    vcov as in feols(); p-values and intervals are normal-based, as in
+    pyfixest.
+    """
+    frame = _model_frame(fml, data, vcov, None, "drop", separation=True)
+    df, terms, depvar = frame["df"], frame["terms"], frame["depvar"]
+    y = df[depvar].to_numpy(dtype=float)
+    if (y < 0).any():
+        raise ValueError(f"{depvar} has negative values; Poisson needs counts")
+    X = df[frame["xs"]].to_numpy(dtype=float).reshape(len(df), len(frame["xs"]))
+    coefnames = list(frame["xs"])
+    if not terms:
+        X = np.column_stack([np.ones(len(df)), X])
+        coefnames = ["Intercept"] + coefnames
+    N = len(df)
+
+    if start is not None:
+        if start._N != N:
+            raise ValueError(f"start was fitted on {start._N} rows, this model has {N}")
+        mu = start._mu.copy()
+    else:
+        mu = (y + y.mean()) / 2
+    eta = np.log(mu)
+    dev = _deviance(y, mu)
+
+    # IRLS: each step is a weighted feols of the working outcome z on X.
+    # fe_fit holds the fixed-effect part removed by the last demeaning;
+    # taking it off the new [z X] first leaves the alternating projections
+    # only the change since the previous step to remove.
+    fe_fit = np.zeros((N, 1 + X.shape[1]))
+    info, inner = None, []
+    for step in range(1, maxiter + 1):
+        z = eta + y / mu - 1
+        ZX = np.column_stack([z, X])
+        if terms:
+            R, info = demean(ZX - fe_fit, terms, mu, fixef_tol, fixef_maxiter, method)
+            fe_fit = ZX - R
+            inner.append(int(info["iterations"].max()))
+        else:
+            R = ZX
+        zd, Xd = R[:, 0], R[:, 1:]
+        sw = np.sqrt(mu)
+        if step == 1:
+            keep_cols, dropped = _drop_collinear(Xd * sw[:, None], coefnames)
+            X, Xd = X[:, keep_cols], Xd[:, keep_cols]
+            fe_fit = fe_fit[:, np.concatenate([[0], keep_cols + 1])]
+            coefnames = [coefnames[i] for i in keep_cols]
+        Xw = Xd * sw[:, None]
+        bread = np.linalg.inv(Xw.T @ Xw)
+        beta = bread @ (Xw.T @ (zd * sw))
+        resid = zd - Xd @ beta
+        eta = z - resid
+        mu = np.exp(eta)
+        new_dev = _deviance(y, mu)
+        crit = abs(new_dev - dev) / (0.1 + abs(dev))
+        dev = new_dev
+        if crit < tol:
+            break
+    else:
+        warnings.warn(f"IRLS did not converge in {maxiter} iterations "
+                      f"(deviance change {crit:.2e}, tol {tol:.0e})", RuntimeWarning)
+
+    V, _, G = _vcov(frame, Xw, resid * sw, bread, lambda dof: (N - 1) / dof)
+    irls = {"iterations": step, "converged": bool(crit < tol), "change": crit,
+            "demean_iterations": inner}
+    return FeolsResult(
+        fml=fml, depvar=depvar, coefnames=coefnames, beta=beta, vcov=V,
+        vcov_type=frame["vcov_type"], clustervar=frame["cluster"], N=N, G=G, df_t=np.inf,
+        u_hat=y - mu, r2=np.nan, adj_r2=np.nan, r2_within=np.nan,
+        rmse=np.sqrt(np.mean((y - mu) ** 2)), fixef=frame["fixef"],
+        n_singletons=frame["n_singletons"], demean=info, dropped=dropped,
+        method="Poisson", mu=mu, deviance=dev, n_separated=frame["n_separated"], irls=irls,
+    )
+
+
+# ─── Influence ────────────────────────────────────────────────────────────────
+
+def _fe_hat(terms, sw):
+    """The fixed-effect hat matrix P_D (sqrt-weighted metric) in a form whose
+    diagonal blocks P_D[g, g] are cheap: P_D = P_a + W S^+ W', with P_a the
+    within-level averaging of the largest factor term a, W the dummies (and
+    slopes) of the other terms residualized on a, and S = W'W.  Returns
+    a function of row indices giving the block."""
+    plain = [j for j, t in enumerate(terms) if t["basis"] is None]
+    if not plain:
+        raise ValueError("jackknife() needs a fixed-effect term without slopes")
+    a = max(plain, key=lambda j: terms[j]["n_levels"])
+    codes, n = terms[a]["codes"], len(sw)
+    wsum = np.bincount(codes, weights=sw ** 2, minlength=terms[a]["n_levels"])
+
+    cols = []
+    for j, t in enumerate(terms):
+        if j == a:
+            continue
+        B = np.ones((n, 1)) if t["basis"] is None else t["basis"]
+        for i in range(B.shape[1]):
+            D = np.zeros((n, t["n_levels"]))
+            D[np.arange(n), t["codes"]] = B[:, i] * sw
+            cols.append(D)
+    W = np.hstack(cols) if cols else np.zeros((n, 0))
+    Da = sparse.csr_matrix((sw, (codes, np.arange(n))), shape=(terms[a]["n_levels"], n))
+    W -= sw[:, None] * (Da @ W / wsum[:, None])[codes]
+    # W'W is singular (each term's dummies sum to one), so a pinv with a cutoff
+    Q = W @ np.linalg.pinv(W.T @ W, rcond=COLLINEAR_TOL, hermitian=True)
+
+    def block(idx):
+        c, s = codes[idx], sw[idx]
+        P = np.where(c[:, None] == c[None, :], np.outer(s, s) / wsum[c][:, None], 0.0)
+        return P + Q[idx] @ W[idx].T
+    return block
+
+
+def _solve_kept(A, b, scale):
+    """Solve A beta = b, leaving NaN for regressors that are (numerically)
+    combinations of earlier ones; scale is each regressor's full-sample
+    variance, against which LEAVE_OUT_TOL is measured."""
+    d = np.sqrt(scale)
+    if np.linalg.eigvalsh(A / np.outer(d, d)).min() > LEAVE_OUT_TOL:
+        return np.linalg.solve(A, b)
+    keep = []
+    for j in range(len(A)):
+        resid = A[j, j]
+        if keep:
+            resid -= A[j, keep] @ np.linalg.solve(A[np.ix_(keep, keep)], A[keep, j])
+        if resid > LEAVE_OUT_TOL * scale[j]:
+            keep.append(j)
+    out = np.full(len(A), np.nan)
+    out[keep] = np.linalg.solve(A[np.ix_(keep, keep)], b[keep])
+    return out
+
+
+def jackknife(fml, data, groups, vcov=None, weights=None, tol=TOL, maxiter=MAXITER,
+              method="at", singletons="drop"):
+    """Leave-one-group-out coefficients of feols(fml, data, vcov, weights):
+    the model refitted without each level of the column groups (each state,
+    each adoption cohort), its fixed effects re-estimated too.
+
+    No model is refitted.  With H = P_D the fixed-effect hat matrix and
+    X, y already demeaned on the full sample, dropping the rows g gives
+
+      X'X -> X'X - X_g' (I - H_gg)^+ X_g,   X'y -> X'y - X_g' (I - H_gg)^+ y_g
+
+    so each group costs one |g| x |g| pseudo-inverse.  H_gg comes from
+    _fe_hat(); that keeps one dense column per level of every fixed-effect
+    term but the largest, which is cheap for county + year but not for
+    two large crossed factors.  A regressor the remaining rows no longer
+    identify (an event-time dummy whose only cohort was dropped) gets NaN,
+    as refitting would drop it.
+
+    Returns one row per group and coefficient: group, n_obs, coefficient,
+    estimate, jackknife (the estimate without the group), change
+    (jackknife - estimate) and dfbeta ((estimate - jackknife) / the full
+    sample's standard error under vcov).
+    """
+    data = data.reset_index(drop=True)
+    frame = _model_frame(fml, data, vcov, weights, singletons)
+    df, terms = frame["df"], frame["terms"]
+    fit = _ols(frame, weights, tol, maxiter, method)
+    Xw, yw, beta = fit["Xw"], fit["yw"], fit["beta"]
+    V, _, _ = _vcov(frame, Xw, fit["uw"], fit["bread"],
+                    lambda dof: fit["uw"] @ fit["uw"] / dof)
+    se = np.sqrt(np.diag(V))
+
+    codes, labels = pd.factorize(data[groups].to_numpy()[df.index], sort=True,
+                                 use_na_sentinel=False)
+    order = np.argsort(codes, kind="stable")
+    bounds = np.searchsorted(codes[order], np.arange(len(labels) + 1))
+    fe_block = _fe_hat(terms, fit["sw"]) if terms else (lambda idx: np.zeros((len(idx), len(idx))))
+    A, b = Xw.T @ Xw, Xw.T @ yw
+    scale = np.diag(A)
+
+    leave_out = np.empty((len(labels), len(beta)))
+    for g in range(len(labels)):
+        idx = order[bounds[g]:bounds[g + 1]]
+        lam, U = np.linalg.eigh(np.eye(len(idx)) - fe_block(idx))
+        ok = lam > LEAVE_OUT_TOL
+        Xg = U[:, ok].T @ Xw[idx] / np.sqrt(lam[ok])[:, None]
+        yg = U[:, ok].T @ yw[idx] / np.sqrt(lam[ok])
+        leave_out[g] = _solve_kept(A - Xg.T @ Xg, b - Xg.T @ yg, scale)
+
+    k = len(beta)
+    return pd.DataFrame({
+        "group": np.repeat(labels, k),
+        "n_obs": np.repeat(np.diff(bounds), k),
+        "coefficient": np.tile(fit["coefnames"], len(labels)),
+        "estimate": np.tile(beta, len(labels)),
+        "jackknife": leave_out.ravel(),
+        "change": (leave_out - beta).ravel(),
+        "dfbeta": ((beta - leave_out) / se).ravel(),
+    })
+
+
+class FeolsResult:
+    """A fitted feols() model; the accessors mirror pyfixest's Feols."""
+
+    def __init__(self, *, fml, depvar, coefnames, beta, vcov, vcov_type, clustervar,
+                 N, G, df_t, u_hat, r2, adj_r2, r2_within, rmse, fixef,
+                 n_singletons, demean, dropped, method="OLS", mu=None, deviance=None,
+                 n_separated=0, irls=None):
+        self._fml, self._depvar, self._coefnames = fml, depvar, coefnames
+        self._beta, self._vcov, self._vcov_type = beta, vcov, vcov_type
+        self._clustervar, self._N, self._G, self._df_t = clustervar, N, G, df_t
+        self._u_hat, self._r2, self._adj_r2 = u_hat, r2, adj_r2
+        self._r2_within, self._rmse, self._fixef = r2_within, rmse, fixef
+        self._n_singletons, self._demean, self._dropped = n_singletons, demean, dropped
+        self._method, self._mu, self._deviance = method, mu, deviance
+        self._n_separated, self._irls = n_separated, irls
+
+    def coef(self):
+        return pd.Series(self._beta, index=self._coefnames, name="Estimate")
+
+    def se(self):
+        return pd.Series(np.sqrt(np.diag(self._vcov)), index=self._coefnames, name="Std. Error")
+
+    def tstat(self):
+        return (self.coef() / self.se()).rename("t value")
+
+    def pvalue(self):
+        t = self.tstat()
+        return pd.Series(2 * stats.t.sf(np.abs(t), self._df_t), index=t.index, name="Pr(>|t|)")
+
+    def confint(self, alpha=0.05):
+        q = stats.t.ppf(1 - alpha / 2, self._df_t)
+        lo, hi = f"{alpha / 2 * 100:.1f}%", f"{(1 - alpha / 2) * 100:.1f}%"
+        return pd.DataFrame({lo: self.coef() - q * self.se(), hi: self.coef() + q * self.se()})
+
+    def tidy(self, alpha=0.05):
+        out = pd.concat([self.coef(), self.se(), self.tstat(), self.pvalue(),
+                         self.confint(alpha)], axis=1)
+        out.index.name = "Coefficient"
+        return out
+
+    def summary(self, digits=3):
+        """Print the coefficient table, in the layout of pyfixest's summary()."""
+        inference = f"CRV1 ({self._clustervar})" if self._vcov_type == "CRV1" else self._vcov_type
+        print("###\n")
+        print(f"Estimation:  {self._method} (hdfe)")
+        print(f"Dep. var.: {self._depvar}, Fixed effects: {'+'.join(self._fixef) or 'none'}")
+        print(f"Inference:  {inference}")
+        removed = [f"{n} {what}" for n, what in ((self._n_singletons, "singletons"),
+                                                 (self._n_separated, "all-zero")) if n]
+        print(f"Observations:  {self._N}" + (f" ({', '.join(removed)} dropped)" if removed else ""))
+        if self._irls is not None:
+            irls = self._irls
+            print(f"IRLS:  {irls['iterations']} iterations, "
+                  + ("converged" if irls["converged"] else "NOT converged")
+                  + f" (deviance change {irls['change']:.1e})")
+        if self._demean is not None:
+            info = self._demean
+            print(f"Demeaning:  {info['method']}, {int(info['iterations'].max())} iterations, "
+                  + ("converged" if info["converged"] else "NOT converged")
+                  + f" (max change {np.max(info['change']):.1e})")
+        if self._dropped:
+            print(f"Dropped (collinear):  {', '.join(self._dropped)}")
+        print()
+        print(self.tidy().round(digits).to_markdown(floatfmt=f".{digits}f"))
+        print("---")
+        if self._deviance is not None:
+            print(f"Deviance: {self._deviance:.{digits}f} ")
+        else:
+            print(f"RMSE: {self._rmse:.{digits}f} R2: {self._r2:.{digits}f} "
+                  f"R2 Within: {self._r2_within:.{digits}f} ")
@@ -0,0 +1,322 @@
+"""
+Sensitivity of event-study estimates to violations of parallel trends, in
+the manner of HonestDiD (Rambachan and Roth 2023).
+
+The event-study coefficients are beta = delta + tau: delta is the bias from
+differential trends (all of beta before adoption, since tau = 0 there) and
+tau the treatment effect.  Instead of assuming delta_post = 0, delta is
+restricted to a set Delta and the target theta = l'tau_post (by default the
+effect in the adoption year) gets a confidence interval valid for every
+delta in Delta:
+
+  SD(M)      smoothness: every second difference of delta (across the
+             reference period, where delta = 0) is at most M in absolute
+             value; M = 0 allows only a linear trend through the pre-period
+  RM(Mbar)   relative magnitudes: no post-period step delta_t - delta_t-1
+             is larger than Mbar times the largest pre-period step
+
+Each restriction is a polyhedron A delta <= d (RM is a union of 2 x (pre
+steps) polyhedra: which pre-period step is the largest, and its sign).
+The interval inverts the least-favourable moment-inequality test of
+Andrews, Roth and Pakes (the first stage of HonestDiD's hybrid test):
+theta is kept if some tau_post with l'tau_post = theta satisfies
+
+  A beta_hat - d - A_post tau_post <= c sigma_A,   sigma_A = sqrt(diag(A Sigma A'))
+
+where c is the 1 - alpha quantile of the same LP's statistic under the
+least-favourable null, simulated from N_DRAWS draws of N(0, A Sigma A').
+c does not depend on theta, so the interval is exact: its ends are the
+min and max of l'tau_post over that set, two linear programs.  The
+interval is conservative relative to HonestDiD's conditional tests, never
+anti-conservative.
+
+The simulated LP needs no solver for the usual targets: once the null
+fixes l'tau_post, the remaining post-period effects each move one +/- pair
+of rows on their own, so the statistic is a max over rows and pairs for
+all N_DRAWS draws at once (_lp_statistics; other targets fall back to an
+LP per draw).  The grid points run in a process pool (jobs), and
+sensitivity() keeps its table in one cache file per caller, together with a
+hash of the coefficients, vcov and settings, so re-plotting or re-running
+unchanged estimates is free and new estimates overwrite the old entry.
+"""
+
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+from scipy.optimize import linprog
+
+N_DRAWS = 1000            # draws for the least-favourable critical value
+SEED = 20230101
+M_POINTS = 10             # default SD grid: 0 .. SE of the target, 10 points
+MBAR_GRID = (0, 0.25, 0.5, 0.75, 1, 1.25, 1.5, 1.75, 2)
+CACHE_VERSION = 1
+
+
+def read_event_study(coef_path, vcov_path, binned_ends=False):
+    """Event-study coefficients and their vcov as written by the stages:
+    a table with event_time and coefficient columns (the reference period,
+    if present, is dropped) and a square vcov with event times as labels.
+    binned_ends drops the first and last event times, when they pool every
+    period beyond them: a bin is not one period, so it has no place in the
+    SD second differences or the RM pre-period steps.
+    Returns (beta, sigma) indexed by event time."""
+    vcov = pd.read_csv(vcov_path, index_col=0)
+    vcov.index = vcov.index.astype(int)
+    vcov.columns = vcov.columns.astype(int)
+    if binned_ends:
+        vcov = vcov.iloc[1:-1, 1:-1]
+    coefs = pd.read_csv(coef_path).set_index("event_time")["coefficient"]
+    coefs.index = coefs.index.astype(int)
+    return coefs.loc[vcov.index], vcov
+
+
+# ─── Restrictions ─────────────────────────────────────────────────────────────
+
+def _full(event_times, reference):
+    """Selection matrix from the estimated delta to delta on every period
+    (the reference period, at zero, included), and those periods."""
+    periods = sorted(set(event_times) | {reference})
+    S = np.zeros((len(periods), len(event_times)))
+    for j, t in enumerate(event_times):
+        S[periods.index(t), j] = 1.0
+    return S, periods
+
+
+def smoothness(event_times, reference, M):
+    """(A, d) of SD(M): |second difference of delta| <= M."""
+    S, periods = _full(event_times, reference)
+    D2 = np.array([np.eye(len(periods))[i - 1] - 2 * np.eye(len(periods))[i]
+                   + np.eye(len(periods))[i + 1] for i in range(1, len(periods) - 1)])
+    A = np.vstack([D2 @ S, -D2 @ S])
+    return A, np.full(len(A), float(M))
+
+
+def relative_magnitudes(event_times, reference, Mbar):
+    """Polyhedra [(A, d), ...] whose union is RM(Mbar): for each pre-period
+    step s and sign, that step is the largest pre-period step and bounds
+    every post-period step by Mbar times it."""
+    S, periods = _full(event_times, reference)
+    D1 = (np.eye(len(periods))[1:] - np.eye(len(periods))[:-1]) @ S     # step into periods[1:]
+    pre = [i for i, t in enumerate(periods[1:]) if t <= reference]
+    post = [i for i, t in enumerate(periods[1:]) if t > reference]
+    out = []
+    for s in pre:
+        for sign in (1.0, -1.0):
+            rows = [r * D1[i] - sign * D1[s] for i in pre for r in (1, -1)
+                    if not (i == s and r == sign)]             # 0 <= 0
+            rows += [r * D1[i] - Mbar * sign * D1[s] for i in post for r in (1, -1)]
+            A = np.array(rows)
+            out.append((A, np.zeros(len(A))))
+    return out
+
+
+# ─── Confidence intervals ─────────────────────────────────────────────────────
+
+def _null_basis(l):
+    """Columns spanning the directions of tau_post that leave l'tau unchanged."""
+    _, _, Vt = np.linalg.svd(l[None, :])
+    return Vt[1:].T
+
+
+def _decoupled(X, tol=1e-10):
+    """(free rows, +/- row pairs) if the rows gamma moves come in pairs
+    X_i = -X_j along linearly independent directions, else None."""
+    scale = tol * max(1.0, np.abs(X).max(initial=0.0))
+    moving = list(np.flatnonzero(np.abs(X).max(axis=1, initial=0.0) > scale))
+    free = np.setdiff1d(np.arange(len(X)), moving)
+    pairs = []
+    while moving:
+        i = moving.pop(0)
+        match = [j for j in moving if np.abs(X[i] + X[j]).max() <= scale]
+        if not match:
+            return None
+        moving.remove(match[0])
+        pairs.append((i, match[0]))
+    if pairs and np.linalg.matrix_rank(X[[i for i, _ in pairs]]) < len(pairs):
+        return None
+    return free, np.array(pairs, dtype=int).reshape(-1, 2)
+
+
+def _lp_statistics(xi, sigma, X):
+    """min_{eta, gamma} eta s.t. x - X gamma <= eta sigma, for every row x of xi.
+
+    For the default targets the LP has a closed form: the rows gamma does
+    not move bound eta by x_i / sigma_i, and a pair x_i - v'gamma <= eta
+    sigma_i, x_j + v'gamma <= eta sigma_j (v independent across pairs, so
+    every v'gamma can be set on its own) is feasible exactly when
+    (x_i + x_j) / (sigma_i + sigma_j) <= eta.  Otherwise one LP per draw.
+    """
+    structure = _decoupled(X)
+    if structure is not None:
+        free, pairs = structure
+        bounds = [xi[:, free] / sigma[free],
+                  (xi[:, pairs[:, 0]] + xi[:, pairs[:, 1]])
+                  / (sigma[pairs[:, 0]] + sigma[pairs[:, 1]])]
+        return np.concatenate(bounds, axis=1).max(axis=1, initial=-np.inf)
+
+    k = X.shape[1]
+    # variables (eta, gamma): -sigma eta - X gamma <= -x
+    A_ub = np.column_stack([-sigma, -X])
+    c = np.zeros(1 + k)
+    c[0] = 1.0
+    eta = np.empty(len(xi))
+    for i, x in enumerate(xi):
+        res = linprog(c, A_ub=A_ub, b_ub=-x, bounds=[(None, None)] * (1 + k), method="highs")
+        eta[i] = res.fun if res.status == 0 else -np.inf
+    return eta
+
+
+def critical_value(A_post, Sigma_A, l, alpha=0.05, n_draws=N_DRAWS, seed=SEED):
+    """1 - alpha quantile of min_{eta, gamma} eta s.t. xi - X gamma <= eta
+    sigma, xi ~ N(0, Sigma_A), X = A_post times the null basis of l."""
+    sigma = np.sqrt(np.diag(Sigma_A))
+    L = np.linalg.cholesky(Sigma_A + 1e-12 * np.eye(len(Sigma_A)) * np.trace(Sigma_A))
+    xi = np.random.default_rng(seed).standard_normal((n_draws, len(Sigma_A))) @ L.T
+    eta = _lp_statistics(xi, sigma, A_post @ _null_basis(l))
+    return float(np.quantile(eta, 1 - alpha))
+
+
+def interval(beta, Sigma, post, l, A, d, alpha=0.05, n_draws=N_DRAWS, seed=SEED, crit=None):
+    """(lower, upper) of the interval for theta = l'tau_post under A delta <=
+    d, or (nan, nan) if no delta in the set is consistent with the data.
+    post is a boolean mask of the post-period entries of beta."""
+    Sigma_A = A @ Sigma @ A.T
+    A_post = A[:, post]
+    if crit is None:
+        crit = critical_value(A_post, Sigma_A, l, alpha, n_draws, seed)
+    sigma = np.sqrt(np.diag(Sigma_A))
+    # -A_post tau <= crit sigma - A beta + d
+    b_ub = crit * sigma - A @ beta + d
+    ends = []
+    for sense in (1.0, -1.0):
+        res = linprog(sense * l, A_ub=-A_post, b_ub=b_ub, bounds=[(None, None)] * len(l),
+                      method="highs")
+        if res.status == 2:                       # infeasible
+            return np.nan, np.nan
+        ends.append(sense * res.fun if res.status == 0 else sense * -np.inf)
+    return ends[0], ends[1]
+
+
+def _task(args):
+    restriction, m, beta, Sigma, post, l, polyhedra, alpha, n_draws, seed = args
+    lo, hi = np.inf, -np.inf
+    for A, d in polyhedra:
+        a, b = interval(beta, Sigma, post, l, A, d, alpha, n_draws, seed)
+        if not np.isnan(a):                 # the union skips rejected polyhedra
+            lo, hi = min(lo, a), max(hi, b)
+    if lo > hi:
+        lo = hi = np.nan
+    return {"restriction": restriction, "m": m, "lower": lo, "upper": hi}
+
+
+def _key(beta, Sigma, settings):
+    h = hashlib.sha256()
+    h.update(np.ascontiguousarray(beta, dtype=float).tobytes())
+    h.update(np.ascontiguousarray(Sigma, dtype=float).tobytes())
+    h.update(json.dumps({**settings, "version": CACHE_VERSION}, sort_keys=True).encode())
+    return h.hexdigest()
+
+
+def sensitivity(beta, Sigma, reference=-1, l=None, m_grid=None, mbar_grid=MBAR_GRID,
+                alpha=0.05, n_draws=N_DRAWS, seed=SEED, jobs=None, cache=None):
+    """Robust intervals for theta = l'tau_post over grids of M (SD) and Mbar
+    (RM), plus the original interval.
+
+    beta and Sigma are indexed by event time (read_event_study()); l
+    weights the post periods (default: the first one); m_grid defaults to
+    M_POINTS values from 0 to the target's standard error.  Returns a table
+    with restriction ("Original", "SD", "RM"), m, lower and upper.  cache
+    (a file path, if given) holds the last table with a hash of everything
+    it depends on; it is reused while the hash matches and replaced otherwise.
+    """
+    event_times = [int(t) for t in beta.index]
+    b = beta.to_numpy(dtype=float)
+    S = pd.DataFrame(Sigma).loc[event_times, event_times].to_numpy(dtype=float)
+    post = np.array([t > reference for t in event_times])
+    l = np.eye(post.sum())[0] if l is None else np.asarray(l, dtype=float)
+    se = float(np.sqrt(l @ S[np.ix_(post, post)] @ l))
+    if m_grid is None:
+        m_grid = np.linspace(0, se, M_POINTS)
+    m_grid, mbar_grid = [float(m) for m in m_grid], [float(m) for m in mbar_grid]
+
+    settings = {"event_times": event_times, "reference": reference, "l": l.tolist(),
+                "m_grid": m_grid, "mbar_grid": mbar_grid, "alpha": alpha,
+                "n_draws": n_draws, "seed": seed}
+    key = _key(b, S, settings)
+    if cache is not None:
+        cache = Path(cache)
+        if cache.exists():
+            stored = json.loads(cache.read_text())
+            if stored.get("key") == key:
+                return pd.DataFrame(stored["table"])
+
+    # SD: A and Sigma_A are the same for every M (only d moves), so the
+    # critical value is simulated once
+    A_sd, _ = smoothness(event_times, reference, 0.0)
+    crit_sd = critical_value(A_sd[:, post], A_sd @ S @ A_sd.T, l, alpha, n_draws, seed)
+    rows = [{"restriction": "Original", "m": np.nan,
+             "lower": l @ b[post] - stats.norm.ppf(1 - alpha / 2) * se,
+             "upper": l @ b[post] + stats.norm.ppf(1 - alpha / 2) * se}]
+    for m in m_grid:
+        A, d = smoothness(event_times, reference, m)
+        lo, hi = interval(b, S, post, l, A, d, alpha, crit=crit_sd)
+        rows.append({"restriction": "SD", "m": m, "lower": lo, "upper": hi})
+
+    tasks = [("RM", m, b, S, post, l, relative_magnitudes(event_times, reference, m),
+              alpha, n_draws, seed) for m in mbar_grid]
+    jobs = jobs or min(len(tasks), os.cpu_count() or 1)
+    if jobs == 1:
+        rows += [_task(t) for t in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            rows += list(pool.map(_task, tasks))
+
+    out = pd.DataFrame(rows)
+    if cache is not None:
+        cache.parent.mkdir(parents=True, exist_ok=True)
+        tmp = cache.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"key": key, "table": out.to_dict("list")}))
+        os.replace(tmp, cache)
+    return out
+
+
+# ─── Figure ───────────────────────────────────────────────────────────────────
+
+def plot(results, title="", target="effect at t = 0", color="steelblue"):
+    """Two panels, SD(M) and RM(Mbar): the original interval at the left
+    and the robust interval at each grid value; returns the figure."""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    original = results[results["restriction"] == "Original"].iloc[0]
+    fig, axes = plt.subplots(1, 2, figsize=(13, 5), sharey=True, layout="constrained")
+    for ax, (name, label) in zip(axes, [("SD", "M (bound on second differences)"),
+                                        ("RM", "M̄ (post steps relative to the largest pre step)")]):
+        res = results[results["restriction"] == name].reset_index(drop=True)
+        x = np.arange(len(res)) + 1
+        ax.vlines(0, original["lower"], original["upper"], color="firebrick", linewidth=3)
+        ax.plot(0, (original["lower"] + original["upper"]) / 2, "o", color="firebrick",
+                label="Original")
+        ax.vlines(x, res["lower"], res["upper"], color=color, linewidth=3)
+        ax.plot(x, (res["lower"] + res["upper"]) / 2, "o", color=color, label="Robust (LF)")
+        empty = res["lower"].isna()
+        if empty.any():
+            ax.plot(x[empty], np.zeros(empty.sum()), "x", color="gray", label="Set rejected")
+        ax.axhline(0, color="black", linestyle="--", linewidth=0.8)
+        ax.set_xticks(np.concatenate([[0], x]),
+                      ["Orig."] + [f"{m:.3g}" for m in res["m"]], fontsize=9)
+        ax.set_xlabel(label)
+        ax.set_title(f"{'Smoothness' if name == 'SD' else 'Relative magnitudes'} ({name})",
+                     fontsize=11)
+        ax.grid(True, alpha=0.3)
+        ax.legend(fontsize=8, loc="upper left")
+    axes[0].set_ylabel(f"95% CI, {target}")
+    fig.suptitle(title, fontsize=14)
+    return fig
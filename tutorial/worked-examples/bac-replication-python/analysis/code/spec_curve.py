@@ -0,0 +1,246 @@
+"""
+Specification curve: the treatment coefficient across every subset of the
+controls, several outcome transforms and several treatment codings.
+
+For one coding (which rows, and how treatment is coded) every specification
+is a regression among the columns of one matrix.  The state and year
+effects are partialled out once (Frisch-Waugh-Lovell, hdfe.partial_out)
+from every transformed outcome, the treatment and every control, giving
+M = [Y | d | W], and from then on only cross-products are needed:
+
+  C    = M'M                      (m x m)
+  C_g  = M_g'M_g for each state   (G x m x m), for the clustered SEs
+
+For the regressors R = [d, W_S] of a control subset S, with A = C[R, R]:
+
+  beta     = A^-1 C[R, Y]                    every outcome at once
+  score_g  = C_g[R, Y] - C_g[R, R] beta      = X_g'u_g
+  V_dd     = ssc * sum_g (a'score_g)^2,      a = the d row of A^-1
+
+with pyfixest's CRV1 factor ssc = G/(G-1) (N-1)/(N-k) (k counted as in
+hdfe.py), so the specification with every control, log(y + 1) and the
+binary coding reproduces twfe_results.csv.  The n rows are never touched
+after the cross-products are formed.
+
+Subsets are visited in Gray-code order (subset i is i ^ (i >> 1)), so
+consecutive subsets differ by one control and A^-1 is updated instead of
+inverted:
+
+  add c      u = A^-1 b, s = a_cc - b'u  (b = C[R, c]):
+             A^-1 -> [[A^-1 + uu'/s, -u/s], [-u'/s, 1/s]]
+  remove c   with E, f, g the blocks of A^-1 off / across / at c:
+             A^-1 -> E - ff'/g
+
+which is O(|R|^2) per subset.  The 2^p codes are cut into contiguous
+chunks, one per worker process (jobs); each chunk starts from a direct
+inverse, and re-bases every REFRESH steps so rounding cannot accumulate.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+import hdfe
+
+FIXEF = ["state_fips", "year"]
+CLUSTER = "state_fips"
+REFRESH = 64                # Gray-code steps between direct inversions
+
+OUTCOMES = {"Hit-Run": "hr_fatalities", "Non-Hit-Run": "nhr_fatalities"}
+TOTAL = "total_fatalities"
+
+# Outcome transforms of a count y (total = all fatalities in the state-year),
+# all on a log scale so the coefficients are comparable semi-elasticities
+TRANSFORMS = {
+    "log(y+1)": lambda y, total: np.log(y + 1),
+    "asinh(y)": lambda y, total: np.arcsinh(y),
+    "log share of total": lambda y, total: np.log((y + 1) / (total + 1)),
+}
+
+# Treatment codings: (rows kept, treatment indicator) from event_time
+CODINGS = {
+    "binary": lambda et: (np.ones(len(et), dtype=bool), et >= 0),
+    "adoption year untreated": lambda et: (np.ones(len(et), dtype=bool), et >= 1),
+    "adoption year dropped": lambda et: (et != 0, et >= 0),
+}
+BASELINE = ("log(y+1)", "binary")
+
+
+def cross_products(data, ys, treat, controls, fixef=FIXEF, cluster=CLUSTER):
+    """Partial the fixed effects out of [ys, treat, controls] and return the
+    full and per-cluster cross-products with what the SEs need."""
+    cols = list(ys) + [treat] + list(controls)
+    Z, info = hdfe.partial_out(data, cols, fixef, cluster=cluster)
+    cl, _ = pd.factorize(data[cluster], sort=True)
+    G = int(cl.max()) + 1
+    order = np.argsort(cl, kind="stable")
+    bounds = np.searchsorted(cl[order], np.arange(G + 1))
+    Zs = Z[order]
+    Cg = np.stack([Zs[a:b].T @ Zs[a:b] for a, b in zip(bounds[:-1], bounds[1:])])
+    return {"C": Z.T @ Z, "Cg": Cg, "n_y": len(ys), "n_controls": len(controls),
+            "N": len(data), "G": G, "fixef_dof": info["fixef_dof"]}
+
+
+def _regressors(code, cp):
+    d = cp["n_y"]
+    return [d] + [d + 1 + j for j in range(cp["n_controls"]) if code >> j & 1]
+
+
+def walk(cp, start, stop):
+    """Estimates for Gray codes start..stop-1 of one cross-product set.
+
+    Returns (codes, coef, se): the control bitmask of each subset and the
+    treatment coefficient and CRV1 SE per subset and outcome column.
+    """
+    C, Cg, ny = cp["C"], cp["Cg"], cp["n_y"]
+    N, G = cp["N"], cp["G"]
+    Y = np.arange(ny)
+    codes = np.empty(stop - start, dtype=np.int64)
+    coef = np.empty((stop - start, ny))
+    se = np.empty((stop - start, ny))
+
+    prev = None
+    for row, i in enumerate(range(start, stop)):
+        code = i ^ (i >> 1)
+        if prev is None or row % REFRESH == 0:
+            R = _regressors(code, cp)
+            Ainv = np.linalg.inv(C[np.ix_(R, R)])
+        else:
+            j = (code ^ prev).bit_length() - 1
+            c = ny + 1 + j
+            if code >> j & 1:                       # add control c
+                b = C[R, c]
+                u = Ainv @ b
+                s = C[c, c] - b @ u
+                Ainv = np.block([[Ainv + np.outer(u, u) / s, -u[:, None] / s],
+                                 [-u[None, :] / s, np.array([[1 / s]])]])
+                R = R + [c]
+            else:                                   # remove control c
+                pos = R.index(c)
+                keep = [r for r in range(len(R)) if r != pos]
+                f = Ainv[keep, pos]
+                Ainv = Ainv[np.ix_(keep, keep)] - np.outer(f, f) / Ainv[pos, pos]
+                R = [R[r] for r in keep]
+        prev = code
+
+        beta = Ainv @ C[np.ix_(R, Y)]                       # (|R|, ny)
+        CgR = Cg[:, R, :]
+        scores = CgR[:, :, Y] - CgR[:, :, R] @ beta         # (G, |R|, ny)
+        a = np.einsum("r,grk->gk", Ainv[0], scores)
+        k = len(R)
+        ssc = G / (G - 1) * (N - 1) / (N - k - cp["fixef_dof"])
+        codes[row] = code
+        coef[row] = beta[0]
+        se[row] = np.sqrt((a ** 2).sum(axis=0) * ssc)
+    return codes, coef, se
+
+
+def _walk_task(args):
+    return walk(*args)
+
+
+def run(data, controls, outcomes=OUTCOMES, transforms=TRANSFORMS, codings=CODINGS,
+        jobs=None):
+    """Every (control subset, outcome, transform, coding) specification.
+
+    Returns one row per specification: outcome, transform, coding, the
+    controls included ("+"-joined), n_controls, coefficient, std_error,
+    pvalue, ci_lower, ci_upper (95%) and n_obs.
+    """
+    controls = list(controls)
+    n_subsets = 2 ** len(controls)
+    ys = [(o, t) for o in outcomes for t in transforms]
+    keys = list(dict.fromkeys(FIXEF + [CLUSTER]))
+    data = data.dropna(subset=keys + controls + list(outcomes.values()) + [TOTAL, "event_time"])
+    et = data["event_time"].to_numpy()
+
+    cps = {}
+    for name, coding in codings.items():
+        rows, d = coding(et)
+        df = data.loc[rows, keys + controls].copy()
+        df["_d"] = d[rows].astype(float)
+        total = data.loc[rows, TOTAL].to_numpy(dtype=float)
+        for i, (o, t) in enumerate(ys):
+            df[f"_y{i}"] = transforms[t](data.loc[rows, outcomes[o]].to_numpy(dtype=float), total)
+        cps[name] = cross_products(df, [f"_y{i}" for i in range(len(ys))], "_d", controls)
+
+    jobs = jobs or min(n_subsets, os.cpu_count() or 1)
+    bounds = np.linspace(0, n_subsets, jobs + 1).astype(int)
+    tasks = [(cps[name], a, b) for name in codings
+             for a, b in zip(bounds[:-1], bounds[1:]) if b > a]
+    if jobs == 1:
+        parts = [walk(*task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            parts = list(pool.map(_walk_task, tasks))
+
+    names = np.array(controls, dtype=object)
+    frames = []
+    chunks = iter(parts)
+    for name in codings:
+        pieces = [next(chunks) for a, b in zip(bounds[:-1], bounds[1:]) if b > a]
+        codes = np.concatenate([p[0] for p in pieces])
+        coef = np.concatenate([p[1] for p in pieces])
+        se = np.concatenate([p[2] for p in pieces])
+        included = (codes[:, None] >> np.arange(len(controls))) & 1
+        labels = ["+".join(names[m.astype(bool)]) or "(none)" for m in included]
+        df_t = cps[name]["G"] - 1
+        q = stats.t.ppf(0.975, df_t)
+        for i, (o, t) in enumerate(ys):
+            frames.append(pd.DataFrame({
+                "outcome": o, "transform": t, "coding": name,
+                "controls": labels, "n_controls": included.sum(axis=1),
+                "coefficient": coef[:, i], "std_error": se[:, i],
+                "pvalue": 2 * stats.t.sf(np.abs(coef[:, i] / se[:, i]), df_t),
+                "ci_lower": coef[:, i] - q * se[:, i],
+                "ci_upper": coef[:, i] + q * se[:, i],
+                "n_obs": cps[name]["N"],
+            }))
+    return pd.concat(frames, ignore_index=True)
+
+
+def plot(results, controls, title=""):
+    """Ranked-coefficient figure for one outcome: estimates with 95% CIs,
+    ordered by size, over a grid marking each specification's choices."""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    res = results.sort_values("coefficient", kind="stable").reset_index(drop=True)
+    x = np.arange(len(res))
+    sig = (res["pvalue"] < 0.05).to_numpy()
+    baseline = ((res["transform"] == BASELINE[0]) & (res["coding"] == BASELINE[1])
+                & (res["n_controls"] == len(controls))).to_numpy()
+
+    included = [res["controls"].str.split("+").apply(lambda s, c=c: c in s) for c in controls]
+    rows = ([(c, inc) for c, inc in zip(controls, included)]
+            + [(t, res["transform"] == t) for t in TRANSFORMS if (res["transform"] == t).any()]
+            + [(c, res["coding"] == c) for c in CODINGS if (res["coding"] == c).any()])
+    grid = np.array([np.asarray(r, dtype=float) for _, r in rows])
+
+    fig, (top, bottom) = plt.subplots(
+        2, 1, figsize=(12, 8), sharex=True, layout="constrained",
+        gridspec_kw={"height_ratios": [2, 1.6]})
+    top.fill_between(x, res["ci_lower"], res["ci_upper"], color="lightgray", alpha=0.6,
+                     step="mid", linewidth=0, label="95% CI")
+    top.scatter(x[~sig], res["coefficient"][~sig], s=4, color="gray", label="p ≥ 0.05")
+    top.scatter(x[sig], res["coefficient"][sig], s=4, color="steelblue", label="p < 0.05")
+    top.scatter(x[baseline], res["coefficient"][baseline], s=40, color="red", marker="D",
+                zorder=3, label="Baseline (02_twfe_regression)")
+    top.axhline(0, color="black", linestyle="--", linewidth=0.8)
+    top.set_ylabel("Coefficient on treated")
+    top.set_title(title, fontsize=14)
+    top.legend(frameon=True, fontsize=9, loc="upper left")
+    top.grid(True, alpha=0.3)
+
+    bottom.imshow(grid, aspect="auto", cmap="Greys", interpolation="nearest",
+                  vmin=0, vmax=1.4, extent=(-0.5, len(res) - 0.5, len(rows) - 0.5, -0.5))
+    bottom.set_yticks(range(len(rows)), [label for label, _ in rows], fontsize=8)
+    n_transforms = sum(1 for t in TRANSFORMS if (res["transform"] == t).any())
+    for edge in (len(controls), len(controls) + n_transforms):
+        bottom.axhline(edge - 0.5, color="red", linewidth=0.6)
+    bottom.set_xlabel(f"Specification (ranked by coefficient, {len(res):,} in total)")
+    return fig
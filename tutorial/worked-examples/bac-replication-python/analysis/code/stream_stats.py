@@ -0,0 +1,243 @@
+"""
+Streaming summary statistics for tables too large to load at once.
+
+The data are read batch by batch (Parquet row groups via pyarrow) and
+folded into small per-group accumulators that can be merged in any order:
+
+  Moments        count, mean, sum of squared deviations (M2), min and max for
+                 every column, combined with the pairwise update of Chan,
+                 Golub and LeVeque -- numerically stable, unlike sum/sum-of-
+                 squares, and exact up to rounding.
+  QuantileSketch a t-digest-style centroid sketch: sorted (mean, weight)
+                 centroids whose size is bounded by the arcsine scale
+                 function, so the tails keep fine resolution while the
+                 middle is summarised coarsely.  Quantiles are approximate;
+                 min and max are exact.
+
+GroupedSummary keeps one Moments and one sketch per column for every
+group, so a single pass produces both the overall table (the merge of all
+groups) and the by-group table.  Memory is O(batch size + groups x columns
+x sketch size), independent of the number of rows.
+"""
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+
+def iter_batches(path, columns=None, batch_size=65_536):
+    """Yield pyarrow record batches from a Parquet file, one at a time."""
+    yield from pq.ParquetFile(path).iter_batches(batch_size=batch_size, columns=columns)
+
+
+def column_values(batch, name, dtype=float):
+    """One column of a record batch (or DataFrame) as a NumPy array.
+
+    dtype=None keeps the column's own type (used for group keys).
+    """
+    if isinstance(batch, pd.DataFrame):
+        values = batch[name].to_numpy()
+    else:
+        values = batch.column(batch.schema.get_field_index(name)).to_numpy(zero_copy_only=False)
+    return values if dtype is None else values.astype(dtype)
+
+
+class Moments:
+    """Mergeable count / mean / M2 / min / max for p columns."""
+
+    def __init__(self, p):
+        self.n = np.zeros(p)
+        self.mean = np.zeros(p)
+        self.m2 = np.zeros(p)
+        self.min = np.full(p, np.inf)
+        self.max = np.full(p, -np.inf)
+
+    @classmethod
+    def from_array(cls, X):
+        """Moments of the rows of X (NaNs ignored column by column)."""
+        out = cls(X.shape[1])
+        valid = ~np.isnan(X)
+        out.n = valid.sum(axis=0).astype(float)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.where(valid, X, 0.0).sum(axis=0) / out.n
+        out.mean = np.where(out.n > 0, mean, 0.0)
+        dev = np.where(valid, X - out.mean, 0.0)
+        out.m2 = (dev * dev).sum(axis=0)
+        out.min = np.fmin.reduce(X, axis=0, initial=np.inf)
+        out.max = np.fmax.reduce(X, axis=0, initial=-np.inf)
+        return out
+
+    def merge(self, other):
+        """Fold other into self (in place) and return self."""
+        n = self.n + other.n
+        with np.errstate(invalid="ignore", divide="ignore"):
+            w = np.where(n > 0, other.n / n, 0.0)
+        delta = other.mean - self.mean
+        self.mean = self.mean + delta * w
+        self.m2 = self.m2 + other.m2 + delta * delta * self.n * w
+        self.n = n
+        self.min = np.fmin(self.min, other.min)
+        self.max = np.fmax(self.max, other.max)
+        return self
+
+    def std(self, ddof=1):
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(self.n > ddof, np.sqrt(self.m2 / (self.n - ddof)), np.nan)
+
+    def finite(self, values):
+        """Report empty columns as NaN rather than +/-inf or 0."""
+        return np.where(self.n > 0, values, np.nan)
+
+
+class QuantileSketch:
+    """Mergeable approximate-quantile sketch (t-digest style).
+
+    delta controls the size: about delta / 2 centroids after compression.
+    """
+
+    def __init__(self, delta=200):
+        self.delta = delta
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+
+    def add(self, values):
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        if len(values):
+            self._absorb(values, np.ones(len(values)))
+        return self
+
+    def merge(self, other):
+        if len(other.means):
+            self._absorb(other.means, other.weights)
+        return self
+
+    def _absorb(self, means, weights):
+        m = np.concatenate([self.means, means])
+        w = np.concatenate([self.weights, weights])
+        order = np.argsort(m, kind="stable")
+        m, w = m[order], w[order]
+        if len(m) <= self.delta:
+            self.means, self.weights = m, w
+            return
+        # Centroids that fall in the same unit interval of the scale function
+        # k(q) = delta / (2 pi) * asin(2q - 1) are merged; k is steep near
+        # q = 0 and q = 1, so the tails stay (nearly) exact.
+        cum = np.cumsum(w)
+        q = (cum - w / 2) / cum[-1]
+        k = self.delta / (2 * np.pi) * np.arcsin(2 * q - 1)
+        ids = np.floor(k - k[0]).astype(np.int64)
+        starts = np.flatnonzero(np.r_[True, ids[1:] != ids[:-1]])
+        self.weights = np.add.reduceat(w, starts)
+        self.means = np.add.reduceat(m * w, starts) / self.weights
+
+    def quantile(self, qs, lo=None, hi=None):
+        """Approximate quantiles; lo/hi pin the ends to the exact min/max."""
+        qs = np.asarray(qs, dtype=float)
+        if not len(self.means):
+            return np.full(qs.shape, np.nan)
+        cum = np.cumsum(self.weights)
+        total = cum[-1]
+        pos = cum - self.weights / 2
+        lo = self.means[0] if lo is None else lo
+        hi = self.means[-1] if hi is None else hi
+        xp = np.concatenate([[0.0], pos, [total]])
+        fp = np.concatenate([[lo], self.means, [hi]])
+        return np.interp(qs * total, xp, fp)
+
+
+class GroupedSummary:
+    """Per-group Moments and quantile sketches, built batch by batch."""
+
+    def __init__(self, columns, by=None, delta=200):
+        self.columns = list(columns)
+        self.by = by
+        self.delta = delta
+        self.moments = {}
+        self.sketches = {}
+
+    def _group(self, key):
+        if key not in self.moments:
+            self.moments[key] = Moments(len(self.columns))
+            self.sketches[key] = [QuantileSketch(self.delta) for _ in self.columns]
+        return self.moments[key], self.sketches[key]
+
+    def update(self, batch):
+        """Fold one record batch (or DataFrame) into the accumulators."""
+        X = np.column_stack([column_values(batch, c) for c in self.columns])
+        if self.by is None:
+            keys, inverse = np.array([None]), np.zeros(len(X), dtype=np.int64)
+        else:
+            keys, inverse = np.unique(column_values(batch, self.by, dtype=None),
+                                     return_inverse=True)
+        # One sort by group, then each group is a contiguous block
+        order = np.argsort(inverse, kind="stable")
+        bounds = np.searchsorted(inverse[order], np.arange(1, len(keys)))
+        for key, block in zip(keys, np.split(X[order], bounds)):
+            key = key.item() if hasattr(key, "item") else key
+            moments, sketches = self._group(key)
+            moments.merge(Moments.from_array(block))
+            for j, sketch in enumerate(sketches):
+                sketch.add(block[:, j])
+        return self
+
+    def merge(self, other):
+        """Fold another GroupedSummary (e.g. from another worker) into this one."""
+        for key, moments in other.moments.items():
+            mine, sketches = self._group(key)
+            mine.merge(moments)
+            for s, o in zip(sketches, other.sketches[key]):
+                s.merge(o)
+        return self
+
+    def overall(self):
+        """(Moments, sketches) for all groups combined."""
+        total = Moments(len(self.columns))
+        sketches = [QuantileSketch(self.delta) for _ in self.columns]
+        for key in self.moments:
+            total.merge(self.moments[key])
+            for s, o in zip(sketches, self.sketches[key]):
+                s.merge(o)
+        return total, sketches
+
+    def summary_table(self):
+        """count / mean / std / min / max per column (like DataFrame.describe())."""
+        m, _ = self.overall()
+        return pd.DataFrame({
+            "count": m.n,
+            "mean": m.finite(m.mean),
+            "std": m.std(),
+            "min": m.finite(m.min),
+            "max": m.finite(m.max),
+        }, index=self.columns)
+
+    def group_table(self, stats=("mean", "std", "count")):
+        """One row per group with (column, stat) MultiIndex columns, like
+        groupby(by)[columns].agg(list(stats))."""
+        keys = sorted(self.moments)
+        data = {}
+        for j, col in enumerate(self.columns):
+            for stat in stats:
+                vals = []
+                for key in keys:
+                    m = self.moments[key]
+                    vals.append({"mean": m.finite(m.mean)[j], "std": m.std()[j],
+                                 "count": int(m.n[j]), "min": m.finite(m.min)[j],
+                                 "max": m.finite(m.max)[j]}[stat])
+                data[(col, stat)] = vals
+        out = pd.DataFrame(data, index=pd.Index(keys, name=self.by))
+        out.columns = pd.MultiIndex.from_tuples(out.columns)
+        return out
+
+    def quantile_table(self, qs=(0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99), overall_label="all"):
+        """Long table: one row per (column, group) with approximate quantiles."""
+        entries = [(overall_label,) + self.overall()]
+        entries += [(key, self.moments[key], self.sketches[key]) for key in sorted(self.moments)]
+        rows = []
+        for key, m, sketches in entries:
+            for j, col in enumerate(self.columns):
+                q = sketches[j].quantile(qs, lo=m.min[j], hi=m.max[j])
+                row = {"variable": col, self.by or "group": key}
+                row.update({f"p{round(100 * p):g}": v for p, v in zip(qs, q)})
+                rows.append(row)
+        return pd.DataFrame(rows)
@@ -0,0 +1,222 @@
+"""
+Synthetic control for single treated states, with in-space placebos.
+
+Each treated state gets its own design.  For adoption in year a:
+
+  pre window    every panel year before a (at least MIN_PRE of them)
+  post window   a .. a + POST_YEARS - 1
+  donors        states that adopt after the post window, so untreated
+                throughout it (every BAC state adopts eventually; there is
+                no never-treated pool)
+
+The weights w minimize ||x1 - X0 w||^2 over the simplex (w >= 0, sum w = 1).
+x1 and X0 are the pre-window outcome paths of the treated state and the
+donors, each demeaned over the pre window (the demeaned estimator of Ferman
+and Pinto): hit-and-run deaths in California are no convex combination of
+smaller states, but their path is.  Only the Gram matrix G = X0'X0 and
+b = X0'x1 enter, so the fit is a QP in m donor weights, solved by FISTA
+(accelerated projected gradient) with the sort-based projection onto the
+simplex.
+
+In-space placebos give the inference: every donor in turn is treated as if
+it had adopted in year a and is fitted from the other donors.  All of them
+share the treated state's Gram matrix (placebo i is b = G[:, i] with w_i
+held at zero), so the treated fit and its m placebos are one batched FISTA
+run, one row of weights per fit.  The p-value is the rank of the treated
+state's post/pre RMSPE ratio among its own and the placebos' (Abadie,
+Diamond and Hainmueller 2010):
+
+  p = #{fits with ratio >= treated ratio} / (m + 1)
+
+Designs are independent and run in a process pool (jobs); fit_design is
+the worker, importable so the pool can pickle it.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+UNIT = "state_fips"
+OUTCOMES = {"Hit-Run": "ln_hr", "Non-Hit-Run": "ln_nhr"}
+MIN_PRE = 5                 # pre-window years needed for a design
+POST_YEARS = 5              # post-window length (donors untreated throughout)
+MIN_DONORS = 5
+MAXITER = 20000
+TOL = 1e-10                 # max change in a weight between FISTA steps
+
+
+# ─── Solver ───────────────────────────────────────────────────────────────────
+
+def project_simplex(V, mask=None):
+    """Euclidean projection of every row of V onto the probability simplex,
+    restricted to the entries where mask is True (the rest come out 0)."""
+    V = np.asarray(V, dtype=float)
+    if mask is None:
+        mask = np.ones(V.shape, dtype=bool)
+    n_valid = mask.sum(axis=1, keepdims=True)
+    U = -np.sort(-np.where(mask, V, -1e30), axis=1)       # valid entries first
+    k = np.arange(1, V.shape[1] + 1)
+    css = np.cumsum(np.where(k <= n_valid, U, 0.0), axis=1)
+    cond = (U - (css - 1) / k > 0) & (k <= n_valid)
+    rho = V.shape[1] - 1 - np.argmax(cond[:, ::-1], axis=1)  # last True
+    theta = (css[np.arange(len(V)), rho] - 1) / (rho + 1)
+    return np.where(mask, np.maximum(V - theta[:, None], 0.0), 0.0)
+
+
+def solve(G, B, mask=None, maxiter=MAXITER, tol=TOL):
+    """Rows w minimizing w'Gw - 2 w'b_row over the simplex (masked), for
+    every row of B at once.  G is symmetric positive semi-definite."""
+    B = np.atleast_2d(B)
+    L = max(2 * np.linalg.eigvalsh(G)[-1], 1e-12)
+    if mask is None:
+        mask = np.ones(B.shape, dtype=bool)
+    W = project_simplex(np.zeros(B.shape), mask)
+    Y, t = W, np.ones((len(B), 1))
+    for _ in range(maxiter):
+        W_new = project_simplex(Y - 2 * (Y @ G - B) / L, mask)
+        # restart the momentum of rows where it points uphill (O'Donoghue
+        # and Candes), which keeps FISTA fast once the support settles
+        restart = ((Y - W_new) * (W_new - W)).sum(axis=1, keepdims=True) > 0
+        t = np.where(restart, 1.0, t)
+        t_new = (1 + np.sqrt(1 + 4 * t * t)) / 2
+        Y = W_new + (t - 1) / t_new * (W_new - W)
+        done = np.abs(W_new - W).max() < tol
+        W, t = W_new, t_new
+        if done:
+            break
+    return W
+
+
+# ─── Designs ──────────────────────────────────────────────────────────────────
+
+def designs(data, outcome, min_pre=MIN_PRE, post_years=POST_YEARS, min_donors=MIN_DONORS,
+            unit=UNIT):
+    """One design per treated state with the windows and donors described
+    above.  Returns (designs, skipped): skipped maps the states without a
+    design to the reason."""
+    Y = data.pivot(index="year", columns=unit, values=outcome).dropna(axis=1)
+    adoption = (data.drop_duplicates(unit).set_index(unit)["adoption_year"]
+                .reindex(Y.columns).sort_values(kind="stable"))
+    out, skipped = [], {}
+    for state, a in adoption.items():
+        pre = Y.index[Y.index < a]
+        post = Y.index[(Y.index >= a) & (Y.index < a + post_years)]
+        donors = list(adoption.index[adoption >= a + post_years])
+        if len(pre) < min_pre:
+            skipped[state] = f"{len(pre)} pre-period years"
+        elif len(post) < post_years:
+            skipped[state] = f"{len(post)} post-period years"
+        elif len(donors) < min_donors:
+            skipped[state] = f"{len(donors)} donors untreated through {a + post_years - 1}"
+        else:
+            years = pre.append(post)
+            out.append({"outcome": outcome, "unit": state, "adoption_year": int(a),
+                        "years": years.to_numpy(), "n_pre": len(pre), "units": [state] + donors,
+                        "Y": Y.loc[years, [state] + donors].to_numpy(dtype=float)})
+    return out, skipped
+
+
+def fit_design(design):
+    """Treated fit and every placebo fit of one design.
+
+    Returns (weights, gaps, summary): the treated state's donor weights,
+    the gap path of every fit (placebo = False for the treated state) and
+    one row of RMSPEs and the permutation p-value.
+    """
+    Y, n_pre, units = design["Y"], design["n_pre"], design["units"]
+    Z = Y - Y[:n_pre].mean(axis=0)
+    X = Z[:n_pre]
+    X0 = X[:, 1:]
+    m = X0.shape[1]
+    G = X0.T @ X0
+    # row 0: the treated state from every donor; row 1 + i: donor i from the others
+    B = np.vstack([X0.T @ X[:, 0], G])
+    mask = np.vstack([np.ones(m, dtype=bool), ~np.eye(m, dtype=bool)])
+    W = solve(G, B, mask)
+
+    gap = Z.T - W @ Z[:, 1:].T                        # (fits, years)
+    pre = np.sqrt((gap[:, :n_pre] ** 2).mean(axis=1))
+    post = np.sqrt((gap[:, n_pre:] ** 2).mean(axis=1))
+    ratio = post / np.maximum(pre, 1e-12)
+
+    years = design["years"]
+    a = design["adoption_year"]
+    gaps = pd.DataFrame({
+        "outcome": design["outcome"], "treated": units[0],
+        "unit": np.repeat(units, len(years)),
+        "placebo": np.repeat(np.arange(m + 1) > 0, len(years)),
+        "year": np.tile(years, m + 1), "event_time": np.tile(years - a, m + 1),
+        "actual": Y.T.ravel(), "synthetic": (Y.T - gap).ravel(), "gap": gap.ravel(),
+    })
+    weights = pd.DataFrame({"outcome": design["outcome"], "treated": units[0],
+                            "donor": units[1:], "weight": W[0]})
+    summary = {
+        "outcome": design["outcome"], "treated": units[0], "adoption_year": a,
+        "n_pre": n_pre, "n_donors": m, "pre_rmspe": pre[0], "post_rmspe": post[0],
+        "ratio": ratio[0], "mean_post_gap": gap[0, n_pre:].mean(),
+        "p_value": (ratio >= ratio[0]).mean(),
+    }
+    return weights, gaps, summary
+
+
+def run(data, outcomes=OUTCOMES, jobs=None, **window):
+    """Every design of every outcome.  window passes min_pre, post_years
+    and min_donors through to designs().
+
+    Returns (weights, gaps, pvalues, skipped) with outcome labels from
+    outcomes; skipped is a table of state, outcome and reason.
+    """
+    tasks, skipped = [], []
+    for label, column in outcomes.items():
+        found, missed = designs(data, column, **window)
+        tasks += [{**d, "outcome": label} for d in found]
+        skipped += [{"outcome": label, "state": s, "reason": r} for s, r in missed.items()]
+
+    jobs = jobs or min(len(tasks), os.cpu_count() or 1) or 1
+    if jobs == 1:
+        parts = [fit_design(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            parts = list(pool.map(fit_design, tasks))
+
+    weights = pd.concat([p[0] for p in parts], ignore_index=True)
+    gaps = pd.concat([p[1] for p in parts], ignore_index=True)
+    pvalues = pd.DataFrame([p[2] for p in parts])
+    return weights, gaps, pvalues, pd.DataFrame(skipped, columns=["outcome", "state", "reason"])
+
+
+# ─── Figure ───────────────────────────────────────────────────────────────────
+
+def plot(gaps, pvalues, title="", labels=None, ncols=5, color="steelblue"):
+    """Small multiples, one per treated state: its gap (actual - synthetic)
+    over its placebos' gaps in gray, by years relative to adoption."""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    from matplotlib.ticker import MaxNLocator
+
+    rows = pvalues.sort_values(["adoption_year", "treated"], kind="stable")
+    nrows = -(-len(rows) // ncols)
+    fig, axes = plt.subplots(nrows, ncols, figsize=(3 * ncols, 2.4 * nrows), sharey=True,
+                             squeeze=False, layout="constrained")
+    for ax, (_, row) in zip(axes.flat, rows.iterrows()):
+        design = gaps[gaps["treated"] == row["treated"]]
+        for _, path in design[design["placebo"]].groupby("unit", sort=False):
+            ax.plot(path["event_time"], path["gap"], color="gray", alpha=0.3, linewidth=0.6)
+        own = design[~design["placebo"]]
+        ax.plot(own["event_time"], own["gap"], color=color, linewidth=1.8)
+        ax.axhline(0, color="black", linestyle="--", linewidth=0.6)
+        ax.axvline(-0.5, color="gray", linestyle=":", linewidth=0.8)
+        name = labels.get(row["treated"], row["treated"]) if labels else row["treated"]
+        ax.set_title(f"{name} {row['adoption_year']} (p = {row['p_value']:.2f})", fontsize=9)
+        ax.xaxis.set_major_locator(MaxNLocator(integer=True))
+        ax.tick_params(labelsize=7)
+        ax.grid(True, alpha=0.3)
+    for ax in axes.flat[len(rows):]:
+        ax.set_visible(False)
+    fig.supxlabel("Years Relative to Adoption", fontsize=10)
+    fig.supylabel("Gap (actual - synthetic)", fontsize=10)
+    fig.suptitle(title, fontsize=14)
+    return fig
@@ -5,18 +5,31 @@
     "Hit-and-Run or Hit-and-Stay? Unintended Effects of a Stricter BAC Limit"
 
     This is a FULLY FUNCTIONAL replication package that:
-    1. Downloads all FARS data (1982-2008) from NHTSA
+    1. Downloads all FARS data (1982-2008) from NHTSA into a local store
+       (build/input/fars_store, or $FARS_STORE to share it across projects)
     2. Downloads economic data from FRED
     3. Creates all policy control variables
     4. Runs TWFE event study and DiD regressions
     5. Produces all tables and figures
 
     Run time: ~15-20 minutes (mostly data download)
+
+    Usage:
+        python main.py [--jobs N] [--force]
+
+    Stages run through pipeline.py: independent stages run in parallel and
+    stages whose code and inputs are unchanged since the last run are skipped.
+    Every run writes run_report.json and appends to run_history.jsonl
+    (per-stage time, memory and rows; see run_report.py).
 ==============================================================================
 """
 
-from pathlib import Path
+import argparse
 import os
+from pathlib import Path
+
+import pipeline
+import run_report
 
 # ============ CHANGE THIS PATH TO YOUR PROJECT FOLDER ============
 ROOT = Path(__file__).parent.resolve()
@@ -26,50 +39,57 @@ ROOT = Path(__file__).parent.resolve()
 BUILD = ROOT / "build"
 ANALYSIS = ROOT / "analysis"
 
-# Make paths available globally
-os.chdir(ROOT)
-
-print("="*70)
-print("BAC Replication Package - French & Gumus (2024)")
-print("="*70)
-print(f"Project root: {ROOT}")
-print()
-
-# Run build scripts in order
-print("PHASE 1: Building data...")
-print("-"*70)
-
-print("\n[1/3] Downloading FARS data (1982-2008)...")
-exec(open(BUILD / "code" / "01_download_fars.py").read())
-
-print("\n[2/3] Cleaning FARS data...")
-exec(open(BUILD / "code" / "02_clean_fars.py").read())
-
-print("\n[3/3] Merging control variables...")
-exec(open(BUILD / "code" / "03_merge_controls.py").read())
-
-# Run analysis scripts
-print("\n" + "="*70)
-print("PHASE 2: Running analysis...")
-print("-"*70)
-
-print("\n[1/5] Summary statistics...")
-exec(open(ANALYSIS / "code" / "01_summary_stats.py").read())
-
-print("\n[2/5] TWFE regression...")
-exec(open(ANALYSIS / "code" / "02_twfe_regression.py").read())
-
-print("\n[3/5] Event study...")
-exec(open(ANALYSIS / "code" / "03_event_study.py").read())
-
-print("\n[4/5] Tables...")
-exec(open(ANALYSIS / "code" / "04_tables.py").read())
-
-print("\n[5/5] Figures...")
-exec(open(ANALYSIS / "code" / "05_figures.py").read())
-
-print("\n" + "="*70)
-print("DONE! All results saved to:")
-print(f"  Tables:  {ANALYSIS / 'output' / 'tables'}")
-print(f"  Figures: {ANALYSIS / 'output' / 'figures'}")
-print("="*70)
+# Every stage declares its INPUTS and OUTPUTS; the order below is only the
+# order in which ready stages are started
+STAGES = [
+    BUILD / "code" / "01_download_fars.py",      # FARS data (1982-2008)
+    BUILD / "code" / "02_clean_fars.py",         # state-year panel
+    BUILD / "code" / "03_merge_controls.py",     # policy controls + FRED
+    ANALYSIS / "code" / "01_summary_stats.py",
+    ANALYSIS / "code" / "02_twfe_regression.py",
+    ANALYSIS / "code" / "03_event_study.py",
+    ANALYSIS / "code" / "04_tables.py",
+    ANALYSIS / "code" / "05_figures.py",
+    ANALYSIS / "code" / "06_spec_curve.py",
+    ANALYSIS / "code" / "07_honest_did.py",
+    ANALYSIS / "code" / "08_synth_control.py",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the BAC replication package.")
+    parser.add_argument("--jobs", type=int, default=None,
+                        help="worker processes (default: one per CPU; 1 runs every stage in-process)")
+    parser.add_argument("--force", action="store_true",
+                        help="rerun every stage even if its code and inputs are unchanged")
+    args = parser.parse_args()
+
+    os.chdir(ROOT)
+
+    print("="*70)
+    print("BAC Replication Package - French & Gumus (2024)")
+    print("="*70)
+    print(f"Project root: {ROOT}")
+    print()
+
+    report = run_report.RunReport(ROOT, "bac-replication-python",
+                                  jobs=args.jobs, force=args.force)
+    try:
+        pipeline.run_pipeline(ROOT, STAGES, jobs=args.jobs, force=args.force, report=report)
+    except BaseException:
+        report.finish("failed")
+        raise
+    report.finish()
+
+    print("\n" + "="*70)
+    print("Run profile (run_report.json, run_history.jsonl):")
+    print(report.summary())
+    print("\n" + "="*70)
+    print("DONE! All results saved to:")
+    print(f"  Tables:  {ANALYSIS / 'output' / 'tables'}")
+    print(f"  Figures: {ANALYSIS / 'output' / 'figures'}")
+    print("="*70)
+
+
+if __name__ == "__main__":
+    main()
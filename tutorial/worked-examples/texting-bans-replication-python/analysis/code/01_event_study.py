@@ -1,101 +1,150 @@
 # 01_event_study.py — TWFE and event study regressions
 # =============================================================================
-# 1. Simple TWFE: ln_fatalities ~ treated + controls | state + year
+# 1. Simple TWFE: ln_fatalities ~ treated + controls | state + year, and the
+#    same model as a Poisson (PPML) on the fatality count (hdfe.py), which
+#    needs no log and so keeps zero cells
 # 2. Event study: bin event_time to [-6, +6], create dummies, run regression
-# 3. Export coefficients + 95% CIs to CSV
+# 3. Export coefficients + 95% CIs to CSV, and their vcov for the
+#    sensitivity analysis of 03_honest_did.py
+# 4. Influence: the event-study coefficients without each state and without
+#    each ban cohort (hdfe.jackknife), plotted by 02_figures.py
 # =============================================================================
 
 import pandas as pd
 import numpy as np
 from linearmodels.panel import PanelOLS
 
-# ── Load data ────────────────────────────────────────────────
-analysis_data = pd.read_parquet(BUILD / "output" / "analysis_data.parquet")
-analysis_data["ln_fatalities"] = np.log(analysis_data["fatalities"])
-
-# ── Simple TWFE ──────────────────────────────────────────────
-analysis_data["treated_int"] = analysis_data["treated"].astype(int)
-
-panel = analysis_data.set_index(["state", "year"])
-
-# Build formula with available controls
-controls = ["treated_int"]
-if "unemployment" in analysis_data.columns and analysis_data["unemployment"].notna().sum() > 0:
-    controls.append("unemployment")
-if "income" in analysis_data.columns and analysis_data["income"].notna().sum() > 0:
-    controls.append("income")
-
-formula_twfe = "ln_fatalities ~ " + " + ".join(controls) + " + EntityEffects + TimeEffects"
-print(f"    TWFE formula: {formula_twfe}")
-
-twfe_model = PanelOLS.from_formula(formula_twfe, data=panel, drop_absorbed=True)
-twfe_results = twfe_model.fit(cov_type="clustered", cluster_entity=True)
-
-print(f"    TWFE coefficient on treated: {twfe_results.params['treated_int']:.4f} "
-      f"(SE: {twfe_results.std_errors['treated_int']:.4f})")
-
-# ── Event study ──────────────────────────────────────────────
-# Bin event time to [-6, +6]
-analysis_data["event_time_binned"] = np.where(
-    analysis_data["event_time"] == -1000, -1000,
-    np.clip(analysis_data["event_time"], -6, 6)
-)
-
-# Create dummies (exclude t=-1 as reference, never-treated get 0)
-et_cols = []
-for k in range(-6, 7):
-    if k == -1:
-        continue
-    label = f"et_m{abs(k)}" if k < 0 else f"et_p{k}"
-    analysis_data[label] = ((analysis_data["event_time_binned"] == k) &
-                            (analysis_data["event_time"] != -1000)).astype(int)
-    et_cols.append(label)
-
-# Re-index for panel
-panel_es = analysis_data.set_index(["state", "year"])
-
-# Build event study formula
-rhs = et_cols.copy()
-if "unemployment" in analysis_data.columns and analysis_data["unemployment"].notna().sum() > 0:
-    rhs.append("unemployment")
-if "income" in analysis_data.columns and analysis_data["income"].notna().sum() > 0:
-    rhs.append("income")
-
-formula_es = "ln_fatalities ~ " + " + ".join(rhs) + " + EntityEffects + TimeEffects"
-print(f"    Event study formula: {formula_es[:80]}...")
-
-es_model = PanelOLS.from_formula(formula_es, data=panel_es, drop_absorbed=True)
-es_results = es_model.fit(cov_type="clustered", cluster_entity=True)
-
-# ── Export coefficients ──────────────────────────────────────
-event_times_map = {}
-for k in range(-6, 7):
-    if k == -1:
-        continue
-    label = f"et_m{abs(k)}" if k < 0 else f"et_p{k}"
-    event_times_map[label] = k
-
-ci = es_results.conf_int()
-coef_rows = []
-for col in et_cols:
-    coef_rows.append({
-        "event_time": event_times_map[col],
-        "coefficient": es_results.params[col],
-        "std_error": es_results.std_errors[col],
-        "ci_lower": ci.loc[col, "lower"],
-        "ci_upper": ci.loc[col, "upper"],
-    })
-
-coef_df = pd.DataFrame(coef_rows).sort_values("event_time")
-
-out_path = ANALYSIS / "output" / "event_study_coefs.csv"
-coef_df.to_csv(out_path, index=False)
-print(f"    Saved coefficients to {out_path}")
-
-# Print results table
-print("\n    Event Study Coefficients:")
-print(f"    {'Time':>6}  {'Coef':>10}  {'SE':>10}  {'CI Lower':>10}  {'CI Upper':>10}")
-print("    " + "-" * 52)
-for _, row in coef_df.iterrows():
-    print(f"    {int(row['event_time']):>6}  {row['coefficient']:>10.4f}  "
-          f"{row['std_error']:>10.4f}  {row['ci_lower']:>10.4f}  {row['ci_upper']:>10.4f}")
+import hdfe
+
+INPUTS = ["build/output/analysis_data.parquet"]
+OUTPUTS = ["analysis/output/event_study_coefs.csv",
+           "analysis/output/event_study_vcov.csv",
+           "analysis/output/event_study_influence.csv"]
+
+
+def run(build, analysis):
+    """TWFE and binned event-study regressions; export the coefficients."""
+    # ── Load data ────────────────────────────────────────────────
+    analysis_data = pd.read_parquet(build / "output" / "analysis_data.parquet")
+    analysis_data["ln_fatalities"] = np.log(analysis_data["fatalities"])
+
+    # ── Simple TWFE ──────────────────────────────────────────────
+    analysis_data["treated_int"] = analysis_data["treated"].astype(int)
+
+    panel = analysis_data.set_index(["state", "year"])
+
+    # Build formula with available controls
+    controls = ["treated_int"]
+    if "unemployment" in analysis_data.columns and analysis_data["unemployment"].notna().sum() > 0:
+        controls.append("unemployment")
+    if "income" in analysis_data.columns and analysis_data["income"].notna().sum() > 0:
+        controls.append("income")
+
+    formula_twfe = "ln_fatalities ~ " + " + ".join(controls) + " + EntityEffects + TimeEffects"
+    print(f"    TWFE formula: {formula_twfe}")
+
+    twfe_model = PanelOLS.from_formula(formula_twfe, data=panel, drop_absorbed=True)
+    twfe_results = twfe_model.fit(cov_type="clustered", cluster_entity=True)
+
+    print(f"    TWFE coefficient on treated: {twfe_results.params['treated_int']:.4f} "
+          f"(SE: {twfe_results.std_errors['treated_int']:.4f})")
+
+    formula_ppml = "fatalities ~ " + " + ".join(controls) + " | state + year"
+    print(f"    PPML formula: {formula_ppml}")
+    ppml_results = hdfe.fepois(formula_ppml, analysis_data, vcov={"CRV1": "state"})
+    print(f"    PPML coefficient on treated: {ppml_results.coef()['treated_int']:.4f} "
+          f"(SE: {ppml_results.se()['treated_int']:.4f})")
+
+    # ── Event study ──────────────────────────────────────────────
+    # Bin event time to [-6, +6]
+    analysis_data["event_time_binned"] = np.where(
+        analysis_data["event_time"] == -1000, -1000,
+        np.clip(analysis_data["event_time"], -6, 6)
+    )
+
+    # Create dummies (exclude t=-1 as reference, never-treated get 0)
+    et_cols = []
+    for k in range(-6, 7):
+        if k == -1:
+            continue
+        label = f"et_m{abs(k)}" if k < 0 else f"et_p{k}"
+        analysis_data[label] = ((analysis_data["event_time_binned"] == k) &
+                                (analysis_data["event_time"] != -1000)).astype(int)
+        et_cols.append(label)
+
+    # Re-index for panel
+    panel_es = analysis_data.set_index(["state", "year"])
+
+    # Build event study formula
+    rhs = et_cols.copy()
+    if "unemployment" in analysis_data.columns and analysis_data["unemployment"].notna().sum() > 0:
+        rhs.append("unemployment")
+    if "income" in analysis_data.columns and analysis_data["income"].notna().sum() > 0:
+        rhs.append("income")
+
+    formula_es = "ln_fatalities ~ " + " + ".join(rhs) + " + EntityEffects + TimeEffects"
+    print(f"    Event study formula: {formula_es[:80]}...")
+
+    es_model = PanelOLS.from_formula(formula_es, data=panel_es, drop_absorbed=True)
+    es_results = es_model.fit(cov_type="clustered", cluster_entity=True)
+
+    # ── Export coefficients ──────────────────────────────────────
+    event_times_map = {}
+    for k in range(-6, 7):
+        if k == -1:
+            continue
+        label = f"et_m{abs(k)}" if k < 0 else f"et_p{k}"
+        event_times_map[label] = k
+
+    ci = es_results.conf_int()
+    coef_rows = []
+    for col in et_cols:
+        coef_rows.append({
+            "event_time": event_times_map[col],
+            "coefficient": es_results.params[col],
+            "std_error": es_results.std_errors[col],
+            "ci_lower": ci.loc[col, "lower"],
+            "ci_upper": ci.loc[col, "upper"],
+        })
+
+    coef_df = pd.DataFrame(coef_rows).sort_values("event_time")
+
+    out_path = analysis / "output" / "event_study_coefs.csv"
+    coef_df.to_csv(out_path, index=False)
+    print(f"    Saved coefficients to {out_path}")
+
+    vcov = es_results.cov.loc[et_cols, et_cols]
+    vcov.index = vcov.columns = [event_times_map[col] for col in et_cols]
+    vcov.to_csv(analysis / "output" / "event_study_vcov.csv")
+
+    # Print results table
+    print("\n    Event Study Coefficients:")
+    print(f"    {'Time':>6}  {'Coef':>10}  {'SE':>10}  {'CI Lower':>10}  {'CI Upper':>10}")
+    print("    " + "-" * 52)
+    for _, row in coef_df.iterrows():
+        print(f"    {int(row['event_time']):>6}  {row['coefficient']:>10.4f}  "
+              f"{row['std_error']:>10.4f}  {row['ci_lower']:>10.4f}  {row['ci_upper']:>10.4f}")
+
+    # ── Influence ────────────────────────────────────────────────
+    # Same regression as hdfe sees it (state + year fixed effects); the
+    # leave-one-out estimates come from downdated cross-products, not refits
+    analysis_data["cohort"] = analysis_data["texting_ban_year"].map(
+        lambda y: "never treated" if pd.isna(y) else str(int(y)))
+    formula_jk = "ln_fatalities ~ " + " + ".join(rhs) + " | state + year"
+    jackknives = []
+    for dropped, column in [("state", "state"), ("cohort", "cohort")]:
+        jk = hdfe.jackknife(formula_jk, analysis_data, column, vcov={"CRV1": "state"})
+        jk = jk[jk["coefficient"].isin(event_times_map)]
+        jackknives.append(jk.assign(dropped=dropped, event_time=jk["coefficient"].map(event_times_map)))
+    jk_all = pd.concat(jackknives, ignore_index=True)
+    jk_all = jk_all[["dropped", "group", "n_obs", "coefficient", "event_time",
+                     "estimate", "jackknife", "change", "dfbeta"]]
+    jk_path = analysis / "output" / "event_study_influence.csv"
+    jk_all.to_csv(jk_path, index=False)
+    print(f"\n    Saved leave-one-out estimates to {jk_path}")
+    for dropped, jk in jk_all.groupby("dropped", sort=False):
+        widest = jk.groupby("event_time")["jackknife"].agg(lambda s: s.max() - s.min()).idxmax()
+        rows = jk[jk["event_time"] == widest]
+        print(f"    Leave one {dropped} out: widest at t={widest:+d}, "
+              f"[{rows['jackknife'].min():.4f}, {rows['jackknife'].max():.4f}] "
+              f"around {rows['estimate'].iloc[0]:.4f}")
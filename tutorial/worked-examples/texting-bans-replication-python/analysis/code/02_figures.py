@@ -1,66 +1,80 @@
 # 02_figures.py — Event study plot
 # =============================================================================
 # Loads coefficients from CSV, adds reference period, and creates
-# a publication-quality event study plot.
+# a publication-quality event study plot (drawn by es_plot.py, which skips
+# the render when the coefficients are unchanged since the last run), then
+# the leave-one-state-out and leave-one-cohort-out paths (influence.py).
 # =============================================================================
 
 import pandas as pd
-import matplotlib
-matplotlib.use("Agg")
-import matplotlib.pyplot as plt
 
-# ── Load coefficients ────────────────────────────────────────
-coef_df = pd.read_csv(ANALYSIS / "output" / "event_study_coefs.csv")
+import es_plot
+import figure_export
+import influence
 
-# Add reference period (t = -1, coefficient = 0)
-ref_row = pd.DataFrame([{
-    "event_time": -1,
-    "coefficient": 0.0,
-    "std_error": 0.0,
-    "ci_lower": 0.0,
-    "ci_upper": 0.0,
-}])
-coef_df = pd.concat([coef_df, ref_row], ignore_index=True).sort_values("event_time")
+INPUTS = ["analysis/output/event_study_coefs.csv",
+          "analysis/output/event_study_influence.csv"]
+OUTPUTS = ["analysis/output/event_study.png",
+           "analysis/output/event_study_influence.png"]
 
-# ── Create plot ──────────────────────────────────────────────
-fig, ax = plt.subplots(figsize=(10, 6))
 
-# Reference lines
-ax.axhline(0, color="red", linestyle="--", linewidth=0.8, alpha=0.7)
-ax.axvline(-0.5, color="gray", linestyle="--", linewidth=0.8, alpha=0.5)
+def run(build, analysis):
+    """Event-study plot."""
+    # ── Load coefficients ────────────────────────────────────────
+    coef_df = pd.read_csv(analysis / "output" / "event_study_coefs.csv")
 
-# Point estimates with error bars
-ax.errorbar(
-    coef_df["event_time"],
-    coef_df["coefficient"],
-    yerr=[
-        coef_df["coefficient"] - coef_df["ci_lower"],
-        coef_df["ci_upper"] - coef_df["coefficient"],
-    ],
-    fmt="D",
-    color="navy",
-    capsize=4,
-    markersize=5,
-    linewidth=1.5,
-    capthick=1.2,
-)
+    # Add reference period (t = -1, coefficient = 0)
+    ref_row = pd.DataFrame([{
+        "event_time": -1,
+        "coefficient": 0.0,
+        "std_error": 0.0,
+        "ci_lower": 0.0,
+        "ci_upper": 0.0,
+    }])
+    coef_df = pd.concat([coef_df, ref_row], ignore_index=True).sort_values("event_time")
 
-ax.set_xlabel("Years Relative to Texting Ban", fontsize=12)
-ax.set_ylabel("Effect on Log Fatalities", fontsize=12)
-ax.set_title("Event Study: Texting Bans and Traffic Fatalities", fontsize=14)
+    # ── Create plot ──────────────────────────────────────────────
+    panel = es_plot.panel(
+        coef_df,
+        style="errorbar",
+        color="navy",
+        marker="D",
+        connect=False,
+        markersize=5,
+        linewidth=1.5,
+        capsize=4,
+        title="Event Study: Texting Bans and Traffic Fatalities",
+        xlabel="Years Relative to Texting Ban",
+        ylabel="Effect on Log Fatalities",
+        xticks=list(range(-6, 7)),
+        zero_line={"color": "red", "linestyle": "--", "linewidth": 0.8, "alpha": 0.7},
+        treat_line={"color": "gray", "linestyle": "--", "linewidth": 0.8, "alpha": 0.5},
+        grid=None,
+        despine=False,
+        caption="Coefficients relative to t = −1. 95% CIs shown. Clustered SEs at state level.",
+    )
 
-ax.set_xticks(range(-6, 7))
-ax.tick_params(labelsize=10)
+    out_path = analysis / "output" / "event_study.png"
+    rendered, _ = es_plot.render_all([es_plot.figure(out_path, [panel], figsize=(10, 6))])
+    if rendered:
+        print(f"    Saved plot to {out_path}")
+    else:
+        print(f"    Plot unchanged — kept {out_path}")
 
-# Caption
-ax.annotate(
-    "Coefficients relative to t = \u22121. 95% CIs shown. Clustered SEs at state level.",
-    xy=(0.5, -0.12), xycoords="axes fraction",
-    ha="center", fontsize=9, color="gray",
-)
+    # ── Influence plot ───────────────────────────────────────────
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
 
-plt.tight_layout()
-out_path = ANALYSIS / "output" / "event_study.png"
-plt.savefig(out_path, dpi=300, bbox_inches="tight")
-plt.close()
-print(f"    Saved plot to {out_path}")
+    jk_all = pd.read_csv(analysis / "output" / "event_study_influence.csv", dtype={"group": str})
+    et_map = dict(zip(jk_all["coefficient"], jk_all["event_time"]))
+    fig, axes = plt.subplots(1, 2, figsize=(14, 5.5), sharey=True, layout="constrained")
+    for ax, dropped in zip(axes, ["state", "cohort"]):
+        influence.event_study(ax, jk_all[jk_all["dropped"] == dropped], et_map, color="navy",
+                              title=f"Leave one {dropped} out")
+        ax.set_xlabel("Years Relative to Texting Ban")
+    fig.suptitle("Event Study Influence: Texting Bans and Traffic Fatalities", fontsize=14)
+    out_path = analysis / "output" / "event_study_influence.png"
+    figure_export.export(fig, out_path)
+    plt.close(fig)
+    print(f"    Saved influence plot to {out_path}")
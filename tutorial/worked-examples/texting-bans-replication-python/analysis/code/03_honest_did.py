@@ -0,0 +1,42 @@
+# 03_honest_did.py — Sensitivity to parallel-trend violations
+# =============================================================================
+# Robust 95% CIs for the effect in the ban year when the pre-trend may carry
+# on after the ban: smoothness (SD, second differences of the trend at most
+# M) and relative magnitudes (RM, post-ban trend steps at most Mbar times the
+# largest pre-ban step), drawn next to the event-study plot.  honest_did.py
+# caches the table in .honest_did.json with a hash of the coefficients, so
+# an unchanged event study is not recomputed.
+# =============================================================================
+
+import pandas as pd
+
+import figure_export
+import honest_did
+
+INPUTS = ["analysis/output/event_study_coefs.csv",
+          "analysis/output/event_study_vcov.csv"]
+OUTPUTS = ["analysis/output/honest_did.csv",
+           "analysis/output/honest_did.png"]
+
+
+def run(build, analysis):
+    """HonestDiD-style sensitivity of the ban-year effect."""
+    # ── Sensitivity table ────────────────────────────────────────
+    # -6 and +6 pool every year beyond them (01_event_study.py)
+    beta, sigma = honest_did.read_event_study(analysis / "output" / "event_study_coefs.csv",
+                                              analysis / "output" / "event_study_vcov.csv",
+                                              binned_ends=True)
+    results = honest_did.sensitivity(beta, sigma, cache=analysis / "output" / ".honest_did.json")
+    results.to_csv(analysis / "output" / "honest_did.csv", index=False)
+
+    print("\n    95% CI for the effect in the ban year:")
+    for _, row in results.iterrows():
+        m = "" if pd.isna(row["m"]) else f"{row['m']:.3g}"
+        print(f"    {row['restriction']:9} {m:>7}  [{row['lower']:8.4f}, {row['upper']:8.4f}]")
+
+    # ── Plot ─────────────────────────────────────────────────────
+    fig = honest_did.plot(results, title="Sensitivity to Parallel Trends: Texting Bans",
+                          target="effect in the ban year", color="navy")
+    out_path = analysis / "output" / "honest_did.png"
+    figure_export.export(fig, out_path)
+    print(f"    Saved sensitivity plot to {out_path}")
@@ -7,18 +7,32 @@
 
 import pandas as pd
 
-fars_raw = pd.read_parquet(BUILD / "output" / "fars_raw.parquet")
+import schema
+import states
 
-state_year = (fars_raw
-    .groupby(["state", "year"])
-    .agg(fatalities=("fatals", "sum"),
-         n_crashes=("fatals", "count"))
-    .reset_index())
+INPUTS = ["build/output/fars_raw.parquet"]
+OUTPUTS = ["build/output/state_year_fatalities.parquet"]
 
-# Quick sanity check
-n_states = state_year["state"].nunique()
-n_years = state_year["year"].nunique()
-print(f"    {n_states} states × {n_years} years = {len(state_year)} rows")
-print(f"    Mean annual fatalities per state: {state_year['fatalities'].mean():.0f}")
+# One row per state-year (see schema.py)
+SCHEMA = {"state": "int8", "year": "int16", "fatalities": "int32", "n_crashes": "int32"}
 
-state_year.to_parquet(BUILD / "output" / "state_year_fatalities.parquet", index=False)
+
+def run(build, analysis):
+    """Collapse crash-level FARS to state-year fatalities and crash counts."""
+    fars_raw = pd.read_parquet(build / "output" / "fars_raw.parquet")
+    fars_raw["state"] = states.codes(fars_raw["state"])   # int8 FIPS
+
+    state_year = (fars_raw
+        .groupby(["state", "year"])
+        .agg(fatalities=("fatals", "sum"),
+             n_crashes=("fatals", "count"))
+        .reset_index())
+
+    # Quick sanity check
+    n_states = state_year["state"].nunique()
+    n_years = state_year["year"].nunique()
+    print(f"    {n_states} states × {n_years} years = {len(state_year)} rows")
+    print(f"    Mean annual fatalities per state: {state_year['fatalities'].mean():.0f}")
+
+    state_year = schema.conform(state_year, SCHEMA)
+    state_year.to_parquet(build / "output" / "state_year_fatalities.parquet", index=False)
@@ -0,0 +1,178 @@
+"""
+Local store of crash-level FARS, shared by the download stages.
+
+One row per crash with the columns of SCHEMA, kept as a hive-partitioned
+Parquet dataset: a directory per year (year=2007/), optionally split by
+state as well (year=2007/state=6/).  Within a file the crashes are sorted
+by state and month and written in row groups of ROW_GROUP rows, so the
+row-group statistics let a state filter skip most of a year that is not
+split by state.
+
+  location(default)                 the store: $FARS_STORE, else default
+  stored_years(root)                years already in the store
+  ensure(years, root)               download and add the years not yet stored
+  read(root, years, states, columns)   just those crashes and columns
+
+read() pushes the year and state filters down to the partitions and row
+groups and reads only the requested columns, so a stage scans only what
+it uses.  A year is downloaded once per store: point FARS_STORE at one
+directory and the BAC build (1982-2008) and the texting-bans build
+(2007-2022) share it, covering FIRST_YEAR onwards between them.
+"""
+
+import io
+import os
+import zipfile
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import requests
+
+FIRST_YEAR = 1975
+ROW_GROUP = 8192
+
+SCHEMA = pa.schema([
+    ("state", pa.int8()), ("year", pa.int16()), ("month", pa.int8()),
+    ("st_case", pa.int32()), ("fatals", pa.int16()), ("hit_run", pa.int8()),
+])
+
+# NHTSA has changed its URLs over time
+URLS = [
+    "https://static.nhtsa.gov/nhtsa/downloads/FARS/{year}/National/FARS{year}NationalCSV.zip",
+    "https://static.nhtsa.gov/nhtsa/downloads/FARS/{year}/FARS{year}NationalCSV.zip",
+]
+
+
+def location(default):
+    """The store directory: $FARS_STORE if set, else default."""
+    return Path(os.environ.get("FARS_STORE", default))
+
+
+def stored_years(root):
+    root = Path(root)
+    return sorted(int(p.name.split("=", 1)[1]) for p in root.glob("year=*")
+                  if p.is_dir() and any(p.rglob("*.parquet")))
+
+
+def _partitioning(root, by_state=False):
+    """Hive partitioning of the store; by_state only decides for a new store."""
+    root = Path(root)
+    if stored_years(root):
+        by_state = any(root.glob("year=*/state=*"))
+    fields = ["year", "state"] if by_state else ["year"]
+    return ds.partitioning(pa.schema([SCHEMA.field(f) for f in fields]), flavor="hive")
+
+
+# ─── Download ─────────────────────────────────────────────────────────────────
+
+def _read_csv(f):
+    """A FARS CSV with upper-case column names, whatever its encoding."""
+    raw = f.read()
+    try:
+        df = pd.read_csv(io.BytesIO(raw), encoding="utf-8-sig", low_memory=False)
+    except UnicodeDecodeError:
+        df = pd.read_csv(io.BytesIO(raw), encoding="latin-1", low_memory=False)
+        df.columns = df.columns.str.replace("Ï»¿", "", regex=False)   # latin-1-decoded BOM
+    df.columns = df.columns.str.strip().str.upper()
+    return df
+
+
+def download(year):
+    """One FARS year from NHTSA as a frame of SCHEMA's columns, or None if
+    no URL serves it.  hit_run is 1 for crashes with a hit-and-run vehicle."""
+    response = None
+    for url in URLS:
+        try:
+            response = requests.get(url.format(year=year), timeout=300)
+        except requests.RequestException:
+            continue
+        if response.status_code == 200:
+            break
+    if response is None or response.status_code != 200:
+        return None
+
+    with zipfile.ZipFile(io.BytesIO(response.content)) as z:
+        files = {n.rsplit("/", 1)[-1].lower(): n for n in z.namelist() if n.lower().endswith(".csv")}
+        accident = next((files[b] for b in files if "accident" in b or b.startswith("acc")), None)
+        vehicle = files.get("vehicle.csv") or next((files[b] for b in files if "vehicle" in b), None)
+        if accident is None:
+            raise ValueError("no accident file")
+        with z.open(accident) as f:
+            acc = _read_csv(f)
+        veh = None
+        if vehicle:
+            with z.open(vehicle) as f:
+                veh = _read_csv(f)
+
+    st_case = acc["ST_CASE"] if "ST_CASE" in acc else pd.Series(range(len(acc)))
+    hit_run = pd.Series(0, index=acc.index)
+    if veh is not None and "ST_CASE" in veh:
+        # hit-run column name varies by year; FARS codes 1-4 are all "Yes"
+        column = next((c for c in veh.columns if "HIT" in c and "RUN" in c), None)
+        if column:
+            hr = veh[column].isin([1, 2, 3, 4, "1", "2", "3", "4"]).groupby(veh["ST_CASE"]).max()
+            hit_run = st_case.map(hr).fillna(False).astype(int)
+
+    return pd.DataFrame({
+        "state": acc["STATE"], "year": year, "month": acc["MONTH"], "st_case": st_case,
+        "fatals": acc["FATALS"] if "FATALS" in acc else 1, "hit_run": hit_run,
+    })
+
+
+# ─── Store ────────────────────────────────────────────────────────────────────
+
+def write(crashes, root, by_state=False):
+    """Add crashes (SCHEMA's columns) to the store, replacing the years (or
+    year-states) they cover.  Values that do not fit SCHEMA raise."""
+    root = Path(root)
+    crashes = crashes.sort_values(["year", "state", "month"], kind="stable")
+    table = pa.Table.from_pandas(crashes[SCHEMA.names], schema=SCHEMA, preserve_index=False)
+    ds.write_dataset(table, root, format="parquet",
+                     partitioning=_partitioning(root, by_state),
+                     basename_template="part-{i}.parquet",
+                     existing_data_behavior="delete_matching",
+                     min_rows_per_group=ROW_GROUP, max_rows_per_group=ROW_GROUP)
+
+
+def ensure(years, root, by_state=False):
+    """Download the years not yet in the store; returns those that failed."""
+    root = Path(root)
+    root.mkdir(parents=True, exist_ok=True)
+    have = set(stored_years(root))
+    failed = []
+    for year in years:
+        if year in have:
+            continue
+        print(f"    {year}: downloading...", end=" ", flush=True)
+        try:
+            crashes = download(year)
+        except Exception as e:
+            print(f"ERROR: {e}")
+            failed.append(year)
+            continue
+        if crashes is None:
+            print("SKIPPED (couldn't download)")
+            failed.append(year)
+            continue
+        write(crashes, root, by_state)
+        print(f"{len(crashes):,} crashes, {int(crashes['hit_run'].sum()):,} hit-run")
+    return failed
+
+
+def read(root, years=None, states=None, columns=None):
+    """Crashes of the given years and states (default all), with only the
+    given columns, as a DataFrame with SCHEMA's dtypes."""
+    root = Path(root)
+    dataset = ds.dataset(root, format="parquet", schema=SCHEMA, partitioning=_partitioning(root))
+    filters = []
+    if years is not None:
+        filters.append(ds.field("year").isin(pa.array(list(years), type=pa.int16())))
+    if states is not None:
+        filters.append(ds.field("state").isin(pa.array(list(states), type=pa.int8())))
+    condition = None
+    for f in filters:
+        condition = f if condition is None else condition & f
+    table = dataset.to_table(columns=list(columns or SCHEMA.names), filter=condition)
+    return table.to_pandas()
@@ -0,0 +1,65 @@
+"""
+Dtype contracts for the files the build writes.
+
+A stage declares, for each file it writes, the storage dtype of every
+column: int8 flags and codes, int16 years, int32 counts, float32 fractions
+and rates, categoricals for names.  conform() checks a frame against its
+contract and casts it, one vectorized check per column, just before the
+write:
+
+  df = schema.conform(df, SCHEMA)
+  df.to_parquet(path)
+
+It raises SchemaError when a column is missing or undeclared, or when a
+value does not survive the cast: missing or non-integer values in an
+integer column, values outside the integer range, values that are not 0/1
+in a bool column, or labels outside a categorical's categories.  Columns
+listed in optional may be absent (the FRED controls, when the download
+fails).  Parquet keeps the dtypes, so downstream stages read the compact
+frame back as written.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+class SchemaError(ValueError):
+    pass
+
+
+def conform(df, contract, optional=()):
+    """df cast to contract ({column: dtype}), in df's column order."""
+    missing = [c for c in contract if c not in df.columns and c not in optional]
+    undeclared = [c for c in df.columns if c not in contract]
+    if missing or undeclared:
+        raise SchemaError(f"columns missing: {missing}; columns not in the contract: {undeclared}")
+    return pd.DataFrame({c: cast(df[c], contract[c]) for c in df.columns}, index=df.index)
+
+
+def cast(s, dtype):
+    """s as dtype, raising SchemaError when a value would be lost or changed."""
+    if isinstance(dtype, pd.CategoricalDtype) or dtype == "category":
+        out = s.astype(dtype)
+        lost = out.isna() & s.notna()
+        if lost.any():
+            raise SchemaError(f"{s.name}: not among the categories: {sorted(set(s[lost].astype(str)))[:5]}")
+        return out
+
+    dtype = np.dtype(dtype)
+    if s.isna().any() and dtype.kind in "biu":
+        raise SchemaError(f"{s.name}: {int(s.isna().sum())} missing values in a {dtype} column")
+    values = s.to_numpy(dtype=np.float64)
+    finite = values[np.isfinite(values)]
+    if dtype.kind == "b":
+        if not np.isin(values, (0, 1)).all():
+            raise SchemaError(f"{s.name}: values other than 0/1 in a bool column")
+    elif dtype.kind in "iu":
+        info = np.iinfo(dtype)
+        if (finite != np.round(finite)).any():
+            raise SchemaError(f"{s.name}: non-integer values in a {dtype} column")
+        if len(values) and (values.min() < info.min or values.max() > info.max):
+            raise SchemaError(f"{s.name}: values outside [{info.min}, {info.max}] for {dtype}")
+    elif dtype.kind == "f":
+        if len(finite) and np.abs(finite).max() > np.finfo(dtype).max:
+            raise SchemaError(f"{s.name}: values too large for {dtype}")
+    return s.astype(dtype)
@@ -0,0 +1,83 @@
+"""
+State dimension for the build stages: the 50 states by FIPS code.
+
+A state is its FIPS code as int8 (1..56) in every build file, not a
+zero-padded string, so attaching anything to a state is an index into a
+50-row array rather than a string hash per row:
+
+  FIPS, ABBR, NAME    the 50 states (no DC or territories), in FIPS order
+  NAME_DTYPE          categorical dtype of the state names
+  codes(values)       any FIPS column (ints, floats, "01"-style strings) -> int8
+  position(fips)      row of each code in FIPS, -1 for DC, territories, etc.
+  is_state(fips)      position(fips) >= 0
+  name(fips)          state names as a categorical (NaN for non-states)
+  lookup(mapping)     a {fips: value} dict as an array aligned with FIPS
+  column(mapping, fips)   the dict's value for every row of a FIPS column
+"""
+
+import numpy as np
+import pandas as pd
+
+_STATES = [
+    (1, "AL", "Alabama"), (2, "AK", "Alaska"), (4, "AZ", "Arizona"),
+    (5, "AR", "Arkansas"), (6, "CA", "California"), (8, "CO", "Colorado"),
+    (9, "CT", "Connecticut"), (10, "DE", "Delaware"), (12, "FL", "Florida"),
+    (13, "GA", "Georgia"), (15, "HI", "Hawaii"), (16, "ID", "Idaho"),
+    (17, "IL", "Illinois"), (18, "IN", "Indiana"), (19, "IA", "Iowa"),
+    (20, "KS", "Kansas"), (21, "KY", "Kentucky"), (22, "LA", "Louisiana"),
+    (23, "ME", "Maine"), (24, "MD", "Maryland"), (25, "MA", "Massachusetts"),
+    (26, "MI", "Michigan"), (27, "MN", "Minnesota"), (28, "MS", "Mississippi"),
+    (29, "MO", "Missouri"), (30, "MT", "Montana"), (31, "NE", "Nebraska"),
+    (32, "NV", "Nevada"), (33, "NH", "New Hampshire"), (34, "NJ", "New Jersey"),
+    (35, "NM", "New Mexico"), (36, "NY", "New York"), (37, "NC", "North Carolina"),
+    (38, "ND", "North Dakota"), (39, "OH", "Ohio"), (40, "OK", "Oklahoma"),
+    (41, "OR", "Oregon"), (42, "PA", "Pennsylvania"), (44, "RI", "Rhode Island"),
+    (45, "SC", "South Carolina"), (46, "SD", "South Dakota"), (47, "TN", "Tennessee"),
+    (48, "TX", "Texas"), (49, "UT", "Utah"), (50, "VT", "Vermont"),
+    (51, "VA", "Virginia"), (53, "WA", "Washington"), (54, "WV", "West Virginia"),
+    (55, "WI", "Wisconsin"), (56, "WY", "Wyoming"),
+]
+
+FIPS = np.array([s[0] for s in _STATES], dtype=np.int8)
+ABBR = np.array([s[1] for s in _STATES], dtype=object)
+NAME = np.array([s[2] for s in _STATES], dtype=object)
+NAME_DTYPE = pd.CategoricalDtype(NAME)
+
+_POSITION = np.full(256, -1, dtype=np.int8)     # indexed by code, covers all of int8/uint8
+_POSITION[FIPS] = np.arange(len(FIPS))
+
+
+def codes(values):
+    """FIPS codes as int8, from ints, floats or zero-padded strings."""
+    return np.asarray(pd.to_numeric(np.asarray(values)), dtype=np.int8)
+
+
+def position(fips):
+    """Row of each code in FIPS; -1 where the code is not one of the 50 states."""
+    fips = np.asarray(fips)
+    return np.where((fips >= 0) & (fips < len(_POSITION)),
+                    _POSITION[np.clip(fips, 0, len(_POSITION) - 1)], -1).astype(np.int8)
+
+
+def is_state(fips):
+    return position(fips) >= 0
+
+
+def name(fips):
+    """State names of a FIPS column as a categorical with NAME_DTYPE."""
+    return pd.Categorical.from_codes(position(fips), dtype=NAME_DTYPE)
+
+
+def lookup(mapping, default=None):
+    """mapping ({fips: value}) as an array aligned with FIPS; states missing
+    from it get default.  Tuple values give one column per element."""
+    return np.array([mapping.get(int(f), default) for f in FIPS])
+
+
+def column(mapping, fips, default=None):
+    """mapping's value for every row of a FIPS column (all of them states)."""
+    pos = position(fips)
+    if (pos < 0).any():
+        bad = sorted(set(np.asarray(fips)[pos < 0].tolist()))
+        raise ValueError(f"not one of the 50 states: {bad}")
+    return lookup(mapping, default)[pos]
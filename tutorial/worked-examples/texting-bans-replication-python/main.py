@@ -6,59 +6,74 @@ Event study analysis of state texting-while-driving bans
 using FARS data (2007-2022).
 
 Requirements:
-    pip install pandas numpy requests linearmodels matplotlib
+    pip install pandas numpy pyarrow requests linearmodels matplotlib
+
+FARS is downloaded once into a local store (build/input/fars_store, or
+$FARS_STORE to share it with other projects, e.g. the BAC package).
 
 Usage:
-    python main.py
+    python main.py [--jobs N] [--force]
+
+Stages run through pipeline.py: each declares its inputs and outputs,
+independent stages run in parallel, and stages whose code and inputs are
+unchanged since the last run are skipped (--force reruns everything).
+Every run writes run_report.json and appends to run_history.jsonl
+(per-stage time, memory and rows; see run_report.py).
 """
 
+import argparse
 from pathlib import Path
-import time
+
+import pipeline
+import run_report
 
 ROOT = Path(__file__).parent.resolve()
 BUILD = ROOT / "build"
 ANALYSIS = ROOT / "analysis"
 
-# Create output directories
-(BUILD / "output").mkdir(parents=True, exist_ok=True)
-(ANALYSIS / "output").mkdir(parents=True, exist_ok=True)
+STAGES = [
+    # ── Build data ──
+    BUILD / "code" / "01_download_fars.py",
+    BUILD / "code" / "02_clean_fars.py",
+    BUILD / "code" / "03_merge_controls.py",
+    # ── Analysis ──
+    ANALYSIS / "code" / "01_event_study.py",
+    ANALYSIS / "code" / "02_figures.py",
+    ANALYSIS / "code" / "03_honest_did.py",
+]
 
-print("=" * 60)
-print("Texting Bans and Traffic Fatalities — Replication Package")
-print("=" * 60)
 
-# ── Phase 1: Build data ──────────────────────────────────────
-build_scripts = [
-    "01_download_fars.py",
-    "02_clean_fars.py",
-    "03_merge_controls.py",
-]
+def main():
+    parser = argparse.ArgumentParser(description="Run the texting-bans replication package.")
+    parser.add_argument("--jobs", type=int, default=None,
+                        help="worker processes (default: one per CPU; 1 runs every stage in-process)")
+    parser.add_argument("--force", action="store_true",
+                        help="rerun every stage even if its code and inputs are unchanged")
+    args = parser.parse_args()
 
-print("\n── Phase 1: Building data ──")
-for i, script in enumerate(build_scripts, 1):
-    path = BUILD / "code" / script
-    print(f"\n  [{i}/{len(build_scripts)}] Running {script}...")
-    t0 = time.time()
-    exec(open(path).read())
-    print(f"  Done ({time.time() - t0:.1f}s)")
+    print("=" * 60)
+    print("Texting Bans and Traffic Fatalities — Replication Package")
+    print("=" * 60)
+    print()
 
-# ── Phase 2: Analysis ────────────────────────────────────────
-analysis_scripts = [
-    "01_event_study.py",
-    "02_figures.py",
-]
+    report = run_report.RunReport(ROOT, "texting-bans-replication-python",
+                                  jobs=args.jobs, force=args.force)
+    try:
+        pipeline.run_pipeline(ROOT, STAGES, jobs=args.jobs, force=args.force, report=report)
+    except BaseException:
+        report.finish("failed")
+        raise
+    report.finish()
+
+    # ── Summary ───────────────────────────────────────────────────
+    print("\n" + "=" * 60)
+    print(report.summary())
+    print("\nComplete! Output files:")
+    print(f"  {ANALYSIS / 'output' / 'event_study_coefs.csv'}")
+    print(f"  {ANALYSIS / 'output' / 'event_study.png'}")
+    print(f"  {ANALYSIS / 'output' / 'honest_did.png'}")
+    print("=" * 60)
 
-print("\n── Phase 2: Running analysis ──")
-for i, script in enumerate(analysis_scripts, 1):
-    path = ANALYSIS / "code" / script
-    print(f"\n  [{i}/{len(analysis_scripts)}] Running {script}...")
-    t0 = time.time()
-    exec(open(path).read())
-    print(f"  Done ({time.time() - t0:.1f}s)")
 
-# ── Summary ───────────────────────────────────────────────────
-print("\n" + "=" * 60)
-print("Complete! Output files:")
-print(f"  {ANALYSIS / 'output' / 'event_study_coefs.csv'}")
-print(f"  {ANALYSIS / 'output' / 'event_study.png'}")
-print("=" * 60)
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+"""
+Stage runner for the replication package.
+
+Every stage is a module in build/code or analysis/code that declares
+
+  INPUTS    files it reads, relative to the project root
+  OUTPUTS   files it writes
+  run(build, analysis)   the stage itself
+
+Everything else a stage computes stays local to run(), so stages share
+nothing but files.  INPUTS and OUTPUTS must be literal lists: the runner
+reads them with ast, without importing the stage (and its heavy imports)
+in the parent process.
+
+A stage depends on whichever stage writes one of its INPUTS.  run_pipeline()
+starts each stage as soon as the stages it depends on have finished, in a
+pool of worker processes, so independent stages (summary statistics, TWFE,
+event study) run side by side.  Each stage is measured by run_report (wall
+and CPU time, peak RSS, rows read and written) in the process that runs it.
+
+A stage is skipped when nothing it depends on has changed since its last
+successful run: the SHA-256 of its source, of the helper modules next to it
+(es_plot.py, ...) and of every input file must match the fingerprint saved
+in .pipeline_cache.json, and its outputs must still be on disk, unchanged.
+Because the fingerprint covers input contents rather than timestamps, a
+stage whose upstream reran but wrote identical files is still skipped.
+"""
+
+import ast
+import hashlib
+import importlib.util
+import json
+import os
+import sys
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+
+import run_report
+
+CACHE_NAME = ".pipeline_cache.json"
+
+
+# ─── Stage discovery ──────────────────────────────────────────────────────────
+
+def declared(path):
+    """INPUTS and OUTPUTS of a stage module, read without importing it."""
+    tree = ast.parse(Path(path).read_text(), filename=str(path))
+    found = {}
+    for node in tree.body:
+        if isinstance(node, ast.Assign):
+            for target in node.targets:
+                if isinstance(target, ast.Name) and target.id in ("INPUTS", "OUTPUTS"):
+                    found[target.id] = list(ast.literal_eval(node.value))
+    missing = {"INPUTS", "OUTPUTS"} - set(found)
+    if missing:
+        raise ValueError(f"{path} does not declare {', '.join(sorted(missing))}")
+    return found["INPUTS"], found["OUTPUTS"]
+
+
+def stage(path, root):
+    """Stage record: name, module path, and inputs/outputs as absolute paths."""
+    path = Path(path)
+    inputs, outputs = declared(path)
+    return {
+        "name": f"{path.parent.parent.name}/{path.stem}",
+        "path": path,
+        "inputs": [root / p for p in inputs],
+        "outputs": [root / p for p in outputs],
+    }
+
+
+def dependencies(stages):
+    """Map each stage name to the names of the stages that write its inputs."""
+    producer = {}
+    for s in stages:
+        for out in s["outputs"]:
+            if out in producer:
+                raise ValueError(f"{out} is written by both {producer[out]} and {s['name']}")
+            producer[out] = s["name"]
+    deps = {s["name"]: {producer[p] for p in s["inputs"] if p in producer} for s in stages}
+
+    # Reject cycles up front rather than waiting forever at run time
+    done, pending = set(), dict(deps)
+    while pending:
+        ready = [name for name, d in pending.items() if d <= done]
+        if not ready:
+            raise ValueError(f"dependency cycle among {sorted(pending)}")
+        for name in ready:
+            done.add(name)
+            del pending[name]
+    return deps
+
+
+def load(path):
+    """Import a stage module by path (its directory goes on sys.path, as it
+    would for `python stage.py`, so helpers like es_plot import normally)."""
+    path = Path(path).resolve()
+    name = f"stage_{path.parent.parent.name}_{path.stem}"
+    if name in sys.modules:
+        return sys.modules[name]
+    if str(path.parent) not in sys.path:
+        sys.path.insert(0, str(path.parent))
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+# ─── Fingerprints ─────────────────────────────────────────────────────────────
+
+def _digest(path):
+    """SHA-256 of a file, or None if it does not exist."""
+    h = hashlib.sha256()
+    try:
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+    except FileNotFoundError:
+        return None
+    return h.hexdigest()
+
+
+def fingerprint(s):
+    """Hash of everything a stage's outputs depend on."""
+    h = hashlib.sha256()
+    helpers = sorted(p for p in s["path"].parent.glob("*.py") if not p.name[:1].isdigit())
+    for path in [s["path"]] + helpers + s["inputs"]:
+        h.update(str(path.name).encode())
+        h.update(str(_digest(path)).encode())
+    return h.hexdigest()
+
+
+def _load_cache(root):
+    try:
+        return json.loads((root / CACHE_NAME).read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_cache(root, entries):
+    path = root / CACHE_NAME
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(entries, indent=2, sort_keys=True) + "\n")
+    os.replace(tmp, path)
+
+
+def _up_to_date(s, key, cache):
+    entry = cache.get(s["name"])
+    if entry is None or entry.get("key") != key:
+        return False
+    return all(_digest(p) == entry["outputs"].get(p.name) for p in s["outputs"])
+
+
+# ─── Execution ────────────────────────────────────────────────────────────────
+
+def execute(path, root):
+    """Run one stage (in whatever process calls this); return its metrics."""
+    root = Path(root)
+    s = stage(path, root)
+    for out in s["outputs"]:
+        out.parent.mkdir(parents=True, exist_ok=True)
+    metrics = {}
+    with run_report.measure(metrics):
+        module = load(path)
+        module.run(root / "build", root / "analysis")
+    metrics["rows_in"] = run_report.total_rows(s["inputs"])
+    metrics["rows_out"] = run_report.total_rows(s["outputs"])
+    return metrics
+
+
+def run_pipeline(root, paths, jobs=None, force=False, report=None):
+    """Run the stages in paths, in dependency order, skipping up-to-date ones.
+
+    jobs is the number of worker processes (default: one per CPU, capped at
+    the number of stages); jobs=1 runs every stage in this process.  Returns
+    one run_report record per stage, in completion order, and adds each to
+    report (a run_report.RunReport) as soon as the stage finishes.
+    """
+    root = Path(root)
+    stages = {s["name"]: s for s in (stage(p, root) for p in paths)}
+    deps = dependencies(stages.values())
+    cache = _load_cache(root)
+    jobs = jobs or min(len(stages), os.cpu_count() or 1)
+
+    finished, running, records = set(), {}, []
+
+    def ready():
+        return [name for name in stages
+                if name not in finished and name not in running.values()
+                and deps[name] <= finished]
+
+    def record(name, status, metrics):
+        s = stages[name]
+        finished.add(name)
+        records.append(run_report.stage_record(name, status, **metrics))
+        if report is not None:
+            report.add(records[-1])
+        if status == "ran":
+            cache[name] = {"key": s["key"],
+                           "outputs": {p.name: _digest(p) for p in s["outputs"]}}
+            _save_cache(root, cache)
+        label = "up to date, skipped" if status == "cached" else f"done in {metrics['wall_seconds']:.1f}s"
+        print(f"  [{name}] {label}", flush=True)
+
+    def launch(name, submit):
+        s = stages[name]
+        # Inputs are final once every producer has finished
+        s["key"] = fingerprint(s)
+        if not force and _up_to_date(s, s["key"], cache):
+            record(name, "cached", {})
+            return False
+        print(f"  [{name}] running...", flush=True)
+        submit(name)
+        return True
+
+    if jobs == 1:
+        while len(finished) < len(stages):
+            for name in ready():
+                launch(name, lambda n: record(n, "ran", execute(stages[n]["path"], root)))
+        return records
+
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        def submit(name):
+            running[pool.submit(execute, stages[name]["path"], root)] = name
+
+        try:
+            while len(finished) < len(stages):
+                # Cached stages finish instantly and may unblock others
+                unblocked = True
+                while unblocked:
+                    unblocked = False
+                    for name in ready():
+                        unblocked |= not launch(name, submit)
+                if not running:
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        metrics = future.result()
+                    except Exception as exc:
+                        raise RuntimeError(f"stage {name} failed: {exc}") from exc
+                    record(name, "ran", metrics)
+        except BaseException:
+            for future in running:
+                future.cancel()
+            raise
+    return records
+
@@ -0,0 +1,287 @@
+"""
+Run instrumentation shared by the main.py runners.
+
+Every stage gets one record with
+
+  wall_seconds   elapsed time
+  cpu_seconds    user + system CPU of the stage, including the child
+                 processes it waited for (e.g. figure-rendering workers)
+  peak_rss_mb    peak resident memory of the stage's process
+  rows_in        rows in the stage's tabular inputs and outputs: Parquet
+  rows_out       from the footer metadata, CSV by counting lines; None when
+                 a stage reads or writes no tables
+
+measure() instruments a block that runs in the current process.  On Linux
+the kernel's peak-RSS counter is reset first (/proc/self/clear_refs), so
+the peak belongs to that stage alone; elsewhere it is the process's peak so
+far and the record says so (peak_rss_scope = "process").  run_script()
+instruments a stage run as a subprocess, using the child's own rusage from
+os.wait4.
+
+RunReport collects the records of one run, writes run_report.json (this
+run) and appends a line to run_history.jsonl (all runs), and prints a
+flame-style summary: one bar per phase and per stage, its width
+proportional to wall time, with the change from the previous run of the
+same stage so regressions stand out.
+"""
+
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:          # Windows
+    resource = None
+
+REPORT_NAME = "run_report.json"
+HISTORY_NAME = "run_history.jsonl"
+
+
+# ─── Rows ─────────────────────────────────────────────────────────────────────
+
+def count_rows(path):
+    """Rows in a .parquet or .csv file (or all such files under a directory);
+    None for anything else."""
+    path = Path(path)
+    if path.is_dir():
+        counts = [count_rows(p) for p in sorted(path.rglob("*")) if p.is_file()]
+        counts = [c for c in counts if c is not None]
+        return sum(counts) if counts else None
+    if not path.is_file():
+        return None
+    if path.suffix == ".parquet":
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            return None
+        return pq.ParquetFile(path).metadata.num_rows
+    if path.suffix == ".csv":
+        lines, last = 0, b"\n"
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                lines += block.count(b"\n")
+                last = block[-1:]
+        lines += last != b"\n"
+        return max(lines - 1, 0)
+    return None
+
+
+def total_rows(paths):
+    """Summed rows over paths, or None if none of them is a table."""
+    counts = [c for c in (count_rows(p) for p in paths) if c is not None]
+    return sum(counts) if counts else None
+
+
+def snapshot(folders):
+    """{file: mtime} for every file under folders (to find what a stage wrote)."""
+    out = {}
+    for folder in folders:
+        for p in Path(folder).rglob("*"):
+            if p.is_file():
+                out[p] = p.stat().st_mtime_ns
+    return out
+
+
+def written_since(before, folders):
+    """Files under folders that are new or modified since snapshot before."""
+    after = snapshot(folders)
+    return sorted(p for p, mtime in after.items() if before.get(p) != mtime)
+
+
+# ─── Measurement ──────────────────────────────────────────────────────────────
+
+def _maxrss_mb(usage):
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    scale = 1 if sys.platform == "darwin" else 1024
+    return usage.ru_maxrss * scale / 2**20
+
+
+def _reset_peak():
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _peak_mb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    return _maxrss_mb(resource.getrusage(resource.RUSAGE_SELF))
+
+
+def _cpu():
+    t = os.times()
+    return t.user + t.system + t.children_user + t.children_system
+
+
+@contextmanager
+def measure(record):
+    """Fill record (a dict) with wall time, CPU time and peak RSS of the block."""
+    scope = "stage" if _reset_peak() else "process"
+    wall, cpu = time.perf_counter(), _cpu()
+    try:
+        yield record
+    finally:
+        record["wall_seconds"] = time.perf_counter() - wall
+        record["cpu_seconds"] = _cpu() - cpu
+        record["peak_rss_mb"] = _peak_mb()
+        record["peak_rss_scope"] = scope
+
+
+def run_script(cmd, **kwargs):
+    """Run cmd as a subprocess; return (returncode, record) with its own
+    wall time, CPU time and peak RSS."""
+    wall = time.perf_counter()
+    proc = subprocess.Popen(cmd, **kwargs)
+    if hasattr(os, "wait4"):
+        _, status, usage = os.wait4(proc.pid, 0)
+        proc.returncode = os.waitstatus_to_exitcode(status)
+        record = {"cpu_seconds": usage.ru_utime + usage.ru_stime,
+                  "peak_rss_mb": _maxrss_mb(usage), "peak_rss_scope": "stage"}
+    else:
+        proc.wait()
+        record = {"cpu_seconds": None, "peak_rss_mb": None, "peak_rss_scope": None}
+    record["wall_seconds"] = time.perf_counter() - wall
+    return proc.returncode, record
+
+
+# ─── Report ───────────────────────────────────────────────────────────────────
+
+def stage_record(name, status="ran", **fields):
+    """One stage's record; fields come from measure()/run_script() plus rows."""
+    record = {"stage": name, "status": status, "wall_seconds": 0.0,
+              "cpu_seconds": 0.0, "peak_rss_mb": None, "peak_rss_scope": None,
+              "rows_in": None, "rows_out": None}
+    record.update(fields)
+    return record
+
+
+def _git_commit(root):
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=root,
+                             capture_output=True, text=True, timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def _rows(n):
+    return "-" if n is None else f"{n:,}"
+
+
+class RunReport:
+    """Stage records of one run, plus the files that keep them."""
+
+    def __init__(self, root, package, **settings):
+        self.root = Path(root)
+        self.package = package
+        self.settings = settings
+        self.stages = []
+        self.started = datetime.now(timezone.utc)
+        self._wall = time.perf_counter()
+        self.elapsed = None
+        self.status = "running"
+        self._baseline = None
+
+    def add(self, record):
+        self.stages.append(record)
+        return record
+
+    def to_dict(self):
+        return {
+            "package": self.package,
+            "started": self.started.isoformat(timespec="seconds"),
+            "status": self.status,
+            "elapsed_seconds": self.elapsed,
+            "commit": _git_commit(self.root),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "settings": self.settings,
+            "stages": self.stages,
+        }
+
+    def _previous(self):
+        """Most recent earlier wall time of every stage that actually ran."""
+        prev = {}
+        try:
+            lines = (self.root / HISTORY_NAME).read_text().splitlines()
+        except OSError:
+            return prev
+        for line in lines:
+            try:
+                run = json.loads(line)
+            except ValueError:
+                continue
+            for s in run.get("stages", []):
+                if s.get("status") == "ran":
+                    prev[s["stage"]] = s["wall_seconds"]
+        return prev
+
+    def finish(self, status="ok"):
+        """Stamp the run, write run_report.json and append to run_history.jsonl."""
+        self.elapsed = time.perf_counter() - self._wall
+        self.status = status
+        self._baseline = self._previous()
+        data = self.to_dict()
+        path = self.root / REPORT_NAME
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(data, indent=2) + "\n")
+        os.replace(tmp, path)
+        with open(self.root / HISTORY_NAME, "a") as f:
+            f.write(json.dumps(data) + "\n")
+        return data
+
+    def summary(self, width=40):
+        """Flame-style text summary: phases, then their stages, by wall time."""
+        baseline = self._baseline if self._baseline is not None else self._previous()
+        total = sum(s["wall_seconds"] for s in self.stages)
+        scale = total or 1.0        # bar divisor when every stage was cached
+        phases = {}
+        for s in self.stages:
+            phases.setdefault(s["stage"].split("/")[0], []).append(s)
+
+        label_w = max([len(s["stage"].split("/")[-1]) + 2 for s in self.stages] + [12])
+
+        def bar(seconds):
+            n = seconds / scale * width
+            return ("█" * int(n) + ("▌" if n - int(n) >= 0.5 else "")).ljust(width)
+
+        elapsed = self.elapsed if self.elapsed is not None else time.perf_counter() - self._wall
+        lines = [f"  Stage time {total:.1f}s over {elapsed:.1f}s elapsed "
+                 f"(bar width = share of stage time)"]
+        for phase, stages in phases.items():
+            sec = sum(s["wall_seconds"] for s in stages)
+            lines.append(f"  {phase:<{label_w}} {bar(sec)} {sec:7.1f}s {sec / scale:6.1%}")
+            for s in sorted(stages, key=lambda s: -s["wall_seconds"]):
+                name = s["stage"].split("/")[-1]
+                if s["status"] != "ran":
+                    lines.append(f"    {name:<{label_w - 2}} {'':{width}} {s['status']:>8}")
+                    continue
+                extra = []
+                if s["peak_rss_mb"] is not None:
+                    extra.append(f"peak {s['peak_rss_mb']:,.0f} MB")
+                if s["rows_in"] is not None or s["rows_out"] is not None:
+                    extra.append(f"rows {_rows(s['rows_in'])} -> {_rows(s['rows_out'])}")
+                before = baseline.get(s["stage"])
+                if before and before >= 0.1:      # ignore noise on trivial stages
+                    extra.append(f"{(s['wall_seconds'] - before) / before:+.0%} vs last")
+                lines.append(f"    {name:<{label_w - 2}} {bar(s['wall_seconds'])} "
+                             f"{s['wall_seconds']:7.1f}s  " + "  ".join(extra))
+        return "\n".join(lines)